@@ -0,0 +1,371 @@
+"""
+Arrow-native batch path: raw JSON lines -> validated, derived Arrow table -> loader.
+
+The pandas path turns each batch into dicts, a DataFrame, `iterrows` rows and
+parameter dicts again. Here a batch stays columnar from end to end:
+
+* `decode_lines` parses the raw lines with pyarrow's JSON reader into a
+  table with the transaction schema, keeping each row's original bytes (for
+  dead letters and dedup); dirty lines are isolated by bisection;
+* `validate` applies the rules of `common.validation` with `pyarrow.compute`
+  masks and splits off the rejected rows;
+* `derive` adds the curated columns (`common.transform` semantics) with
+  compute kernels and dictionary arrays;
+* `sqlite_rows` hands the columns to `executemany` as one list per column
+  (the sqlite3 module needs Python values, converted column-wise in C++);
+  `copy_csv` writes the batch with Arrow's CSV writer for `COPY FROM STDIN`
+  (see `common.pg_copy`).
+
+The `raw_transactions` payload is the enriched record, as on the pandas path:
+`payload_strings` builds it with `common.payloads.json_payloads`, and the
+text is the same for the same input line. That step still costs a dict and a
+`json.dumps` per row.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.payloads import json_payloads
+from common.transform import AMOUNT_BUCKETS, DAY_NAMES, amount_bucket_codes
+from common.validation import MANDATORY_COLUMNS, UUID_PATTERN
+
+LOGGER = logging.getLogger(__name__)
+
+_UUID_REGEX = f"^{UUID_PATTERN}$"
+_ISO_TIME = r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?"
+_ISO_REGEX = _ISO_TIME + r"(Z|[+-]\d{2}:?\d{2})$"
+# No offset: read as UTC, as `pd.to_datetime(..., utc=True)` does.
+_ISO_NAIVE_REGEX = _ISO_TIME + "$"
+
+FLAT_COLUMNS = (
+    "transaction_id",
+    "event_ts",
+    "event_date",
+    "event_hour",
+    "event_dayofweek",
+    "user_id",
+    "amount",
+    "amount_bucket",
+    "merchant",
+    "category",
+    "city",
+    "status",
+    "payment_method",
+    "currency",
+    "ingested_at",
+)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.json as pa_json
+    except ImportError as exc:
+        raise ImportError("The Arrow batch path requires `pip install pyarrow`.") from exc
+    return pa, pa_json
+
+
+def transaction_schema():
+    """Explicit types for the payload fields; unknown fields are still inferred."""
+    pa, _ = _pyarrow()
+    return pa.schema(
+        [
+            ("transaction_id", pa.string()),
+            ("event_ts", pa.string()),
+            ("user_id", pa.int64()),
+            ("amount", pa.float64()),
+            ("merchant", pa.string()),
+            ("category", pa.string()),
+            ("city", pa.string()),
+            ("status", pa.string()),
+            ("payment_method", pa.string()),
+            ("currency", pa.string()),
+        ]
+    )
+
+
+def records_to_table(records: List[dict], schema) -> Any:
+    """Build a table from decoded records; mistyped values become nulls."""
+    pa, _ = _pyarrow()
+    columns = []
+    for schema_field in schema:
+        values = [record.get(schema_field.name) for record in records]
+        try:
+            columns.append(pa.array(values, type=schema_field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            # Mistyped values become nulls, caught by the mandatory-column checks downstream.
+            columns.append(pa.array([_coerce(value, schema_field.type) for value in values], type=schema_field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _coerce(value: Any, arrow_type: Any) -> Any:
+    pa, _ = _pyarrow()
+    try:
+        pa.array([value], type=arrow_type)
+        return value
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ArrowBatch:
+    """Rows of a batch as an Arrow table, with the original bytes of each row."""
+
+    table: Any  # pyarrow.Table
+    raw: List[bytes]
+    # Lines that are not valid JSON: (index in the decoded lines, raw line, error).
+    invalid: List[Tuple[int, bytes, str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def filter(self, mask: np.ndarray) -> "ArrowBatch":
+        """Rows where the boolean `mask` is true."""
+        if mask.all():
+            return self
+        pa, _ = _pyarrow()
+        return ArrowBatch(
+            self.table.filter(pa.array(mask)),
+            [line for line, keep in zip(self.raw, mask.tolist()) if keep],
+            self.invalid,
+        )
+
+
+def decode_lines(lines: Sequence[bytes]) -> ArrowBatch:
+    """Parse JSON lines into an `ArrowBatch`; blank lines are skipped, invalid ones set aside.
+
+    `ArrowBatch.invalid` indexes refer to `lines`.
+    """
+    pa, _ = _pyarrow()
+    schema = transaction_schema()
+    kept = [(index, line) for index, line in enumerate(lines) if line.strip()]
+    tables: List[Any] = []
+    raw: List[bytes] = []
+    invalid: List[Tuple[int, bytes, str]] = []
+    if kept:
+        _decode(kept, schema, tables, raw, invalid)
+    if not tables:
+        return ArrowBatch(records_to_table([], schema), [], invalid)
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    return ArrowBatch(table, raw, invalid)
+
+
+def _decode(
+    kept: Sequence[Tuple[int, bytes]],
+    schema: Any,
+    tables: List[Any],
+    raw: List[bytes],
+    invalid: List[Tuple[int, bytes, str]],
+) -> None:
+    """Parse `kept` with the Arrow reader; a range it rejects is bisected down to the offending lines.
+
+    A malformed line or a type change therefore costs a few re-parses of the
+    ranges around it, never a Python decode of the whole batch. A single
+    rejected line is decoded with `json`: invalid JSON is set aside, mistyped
+    fields become nulls (`records_to_table`).
+    """
+    pa, pa_json = _pyarrow()
+    lines = [line for _, line in kept]
+    try:
+        table = pa_json.read_json(
+            pa.BufferReader(b"".join(line if line.endswith(b"\n") else line + b"\n" for line in lines)),
+            parse_options=pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore"),
+        )
+        if table.num_rows == len(lines):
+            tables.append(table.select(schema.names))
+            raw.extend(lines)
+            return
+    except pa.ArrowInvalid:
+        pass
+    if len(kept) > 1:
+        middle = len(kept) // 2
+        _decode(kept[:middle], schema, tables, raw, invalid)
+        _decode(kept[middle:], schema, tables, raw, invalid)
+        return
+    index, line = kept[0]
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+    except ValueError as exc:
+        invalid.append((index, line, str(exc)))
+        return
+    tables.append(records_to_table([record], schema))
+    raw.append(line)
+
+
+def parse_timestamps(column: Any) -> Any:
+    """ISO-8601 strings to `timestamp[us, UTC]`, null where unparseable; naive values are UTC.
+
+    Arrow casts the usual shapes (with or without offset); the strings it
+    leaves null are parsed again with the pandas rules of
+    `common.validation`, so both paths accept the same values.
+    """
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+
+    target = pa.timestamp("us", tz="UTC")
+    missing = pa.scalar(None, pa.string())
+
+    def matching(regex: str) -> Any:
+        return pc.if_else(pc.fill_null(pc.match_substring_regex(column, regex), False), column, missing)
+
+    try:
+        aware = pc.cast(matching(_ISO_REGEX), target)
+        naive = pc.cast(pc.cast(matching(_ISO_NAIVE_REGEX), pa.timestamp("us")), target)
+        parsed = pc.coalesce(aware, naive)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Out-of-range fields: the whole column goes through pandas.
+        parsed = pa.nulls(len(column), target)
+    leftover = pc.and_(pc.is_null(parsed), pc.is_valid(column))
+    if not pc.any(leftover).as_py():
+        return parsed
+    import pandas as pd
+
+    values = pc.filter(column, leftover).to_pylist()
+    retried = pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors="coerce", format="ISO8601")
+    replacements = pa.array(retried.dt.floor("us"), type=target, from_pandas=True)
+    parsed, leftover = (a.combine_chunks() if isinstance(a, pa.ChunkedArray) else a for a in (parsed, leftover))
+    return pc.replace_with_mask(parsed, leftover, replacements)
+
+
+def validate(batch: ArrowBatch) -> Tuple[ArrowBatch, List[Tuple[bytes, str]]]:
+    """Split `batch` into its valid rows (event_ts parsed) and (raw payload, reason) rejections."""
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+
+    table = batch.table
+    timestamps = parse_timestamps(table.column("event_ts"))
+    reasons = pa.nulls(table.num_rows, pa.string())
+
+    def flag(mask: Any, reason: str) -> Any:
+        mask = pc.and_(pc.fill_null(mask, True), pc.is_null(reasons))
+        return pc.if_else(mask, pa.scalar(reason), reasons)
+
+    for column in MANDATORY_COLUMNS:
+        reasons = flag(pc.is_null(table.column(column)), f"missing {column}")
+    reasons = flag(pc.invert(pc.match_substring_regex(table.column("transaction_id"), _UUID_REGEX)), "invalid transaction_id")
+    reasons = flag(pc.is_null(timestamps), "invalid event_ts")
+    reasons = flag(pc.invert(pc.is_finite(table.column("amount"))), "invalid amount")
+
+    valid = pc.is_null(reasons)
+    if pc.all(valid).as_py():
+        rejected: List[Tuple[bytes, str]] = []
+        kept_raw = batch.raw
+    else:
+        flags = valid.to_numpy(zero_copy_only=False)
+        reason_values = reasons.to_pylist()
+        rejected = [(batch.raw[i], reason_values[i]) for i in np.flatnonzero(~flags).tolist()]
+        kept_raw = [batch.raw[i] for i in np.flatnonzero(flags).tolist()]
+        table = table.filter(valid)
+        timestamps = pc.filter(timestamps, valid)
+    table = table.set_column(table.schema.get_field_index("event_ts"), "event_ts", timestamps)
+    return ArrowBatch(table, kept_raw, batch.invalid), rejected
+
+
+def derive(batch: ArrowBatch, ingested_at: Optional[datetime] = None) -> ArrowBatch:
+    """Add the curated columns to a validated batch, as `common.transform.derive_columns` does."""
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+
+    table = batch.table
+    ts = table.column("event_ts")
+    amount = table.column("amount").to_numpy()
+    ingested = ingested_at or datetime.now(timezone.utc)
+    table = (
+        table.append_column("event_date", pc.cast(ts, pa.date32()))
+        .append_column("event_hour", pc.cast(pc.hour(ts), pa.int32()))
+        .append_column(
+            "event_dayofweek",
+            pa.DictionaryArray.from_arrays(pc.cast(pc.day_of_week(ts), pa.int8()), pa.array(DAY_NAMES)),
+        )
+        .append_column(
+            "amount_bucket",
+            pa.DictionaryArray.from_arrays(amount_bucket_codes(amount).astype(np.int8), pa.array(AMOUNT_BUCKETS)),
+        )
+        .append_column("ingested_at", pa.array(np.full(table.num_rows, int(ingested.timestamp() * 1_000_000)), pa.timestamp("us", tz="UTC")))
+    )
+    return ArrowBatch(table, batch.raw, batch.invalid)
+
+
+def _iso_strings(column: Any) -> Any:
+    """`timestamp[us, UTC]` as `common.payloads.iso_strings` writes it (no fraction on whole seconds)."""
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+
+    fraction = pc.strftime(column, format="%Y-%m-%dT%H:%M:%S")
+    seconds = pc.strftime(pc.cast(column, pa.timestamp("s", tz="UTC"), safe=False), format="%Y-%m-%dT%H:%M:%S")
+    whole = pc.and_(pc.equal(pc.millisecond(column), 0), pc.equal(pc.microsecond(column), 0))
+    return pc.binary_join_element_wise(pc.if_else(whole, seconds, fraction), "+00:00", "")
+
+
+# Column order of the pandas payloads: the record fields, then those added by `derive_columns`.
+_DERIVED_PAYLOAD_COLUMNS = ("amount_bucket", "event_date", "event_hour", "event_dayofweek")
+
+
+def payload_strings(batch: ArrowBatch) -> List[str]:
+    """`raw_transactions` payload of each row, the text the pandas path writes for the same line.
+
+    This is the one step of the path that is not columnar: the payload
+    columns go through pandas and `json_payloads`, which builds a dict and
+    calls `json.dumps` for every row (about 10 µs a row, most of the Python
+    time of an Arrow batch). Byte-identical payloads across both paths are
+    worth that; the decode, validation and derivation stay in Arrow.
+    """
+    table = batch.table
+    names = [name for name in table.column_names if name not in _DERIVED_PAYLOAD_COLUMNS and name != "ingested_at"]
+    frame = table.select(names + list(_DERIVED_PAYLOAD_COLUMNS)).to_pandas()
+    return json_payloads(frame)
+
+
+def sqlite_rows(batch: ArrowBatch) -> Tuple[Iterator[tuple], Iterator[tuple]]:
+    """Parameters for the raw and flat SQLite inserts, built column by column."""
+    import pyarrow.compute as pc
+
+    table = batch.table
+    event_ts = _iso_strings(table.column("event_ts")).to_pylist()
+    ingested_at = _iso_strings(table.column("ingested_at")).to_pylist()
+    transaction_id = table.column("transaction_id").to_pylist()
+    raw = payload_strings(batch)
+    columns = {
+        "transaction_id": transaction_id,
+        "event_ts": event_ts,
+        "event_date": pc.strftime(table.column("event_date"), format="%Y-%m-%d").to_pylist(),
+        "ingested_at": ingested_at,
+    }
+    flat = [columns[name] if name in columns else table.column(name).to_pylist() for name in FLAT_COLUMNS]
+    return zip(transaction_id, event_ts, raw, ingested_at), zip(*flat)
+
+
+def copy_csv(batch: ArrowBatch, raw_only: bool = False) -> bytes:
+    """The batch as CSV (header included) for `COPY ... FROM STDIN (FORMAT csv, HEADER true)`.
+
+    Columns are `FLAT_COLUMNS` then `payload`, or with `raw_only` those of
+    `common.pg_copy.RAW_STAGING_COLUMNS`.
+    """
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    table = batch.table
+    names = ("transaction_id", "event_ts", "ingested_at") if raw_only else FLAT_COLUMNS
+    columns = []
+    for name in names:
+        column = table.column(name)
+        if pa.types.is_dictionary(column.type):
+            column = pc.cast(column, pa.string())
+        elif pa.types.is_timestamp(column.type):
+            column = _iso_strings(column)
+        columns.append(column)
+    payloads = pa.array(payload_strings(batch), pa.string())
+    out = pa.Table.from_arrays(columns + [payloads], names=list(names) + ["payload"])
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(out, sink)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,119 @@
+"""
+Pluggable serializers for Kafka transaction payloads.
+
+The producer's `value_serializer` and the consumer's `value_deserializer` both
+resolve a codec by name (`json`, `orjson`, `msgspec`, `binary`) so the hot
+per-message path can use a faster backend without touching the rest of the
+pipeline. `orjson` and `msgspec` are optional dependencies, only imported when
+selected; `binary` is the compact format from `common.wire_format`.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Mapping, Optional
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+DEFAULT_CODEC = "json"
+
+
+if msgspec is not None:
+
+    class Transaction(msgspec.Struct):
+        """Typed transaction payload, decoded (and validated) by msgspec."""
+
+        transaction_id: str
+        event_ts: str
+        user_id: int
+        amount: float
+        merchant: Optional[str] = None
+        category: Optional[str] = None
+        city: Optional[str] = None
+        status: Optional[str] = None
+        payment_method: Optional[str] = None
+        currency: str = "EUR"
+
+
+class Codec:
+    """Encode a payload mapping to bytes and back."""
+
+    name = "base"
+
+    def encode(self, record: Mapping[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """Standard library `json`, the historical wire format."""
+
+    name = "json"
+
+    def encode(self, record: Mapping[str, Any]) -> bytes:
+        return json.dumps(record).encode("utf-8")
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return json.loads(data.decode("utf-8"))
+
+
+class OrjsonCodec(Codec):
+    """`orjson` backend: same JSON on the wire, encoded and parsed in Rust."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        try:
+            import orjson
+        except ImportError as exc:
+            raise ImportError("The 'orjson' codec requires `pip install orjson`.") from exc
+        self.encode = orjson.dumps  # type: ignore[assignment]
+        self.decode = orjson.loads  # type: ignore[assignment]
+
+
+class MsgspecCodec(Codec):
+    """`msgspec` backend: JSON on the wire, decoded into the typed `Transaction` struct."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        if msgspec is None:
+            raise ImportError("The 'msgspec' codec requires `pip install msgspec`.")
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder(Transaction)
+        self.encode = self._encoder.encode  # type: ignore[assignment]
+
+    def decode_struct(self, data: bytes) -> "Transaction":
+        return self._decoder.decode(data)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return msgspec.structs.asdict(self._decoder.decode(data))
+
+
+def _binary_codec() -> Codec:
+    from common.wire_format import BinaryCodec
+
+    return BinaryCodec()
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgspecCodec.name: MsgspecCodec,
+    "binary": _binary_codec,
+}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Instantiate the codec registered under `name` (default: `json`)."""
+    name = name or DEFAULT_CODEC
+    try:
+        factory = CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec {name!r}, expected one of {sorted(CODECS)}") from None
+    return factory()
@@ -0,0 +1,148 @@
+"""
+Dead-letter sinks for records that cannot be loaded.
+
+Undecodable messages and rows rejected by `common.validation.split_valid` are
+turned into `DeadLetter`s (original payload, reason, where it came from) and
+written to a sink instead of failing or silently shrinking the batch:
+
+* `TableDeadLetterSink`: a `dead_letters` table, written in the same
+  transaction as the load and the offset commit when given a connection;
+* `FileDeadLetterSink`: a JSONL file;
+* `KafkaDeadLetterSink`: a Kafka topic, flushed before the caller commits.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from common.validation import REASON_COLUMN
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class DeadLetter:
+    source: str
+    reason: str
+    payload: str  # original record as JSON, or the raw undecodable line
+    failed_at: str = field(default_factory=_now)
+
+
+def from_rejected(rejected: pd.DataFrame, source: str, records: Optional[Sequence[dict]] = None) -> List[DeadLetter]:
+    """Dead letters for the rows rejected by `split_valid`.
+
+    With the `records` the batch was built from (default RangeIndex), the
+    payload is the original record; otherwise it is the row as JSON.
+    """
+    if rejected.empty:
+        return []
+    if records is not None:
+        payloads = [json.dumps(records[index], default=str) for index in rejected.index.tolist()]
+    else:
+        payloads = rejected.drop(columns=[REASON_COLUMN]).to_json(orient="records", lines=True, date_format="iso").splitlines()
+    return [
+        DeadLetter(source=source, reason=reason, payload=payload)
+        for reason, payload in zip(rejected[REASON_COLUMN].tolist(), payloads)
+    ]
+
+
+def from_raw(raw: Any, reason: str, source: str) -> DeadLetter:
+    """Dead letter for a line or message that could not be decoded (non-UTF-8 bytes as `base64:...`)."""
+    if isinstance(raw, bytes):
+        try:
+            raw = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            raw = "base64:" + base64.b64encode(raw).decode("ascii")
+    return DeadLetter(source=source, reason=reason, payload=str(raw).rstrip("\n"))
+
+
+def log_summary(letters: Iterable[DeadLetter], logger: logging.Logger = LOGGER) -> None:
+    counts = Counter(letter.reason.split(":")[0] for letter in letters)
+    if counts:
+        logger.warning("%s record(s) dead-lettered: %s", sum(counts.values()), dict(counts))
+
+
+class DeadLetterSink:
+    def write(self, letters: List[DeadLetter]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileDeadLetterSink(DeadLetterSink):
+    """Append dead letters to a JSONL file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def write(self, letters: List[DeadLetter]) -> None:
+        if not letters:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(asdict(letter)) + "\n" for letter in letters))
+
+
+class KafkaDeadLetterSink(DeadLetterSink):
+    """Publish dead letters to a Kafka topic with an existing `KafkaProducer`."""
+
+    def __init__(self, producer: Any, topic: str) -> None:
+        self.producer = producer
+        self.topic = topic
+
+    def write(self, letters: List[DeadLetter]) -> None:
+        for letter in letters:
+            self.producer.send(self.topic, value=json.dumps(asdict(letter)).encode("utf-8"))
+        if letters:
+            # Delivered before the caller commits the offsets of the batch they came from.
+            self.producer.flush()
+
+    def close(self) -> None:
+        self.producer.close()
+
+
+DEAD_LETTERS_DDL = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    source TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    failed_at TEXT NOT NULL
+)
+"""
+
+
+class TableDeadLetterSink(DeadLetterSink):
+    """Insert dead letters into the `dead_letters` table of an engine or open connection."""
+
+    def __init__(self, connectable: Any) -> None:
+        self.connectable = connectable
+
+    def write(self, letters: List[DeadLetter]) -> None:
+        if not letters:
+            return
+        statement = text(
+            "INSERT INTO dead_letters (source, reason, payload, failed_at) "
+            "VALUES (:source, :reason, :payload, :failed_at)"
+        )
+        rows = [asdict(letter) for letter in letters]
+        if isinstance(self.connectable, Engine):
+            with self.connectable.begin() as conn:
+                conn.execute(statement, rows)
+        else:
+            self.connectable.execute(statement, rows)
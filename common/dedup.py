@@ -0,0 +1,141 @@
+"""
+Duplicate suppression in front of the loaders.
+
+At-least-once delivery means redelivered Kafka messages and re-read queue
+lines reach the loaders again, and each one costs an upsert (`ON CONFLICT DO
+UPDATE` / `INSERT OR REPLACE`) that rewrites the row and its indexes.
+`Deduplicator.keep_mask` drops them before that.
+
+Only exact replays are dropped. A row is keyed on its `transaction_id` plus
+a 64-bit digest of its content (`ingested_at` excluded). A new version of a
+transaction, e.g. a status going from PENDING to APPROVED, has another key
+and still reaches the loaders. There `transactions_flat` keeps the last
+version and `raw_transactions` the first, as without dedup. Replays are
+dropped:
+
+* within a batch, every repeat of a key after the first (a column-wide
+  `duplicated()`);
+* across batches, keys found in `RecentIds`, a bounded LRU of the keys
+  loaded by the last batches. It is exact, not probabilistic: a Bloom filter
+  false positive would silently drop a new transaction.
+
+Keys are only remembered once their batch is committed (`remember`), so a
+failed load is retried in full. Counters are kept in `DedupStats`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.arrow_batch import ArrowBatch
+
+DEFAULT_CACHE_SIZE = 100_000
+
+
+class RecentIds:
+    """The `capacity` most recently remembered keys (least recently seen evicted first)."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._ids: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_many(self, ids: Iterable[Hashable]) -> None:
+        recent = self._ids
+        for key in ids:
+            recent[key] = None
+            recent.move_to_end(key)
+        while len(recent) > self.capacity:
+            recent.popitem(last=False)
+
+
+@dataclass
+class DedupStats:
+    rows: int = 0
+    in_batch: int = 0  # exact repeats within a batch
+    cross_batch: int = 0  # rows loaded as is by an earlier batch
+
+    @property
+    def duplicates(self) -> int:
+        return self.in_batch + self.cross_batch
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the rows seen that were dropped as duplicates."""
+        return self.duplicates / self.rows if self.rows else 0.0
+
+
+class Deduplicator:
+    """Exact in-batch dedup plus a cross-batch LRU of `cache_size` keys (0 disables the LRU)."""
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.recent = RecentIds(cache_size) if cache_size > 0 else None
+        self.stats = DedupStats()
+
+    def keep_mask(self, ids: Sequence[Hashable]) -> np.ndarray:
+        """Boolean mask of the rows to load: first occurrence of each key, not loaded recently."""
+        first = ~pd.Series(ids, dtype=object).duplicated().to_numpy()
+        keep = first
+        if self.recent is not None and len(self.recent):
+            recent = self.recent
+            seen = np.fromiter((key in recent for key in ids), dtype=bool, count=len(ids))
+            keep = first & ~seen
+            self.stats.cross_batch += int(np.count_nonzero(first & seen))
+        self.stats.rows += len(ids)
+        self.stats.in_batch += len(ids) - int(np.count_nonzero(first))
+        return keep
+
+    def remember(self, ids: Iterable[Hashable]) -> None:
+        """Record the keys of a committed batch (hits included, which refreshes them in the LRU)."""
+        if self.recent is not None:
+            self.recent.add_many(ids)
+
+
+def _line_digests(lines: Sequence[bytes]) -> List[int]:
+    return [
+        int.from_bytes(hashlib.blake2b(line.rstrip(b"\r\n"), digest_size=8).digest(), "little") for line in lines
+    ]
+
+
+def _frame_digests(df: pd.DataFrame) -> List[int]:
+    content = df.drop(columns=["ingested_at"], errors="ignore")
+    return pd.util.hash_pandas_object(content, index=False).tolist()
+
+
+def dedup_keys(batch: Any) -> List[Tuple[str, int]]:
+    """(transaction_id, content digest) of each row of a DataFrame or `ArrowBatch`.
+
+    The digest of an Arrow row is that of its original line, the one of a
+    DataFrame row covers its columns but `ingested_at`.
+    """
+    if isinstance(batch, ArrowBatch):
+        ids = batch.table.column("transaction_id").to_pylist()
+        return list(zip(ids, _line_digests(batch.raw)))
+    return list(zip(batch["transaction_id"].astype(str).tolist(), _frame_digests(batch)))
+
+
+def deduplicate(dedup: Deduplicator, batch: Any) -> Tuple[Any, List[Tuple[str, int]]]:
+    """Drop the exact replays of a transformed batch (DataFrame or `ArrowBatch`).
+
+    Returns the filtered batch and the keys of the whole batch, for
+    `dedup.remember` once the load is committed.
+    """
+    if isinstance(batch, ArrowBatch):
+        keys = dedup_keys(batch)
+        return batch.filter(dedup.keep_mask(keys)), keys
+    if batch.empty:
+        return batch, []
+    keys = dedup_keys(batch)
+    keep = dedup.keep_mask(keys)
+    return (batch if keep.all() else batch[keep]), keys
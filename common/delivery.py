@@ -0,0 +1,160 @@
+"""
+Delivery tracking for asynchronous Kafka sends.
+
+`KafkaProducer.send` returns a future per message. `DeliveryTracker` hooks a
+callback and an errback onto each of them, so that:
+
+* failures are counted (and the first ones logged) as soon as the broker
+  rejects a message, instead of surfacing at the final `flush()`;
+* the number of unacknowledged messages is bounded: `wait_for_room` blocks
+  the producer loop, and therefore generation, until acks catch up;
+* the acknowledgement latency of each generated batch (first send to last
+  ack) is recorded, and reported as percentiles to size `linger_ms` and
+  `batch_size` from measurements. At most `LATENCY_SAMPLES` latencies are
+  kept, a uniform reservoir sample of all batches, so long runs stay in
+  bounded memory.
+
+A `send` that raises (buffer full past `max_block_ms`, serializer error)
+settles the messages of the batch it did not send as failed before the
+exception propagates, so the window never waits for acks that cannot come.
+
+Callbacks run on the producer's I/O thread, hence the condition variable.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 20_000
+# Delivery errors logged individually before only being counted.
+LOGGED_ERRORS = 5
+# Batch latencies kept for the percentiles (reservoir sample beyond that).
+LATENCY_SAMPLES = 10_000
+
+
+class _BatchDelivery:
+    """Acknowledgement state of one batch of sends."""
+
+    __slots__ = ("tracker", "sent_at", "pending")
+
+    def __init__(self, tracker: "DeliveryTracker", sent_at: float) -> None:
+        self.tracker = tracker
+        self.sent_at = sent_at
+        self.pending = 0
+
+    def on_success(self, _metadata: Any) -> None:
+        self.tracker._settle(self, None)
+
+    def on_error(self, exc: BaseException) -> None:
+        self.tracker._settle(self, exc)
+
+
+class DeliveryTracker:
+    """Count acks and failures, bound in-flight messages, time each batch.
+
+    `max_in_flight` of None or 0 disables the window (metrics only).
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_in_flight = max_in_flight or None
+        self._clock = clock
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.acked = 0
+        self.failed = 0
+        self.blocked_seconds = 0.0
+        self.first_error: Optional[BaseException] = None
+        self._latencies: List[float] = []
+        self._batches_acked = 0
+        self._sampler = random.Random(0)
+
+    def wait_for_room(self, size: int) -> None:
+        """Block until `size` more messages fit in the window (or nothing is in flight)."""
+        if self.max_in_flight is None:
+            return
+        with self._condition:
+            if self.in_flight == 0 or self.in_flight + size <= self.max_in_flight:
+                return
+            started = self._clock()
+            while self.in_flight and self.in_flight + size > self.max_in_flight:
+                self._condition.wait()
+            self.blocked_seconds += self._clock() - started
+
+    def send_batch(self, producer: Any, topic: str, payloads: List[Any], keys: Optional[List[Any]] = None) -> None:
+        """`producer.send` every payload and register delivery callbacks.
+
+        Messages are counted in flight before their `send` (a callback may run
+        inside it); if a `send` raises, the ones not sent are settled as
+        failed and the exception is re-raised.
+        """
+        batch = _BatchDelivery(self, self._clock())
+        with self._condition:
+            self.in_flight += len(payloads)
+            batch.pending = len(payloads)
+        sent = 0
+        try:
+            if keys is None:
+                for payload in payloads:
+                    producer.send(topic, value=payload).add_callback(batch.on_success).add_errback(batch.on_error)
+                    sent += 1
+            else:
+                for key, payload in zip(keys, payloads):
+                    producer.send(topic, key=key, value=payload).add_callback(batch.on_success).add_errback(batch.on_error)
+                    sent += 1
+        except BaseException as exc:
+            self._settle(batch, exc, len(payloads) - sent)
+            raise
+
+    def _settle(self, batch: _BatchDelivery, exc: Optional[BaseException], count: int = 1) -> None:
+        with self._condition:
+            self.in_flight -= count
+            batch.pending -= count
+            if exc is None:
+                self.acked += count
+            else:
+                self.failed += count
+                if self.first_error is None:
+                    self.first_error = exc
+                if self.failed - count < LOGGED_ERRORS:
+                    LOGGER.error("Delivery failed: %r", exc)
+            if batch.pending == 0:
+                self._record_latency(self._clock() - batch.sent_at)
+            self._condition.notify_all()
+
+    def _record_latency(self, latency: float) -> None:
+        """Reservoir sampling: every batch has the same chance to be among the kept latencies."""
+        self._batches_acked += 1
+        if len(self._latencies) < LATENCY_SAMPLES:
+            self._latencies.append(latency)
+            return
+        slot = self._sampler.randrange(self._batches_acked)
+        if slot < LATENCY_SAMPLES:
+            self._latencies[slot] = latency
+
+    def latency_percentiles(self, percentiles=(50, 95, 99)) -> Optional[np.ndarray]:
+        """Per-batch acknowledgement latency percentiles in milliseconds."""
+        with self._condition:
+            if not self._latencies:
+                return None
+            latencies = np.asarray(self._latencies)
+        return np.percentile(latencies, percentiles) * 1000
+
+    def summary(self) -> str:
+        percentiles = self.latency_percentiles()
+        latency = (
+            "batch ack latency p50={:.1f}ms p95={:.1f}ms p99={:.1f}ms".format(*percentiles)
+            if percentiles is not None
+            else "no batch acknowledged"
+        )
+        return (
+            f"acked={self.acked} failed={self.failed} in_flight={self.in_flight} "
+            f"{latency} blocked={self.blocked_seconds:.2f}s"
+        )
@@ -0,0 +1,204 @@
+"""
+Helpers for the JSONL file queue used by the no-Docker pipeline.
+
+`GroupCommitWriter` buffers serialized records and writes each group as one
+block, flushing every N records or T milliseconds and optionally calling
+`fsync` on its own schedule. `per-record` durability keeps the historical
+write-and-flush-per-event behaviour.
+
+On the read side, a consumer keeps a `QueuePosition` (byte offset and line
+number of the next unread line) and `read_batch` seeks straight to it, so
+the cost of a batch does not depend on how much of the file was consumed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DURABILITY_MODES = ("per-record", "group")
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DurabilityPolicy:
+    """When buffered records reach the OS (flush) and the disk (fsync)."""
+
+    mode: str = "group"
+    flush_records: int = 1_000
+    flush_interval_ms: int = 200
+    fsync_interval_ms: int = 0  # 0 = leave it to the OS
+
+    def __post_init__(self) -> None:
+        if self.mode not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode {self.mode!r}, expected one of {DURABILITY_MODES}")
+
+
+class GroupCommitWriter:
+    """Append JSON records to a JSONL file, one buffered block per group."""
+
+    def __init__(
+        self,
+        path: Path,
+        policy: Optional[DurabilityPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self.policy = policy or DurabilityPolicy()
+        self._clock = clock
+        self._open()
+        self._pending: List[str] = []
+        self._last_flush = clock()
+        self._last_fsync = self._last_flush
+        self.records_written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.write_lines([json.dumps(record)])
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        self.write_lines([json.dumps(record) for record in records])
+
+    def write_lines(self, lines: List[str]) -> None:
+        """Queue already-serialized records (without trailing newline)."""
+        if self.policy.mode == "per-record":
+            for line in lines:
+                self._pending.append(line)
+                self.flush()
+            return
+
+        self._pending.extend(lines)
+        if (
+            len(self._pending) >= self.policy.flush_records
+            or (self._clock() - self._last_flush) * 1000 >= self.policy.flush_interval_ms
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending records as a single block, then fsync if it is due."""
+        if self._pending:
+            self._write_block(self._pending)
+            self.records_written += len(self._pending)
+            self.flushes += 1
+            self._pending.clear()
+        now = self._clock()
+        self._last_flush = now
+        if self.policy.fsync_interval_ms > 0 and (now - self._last_fsync) * 1000 >= self.policy.fsync_interval_ms:
+            self._fsync()
+            self.fsyncs += 1
+            self._last_fsync = now
+
+    def close(self) -> None:
+        if self._closed():
+            return
+        self.flush()
+        if self.policy.fsync_interval_ms > 0:
+            self._fsync()
+            self.fsyncs += 1
+        self._close_files()
+
+    # File handling, overridden by `common.segmented_log.SegmentedLogWriter`.
+
+    def _open(self) -> None:
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def _write_block(self, lines: List[str]) -> None:
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def _fsync(self) -> None:
+        os.fsync(self._file.fileno())
+
+    def _closed(self) -> bool:
+        return self._file.closed
+
+    def _close_files(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "GroupCommitWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+@dataclass(frozen=True)
+class QueuePosition:
+    """Byte offset and (0-based) line number of the next unread line."""
+
+    offset: int = 0
+    line: int = 0
+
+
+@dataclass
+class QueueBatch:
+    """Records read from the queue, with the positions before and after them."""
+
+    records: List[Dict[str, Any]]
+    start: QueuePosition
+    end: QueuePosition
+    # Lines that are not valid JSON: (line number or log offset, raw line, error).
+    invalid: List[Tuple[int, bytes, str]] = field(default_factory=list)
+    # Undecoded (line number or log offset, raw line) pairs, when read with `decode=False`.
+    raw: List[Tuple[int, bytes]] = field(default_factory=list)
+
+
+def read_lines(path: Path, position: QueuePosition, max_lines: int) -> Tuple[List[Tuple[int, bytes]], QueuePosition]:
+    """Read up to `max_lines` complete lines from `position`.
+
+    Returns `(line_number, raw_line)` pairs and the position after the last
+    complete line. A trailing line without newline is still being written and
+    is left for the next read.
+    """
+    size = path.stat().st_size
+    if position.offset > size:
+        LOGGER.warning("%s is shorter than the saved offset %s, reading from the start", path, position.offset)
+        position = QueuePosition()
+    lines: List[Tuple[int, bytes]] = []
+    offset, line_number = position.offset, position.line
+    with path.open("rb") as f:
+        f.seek(offset)
+        while len(lines) < max_lines:
+            raw = f.readline()
+            if not raw.endswith(b"\n"):
+                break
+            lines.append((line_number, raw))
+            offset += len(raw)
+            line_number += 1
+    return lines, QueuePosition(offset, line_number)
+
+
+def decode_record(raw: bytes) -> Dict[str, Any]:
+    """One queue line as a record; ValueError for bad JSON, bad UTF-8 or a non-object value."""
+    record = json.loads(raw)
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+    return record
+
+
+def read_batch(path: Path, position: QueuePosition, max_lines: int, decode: bool = True) -> QueueBatch:
+    """Decode the next `max_lines` lines from `position`; blank lines are skipped, invalid ones set aside.
+
+    With `decode=False` the lines are returned as read, in `QueueBatch.raw`.
+    """
+    lines, end = read_lines(path, position, max_lines)
+    if not decode:
+        return QueueBatch(records=[], start=position, end=end, raw=lines)
+    records: List[Dict[str, Any]] = []
+    invalid: List[Tuple[int, bytes, str]] = []
+    for line_number, raw in lines:
+        if not raw.strip():
+            continue
+        try:
+            records.append(decode_record(raw))
+        except ValueError as exc:  # JSONDecodeError and UnicodeDecodeError are ValueErrors
+            LOGGER.error("Invalid JSON at %s line %s: %s", path, line_number, exc)
+            invalid.append((line_number, raw, str(exc)))
+    return QueueBatch(records=records, start=position, end=end, invalid=invalid)
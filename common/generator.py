@@ -0,0 +1,292 @@
+"""
+Synthetic transaction generators shared by the producers and the seeding scripts.
+
+`generate_transaction()` builds a single payload and is kept for ad-hoc use,
+while `generate_batch()` draws whole columns at once with NumPy so that load
+tests are no longer bound by per-event Python overhead.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = [
+    "grocery",
+    "electronics",
+    "travel",
+    "fashion",
+    "restaurants",
+    "entertainment",
+    "health",
+]
+STATUSES = ["APPROVED", "DECLINED", "PENDING", "REFUNDED"]
+STATUS_WEIGHTS = [0.75, 0.1, 0.1, 0.05]
+CITIES = [
+    "Paris",
+    "Lyon",
+    "Marseille",
+    "Toulouse",
+    "Bordeaux",
+    "Nice",
+    "Nantes",
+]
+MERCHANTS = [
+    "Amazon",
+    "Uber",
+    "Carrefour",
+    "Fnac",
+    "Airbnb",
+    "Zara",
+    "Decathlon",
+]
+PAYMENT_METHODS = ["card", "wallet", "bank_transfer"]
+CURRENCY = "EUR"
+USER_ID_MIN = 1
+USER_ID_MAX = 5_000
+AMOUNT_MIN = 5.0
+AMOUNT_MAX = 750.0
+
+FIELDS = (
+    "transaction_id",
+    "event_ts",
+    "user_id",
+    "amount",
+    "merchant",
+    "category",
+    "city",
+    "status",
+    "payment_method",
+    "currency",
+)
+# `json.dumps(record)` layout with every value pre-serialised (see `TransactionBatch.to_json`).
+_JSON_TEMPLATE = "{" + ", ".join(f'"{name}": %s' for name in FIELDS) + "}"
+
+_HEX_PAIRS = np.array([[ord(c) for c in f"{i:02x}"] for i in range(256)], dtype=np.uint8)
+_US_PER_DAY = 86_400_000_000
+
+
+def generate_transaction() -> Dict[str, Any]:
+    """Generate a synthetic transaction payload."""
+    amount = round(random.uniform(AMOUNT_MIN, AMOUNT_MAX), 2)
+    created_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "transaction_id": str(uuid.uuid4()),
+        "event_ts": created_at,
+        "user_id": random.randint(USER_ID_MIN, USER_ID_MAX),
+        "amount": amount,
+        "merchant": random.choice(MERCHANTS),
+        "category": random.choice(CATEGORIES),
+        "city": random.choice(CITIES),
+        "status": random.choices(STATUSES, weights=STATUS_WEIGHTS)[0],
+        "payment_method": random.choice(PAYMENT_METHODS),
+        "currency": CURRENCY,
+    }
+
+
+@dataclass
+class TransactionBatch:
+    """Columnar batch of synthetic transactions (one NumPy array per field)."""
+
+    transaction_id: np.ndarray
+    event_ts_us: np.ndarray
+    user_id: np.ndarray
+    amount: np.ndarray
+    merchant: np.ndarray
+    category: np.ndarray
+    city: np.ndarray
+    status: np.ndarray
+    payment_method: np.ndarray
+    currency: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.transaction_id)
+
+    @property
+    def event_ts(self) -> np.ndarray:
+        """ISO-8601 timestamps, formatted like `datetime.isoformat()` in UTC."""
+        return _isoformat_column(self.event_ts_us)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Return the batch as an ordered mapping of payload field -> column."""
+        return {
+            "transaction_id": self.transaction_id,
+            "event_ts": self.event_ts,
+            "user_id": self.user_id,
+            "amount": self.amount,
+            "merchant": self.merchant,
+            "category": self.category,
+            "city": self.city,
+            "status": self.status,
+            "payment_method": self.payment_method,
+            "currency": self.currency,
+        }
+
+    def take(self, indices: np.ndarray) -> "TransactionBatch":
+        """Return the rows at `indices` (a permutation, mask or subset) as a new batch."""
+        return TransactionBatch(**{name: values[indices] for name, values in vars(self).items()})
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materialise the batch as payload dicts, as produced by `generate_transaction`."""
+        columns = [column.tolist() for column in self.columns().values()]
+        return [dict(zip(FIELDS, row)) for row in zip(*columns)]
+
+    def to_json(self) -> List[str]:
+        """Serialise each row exactly as `json.dumps(record)` would, without building dicts.
+
+        String columns have few distinct values, so each one is JSON-quoted
+        once and the rows are filled into a `%`-template.
+        """
+        columns = []
+        for column in self.columns().values():
+            values = column.tolist()
+            if column.dtype.kind == "U":
+                quoted = {value: json.dumps(value) for value in set(values)}
+                values = [quoted[value] for value in values]
+            columns.append(values)
+        return [_JSON_TEMPLATE % row for row in zip(*columns)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the batch as a DataFrame with the payload columns."""
+        return pd.DataFrame(self.columns())
+
+
+def _as_text(chars: np.ndarray) -> np.ndarray:
+    """View a `(n, width)` array of UCS-4 code points as `n` fixed-width strings."""
+    return chars.view(f"U{chars.shape[1]}").ravel()
+
+
+def _uuid4_column(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Draw `n` random (version 4) UUIDs and format them as canonical strings."""
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = _HEX_PAIRS[raw].reshape(n, 32)
+
+    chars = np.full((n, 36), ord("-"), dtype=np.uint8)
+    chars[:, 0:8] = hexed[:, 0:8]
+    chars[:, 9:13] = hexed[:, 8:12]
+    chars[:, 14:18] = hexed[:, 12:16]
+    chars[:, 19:23] = hexed[:, 16:20]
+    chars[:, 24:36] = hexed[:, 20:32]
+    return _as_text(chars.astype(np.uint32))
+
+
+def _put_digits(chars: np.ndarray, column: int, values: np.ndarray, width: int) -> None:
+    for position in range(column + width - 1, column - 1, -1):
+        values, digit = np.divmod(values, 10)
+        chars[:, position] = ord("0") + digit
+
+
+def _isoformat_column(event_ts_us: np.ndarray) -> np.ndarray:
+    """Format epoch microseconds as `YYYY-MM-DDTHH:MM:SS.ffffff+00:00` strings.
+
+    Only the (few) days covered go through `np.datetime_as_string`; the
+    time of day is written digit by digit with integer arithmetic.
+    """
+    if len(event_ts_us) == 0:
+        return np.empty(0, dtype="U32")
+    days, micros = np.divmod(event_ts_us.astype(np.int64), _US_PER_DAY)
+    first_day = days.min()
+    day_range = np.arange(first_day, days.max() + 1).astype("datetime64[D]")
+    day_text = np.datetime_as_string(day_range).astype("U10")
+
+    chars = np.empty((len(event_ts_us), 32), dtype=np.uint32)
+    chars[:, 0:10] = day_text.view(np.uint32).reshape(-1, 10)[days - first_day]
+    seconds, fraction = np.divmod(micros, 1_000_000)
+    hours, seconds = np.divmod(seconds, 3_600)
+    minutes, seconds = np.divmod(seconds, 60)
+    chars[:, 10] = ord("T")
+    _put_digits(chars, 11, hours, 2)
+    chars[:, 13] = ord(":")
+    _put_digits(chars, 14, minutes, 2)
+    chars[:, 16] = ord(":")
+    _put_digits(chars, 17, seconds, 2)
+    chars[:, 19] = ord(".")
+    _put_digits(chars, 20, fraction, 6)
+    chars[:, 26:32] = [ord(c) for c in "+00:00"]
+    return _as_text(chars)
+
+
+def _pick(rng: np.random.Generator, values: List[str], n: int, p: Optional[Sequence[float]] = None) -> np.ndarray:
+    codes = rng.choice(len(values), size=n, p=p)
+    return np.asarray(values)[codes]
+
+
+def generate_batch(
+    n: int,
+    seed: Optional[int] = None,
+    *,
+    rng: Optional[np.random.Generator] = None,
+    start: Optional[datetime] = None,
+    span_seconds: float = 0.0,
+    user_id_range: Tuple[int, int] = (USER_ID_MIN, USER_ID_MAX),
+    user_weights: Optional[np.ndarray] = None,
+    merchant_weights: Optional[Sequence[float]] = None,
+    category_weights: Optional[Sequence[float]] = None,
+) -> TransactionBatch:
+    """Generate `n` synthetic transactions column by column.
+
+    Either `seed` or an existing `rng` drives the draws, so long-running
+    producers can keep one generator across batches. Timestamps are drawn
+    uniformly in `[start, start + span_seconds]` (default: now) and user ids
+    in the inclusive `user_id_range`. User ids, merchants and categories are
+    uniform unless probability weights are given (`user_weights[i]` is the
+    weight of user `user_id_range[0] + i`), which is how skewed scenarios
+    are modelled.
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    if start is None:
+        start = datetime.now(timezone.utc)
+    start_us = int(start.timestamp() * 1_000_000)
+
+    if span_seconds > 0:
+        offsets = rng.integers(0, int(span_seconds * 1_000_000), size=n, endpoint=True)
+        event_ts_us = start_us + offsets
+    else:
+        event_ts_us = np.full(n, start_us, dtype=np.int64)
+
+    return TransactionBatch(
+        transaction_id=_uuid4_column(rng, n),
+        event_ts_us=event_ts_us.astype(np.int64),
+        user_id=(
+            rng.integers(user_id_range[0], user_id_range[1], size=n, endpoint=True)
+            if user_weights is None
+            else user_id_range[0] + rng.choice(len(user_weights), size=n, p=user_weights)
+        ),
+        amount=np.round(rng.uniform(AMOUNT_MIN, AMOUNT_MAX, size=n), 2),
+        merchant=_pick(rng, MERCHANTS, n, p=merchant_weights),
+        category=_pick(rng, CATEGORIES, n, p=category_weights),
+        city=_pick(rng, CITIES, n),
+        status=_pick(rng, STATUSES, n, p=STATUS_WEIGHTS),
+        payment_method=_pick(rng, PAYMENT_METHODS, n),
+        currency=np.full(n, CURRENCY),
+    )
+
+
+def iter_batches(
+    rows: Optional[int],
+    limiter: Any,
+    rng: np.random.Generator,
+    chunk_size: int = 10_000,
+    **batch_options: Any,
+) -> Iterator[TransactionBatch]:
+    """Yield freshly generated batches as `limiter` releases tokens.
+
+    `limiter` is a `common.rate_limit.TokenBucket`; generation stops after
+    `rows` events (never when `rows` is None).
+    """
+    produced = 0
+    while rows is None or produced < rows:
+        wanted = chunk_size if rows is None else min(chunk_size, rows - produced)
+        size = limiter.acquire(wanted)
+        produced += size
+        yield generate_batch(size, rng=rng, **batch_options)
@@ -0,0 +1,175 @@
+"""
+Catch-up reading of large file-queue backlogs: memory-mapped, parallel, columnar.
+
+The unread part of the queue is split into newline-aligned byte ranges
+(`plan_chunks` only touches the pages around each cut, through `mmap`).
+Worker processes memory-map the file again, parse their range with
+pyarrow's multithreaded JSON reader and send back an Arrow table, so no
+per-record dicts are ever built. `iter_parsed` yields the results in file
+order with a bounded number of chunks in flight, which lets the caller load
+and checkpoint chunk by chunk while the next ones are parsed.
+
+A chunk that pyarrow rejects (malformed line, type change) is bisected by
+`common.arrow_batch.decode_lines`; only the offending lines are set aside, in
+`ParsedChunk.invalid`.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from common.arrow_batch import decode_lines, transaction_schema
+from common.file_queue import QueuePosition
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ChunkSpec:
+    """Newline-aligned byte range `[start, end)` of a queue file."""
+
+    path: Path
+    start: int
+    end: int
+
+
+@dataclass
+class ParsedChunk:
+    spec: ChunkSpec
+    table: Any  # pyarrow.Table
+    lines: int  # newline-terminated lines in the range, including blank/invalid ones
+    # Lines rejected by the line-by-line fallback: (line number within the chunk, raw line, error).
+    invalid: List[Tuple[int, bytes, str]] = field(default_factory=list)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.json as pa_json
+    except ImportError as exc:
+        raise ImportError("Catch-up parsing requires `pip install pyarrow`.") from exc
+    return pa, pa_json
+
+
+def plan_chunks(path: Path, start: int = 0, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[ChunkSpec]:
+    """Cut `path` from byte `start` into ~`chunk_bytes` ranges ending on a newline.
+
+    Bytes after the last newline (a line still being written) are left out.
+    """
+    size = path.stat().st_size
+    if size <= start:
+        return []
+    chunks: List[ChunkSpec] = []
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        last_newline = mapped.rfind(b"\n", start)
+        end_of_data = last_newline + 1
+        position = start
+        while position < end_of_data:
+            cut = min(position + chunk_bytes, end_of_data)
+            if cut < end_of_data:
+                newline = mapped.find(b"\n", cut - 1)
+                cut = newline + 1
+            chunks.append(ChunkSpec(path, position, cut))
+            position = cut
+    return chunks
+
+
+def parse_chunk(spec: ChunkSpec) -> ParsedChunk:
+    """Parse one byte range into an Arrow table (runs in a worker process)."""
+    pa, pa_json = _pyarrow()
+    with pa.memory_map(str(spec.path)) as source:
+        source.seek(spec.start)
+        buffer = source.read_buffer(spec.end - spec.start)  # zero-copy view of the mapping
+    lines = int(np.count_nonzero(np.frombuffer(buffer, dtype=np.uint8) == ord("\n")))
+    schema = transaction_schema()
+    try:
+        table = pa_json.read_json(
+            pa.BufferReader(buffer),
+            parse_options=pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore"),
+        )
+    except pa.ArrowInvalid as exc:
+        LOGGER.warning("Chunk %s[%s:%s] is not clean JSONL (%s), isolating the bad lines", spec.path, spec.start, spec.end, exc)
+        decoded = decode_lines(buffer.to_pybytes().splitlines())
+        for number, _, error in decoded.invalid:
+            LOGGER.error("Invalid JSON in %s at byte %s (+%s lines): %s", spec.path, spec.start, number, error)
+        return ParsedChunk(spec=spec, table=decoded.table, lines=lines, invalid=decoded.invalid)
+    return ParsedChunk(spec=spec, table=table, lines=lines)
+
+
+def iter_parsed(chunks: List[ChunkSpec], workers: Optional[int] = None) -> Iterator[ParsedChunk]:
+    """Parse `chunks` in a process pool and yield them in order, at most 2 x workers in flight."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        for spec in chunks:
+            yield parse_chunk(spec)
+        return
+    with multiprocessing.get_context().Pool(workers) as pool:
+        pending: Deque[Any] = deque()
+        remaining = iter(chunks)
+        for spec in remaining:
+            pending.append(pool.apply_async(parse_chunk, (spec,)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            result = pending.popleft().get()
+            spec = next(remaining, None)
+            if spec is not None:
+                pending.append(pool.apply_async(parse_chunk, (spec,)))
+            yield result
+
+
+def chunk_lines(chunk: ParsedChunk) -> List[bytes]:
+    """Raw lines behind the rows of `chunk.table`, in order (blank and invalid lines left out).
+
+    Read again in the calling process, from the page cache the workers just
+    filled, for loaders that keep the original payload (`common.arrow_batch`).
+    """
+    spec = chunk.spec
+    with spec.path.open("rb") as f:
+        f.seek(spec.start)
+        data = f.read(spec.end - spec.start)
+    invalid = {number for number, _, _ in chunk.invalid}
+    return [line for number, line in enumerate(data.splitlines()) if line.strip() and number not in invalid]
+
+
+def advance(position: QueuePosition, chunk: ParsedChunk) -> QueuePosition:
+    """Queue position right after `chunk` (byte offset in its file, line or log offset)."""
+    return QueuePosition(offset=chunk.spec.end, line=position.line + chunk.lines)
+
+
+def plan_log_chunks(
+    directory: Path,
+    position: QueuePosition,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> Tuple[List[ChunkSpec], int]:
+    """`plan_chunks` over the segments of a segmented log from log offset `position.line`.
+
+    Returns the chunks and the log offset of the first one (retention may
+    have moved it past `position.line`).
+    """
+    from common.segmented_log import DATA_SUFFIX, SegmentedLogReader, list_segments, segment_name
+
+    segments = list_segments(directory)
+    offset = max(position.line, segments[0]) if segments else position.line
+    located = SegmentedLogReader(directory)._locate(offset)
+    if located is None:
+        return [], offset
+    first_base, start = located
+    chunks: List[ChunkSpec] = []
+    for base in segments:
+        if base < first_base:
+            continue
+        data = directory / f"{segment_name(base)}{DATA_SUFFIX}"
+        chunks.extend(plan_chunks(data, start if base == first_base else 0, chunk_bytes))
+    return chunks, offset
@@ -0,0 +1,309 @@
+"""
+Partitioned file queue and file-based consumer groups.
+
+A partitioned queue is a directory with one queue per partition, a plain
+JSONL file or a segmented log (see `common.segmented_log`)::
+
+    data/queue/transactions/
+        partitions.json          {"partitions": 4, "partition_key": "user_id"}
+        partition-00000.jsonl    (or partition-00000/ with segments)
+        partition-00001.jsonl
+        ...
+
+Records are routed with `common.partitioning.assign_partitions`, the same
+crc32 hash as the Kafka producer, so a key always lands on the same
+partition. Unkeyed records are spread round-robin.
+
+Consumers sharing a group name split the partitions between them, as in a
+Kafka consumer group. Every member refreshes a heartbeat file; the live
+members, sorted by id, get the partitions round-robin, so a join or a leave
+(or a heartbeat older than the session timeout) changes everybody's
+assignment at their next heartbeat. Ownership itself is a lock file per
+partition, created exclusively: a member only releases a partition between
+two batches, after committing its offset, and only claims one that is
+unlocked or whose owner's heartbeat expired. Offsets are checkpointed per
+partition by the loader.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from common.file_queue import DurabilityPolicy, GroupCommitWriter
+from common.generator import TransactionBatch
+from common.partitioning import PARTITION_KEYS, assign_partitions
+from common.segmented_log import SegmentedLogWriter
+
+LOGGER = logging.getLogger(__name__)
+
+METADATA_FILE = "partitions.json"
+GROUPS_DIR = "_groups"
+DEFAULT_SESSION_TIMEOUT_S = 10.0
+
+
+def partition_path(directory: Path, partition: int, segmented: bool = False) -> Path:
+    """Queue of `partition`: `partition-NNNNN.jsonl`, or a segment directory."""
+    name = f"partition-{partition:05d}"
+    return directory / (name if segmented else f"{name}.jsonl")
+
+
+def read_metadata(directory: Path) -> Optional[Dict[str, Any]]:
+    """Partition count and key of a partitioned queue, or None if `directory` is not one."""
+    path = directory / METADATA_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def is_partitioned(path: Path) -> bool:
+    return path.is_dir() and (path / METADATA_FILE).exists()
+
+
+def partition_paths(directory: Path) -> List[Path]:
+    """Queue path of every partition, in partition order."""
+    metadata = read_metadata(directory)
+    if metadata is None:
+        raise ValueError(f"{directory} is not a partitioned queue (no {METADATA_FILE})")
+    return [partition_path(directory, p, metadata.get("segmented", False)) for p in range(metadata["partitions"])]
+
+
+class PartitionedQueueWriter:
+    """Route each record to the writer of its partition."""
+
+    def __init__(
+        self,
+        directory: Path,
+        num_partitions: int,
+        partition_key: str = "user_id",
+        policy: Optional[DurabilityPolicy] = None,
+        segment_bytes: int = 0,
+    ) -> None:
+        if num_partitions < 1:
+            raise ValueError("num_partitions must be at least 1")
+        if partition_key not in PARTITION_KEYS:
+            raise ValueError(f"Unknown partition key {partition_key!r}, expected one of {PARTITION_KEYS}")
+        directory.mkdir(parents=True, exist_ok=True)
+        metadata = {"partitions": num_partitions, "partition_key": partition_key, "segmented": segment_bytes > 0}
+        existing = read_metadata(directory)
+        if existing is not None and existing != metadata:
+            # Changing the count or key would move keys to other partitions behind the consumers' offsets.
+            raise ValueError(f"{directory} already holds a queue with {existing}, refusing to reopen it with {metadata}")
+        if existing is None:
+            (directory / METADATA_FILE).write_text(json.dumps(metadata), encoding="utf-8")
+        self.directory = directory
+        self.num_partitions = num_partitions
+        self.partition_key = partition_key
+        self._writers: List[GroupCommitWriter] = [
+            SegmentedLogWriter(partition_path(directory, p, True), policy, segment_bytes=segment_bytes)
+            if segment_bytes > 0
+            else GroupCommitWriter(partition_path(directory, p), policy)
+            for p in range(num_partitions)
+        ]
+        self._next_round_robin = 0
+
+    def write_batch(self, batch: TransactionBatch) -> None:
+        """Serialize `batch` once and append each partition's rows as one block."""
+        if self.partition_key == "none":
+            partitions = (np.arange(len(batch)) + self._next_round_robin) % self.num_partitions
+            self._next_round_robin = (self._next_round_robin + len(batch)) % self.num_partitions
+        else:
+            partitions = assign_partitions(getattr(batch, self.partition_key), self.num_partitions)
+        lines = batch.to_json()
+        order = np.argsort(partitions, kind="stable")
+        bounds = np.searchsorted(partitions[order], np.arange(self.num_partitions + 1))
+        for partition, writer in enumerate(self._writers):
+            rows = order[bounds[partition]:bounds[partition + 1]]
+            if len(rows):
+                writer.write_lines([lines[row] for row in rows.tolist()])
+
+    @property
+    def flushes(self) -> int:
+        return sum(writer.flushes for writer in self._writers)
+
+    @property
+    def fsyncs(self) -> int:
+        return sum(writer.fsyncs for writer in self._writers)
+
+    def close(self) -> None:
+        for writer in self._writers:
+            writer.close()
+
+    def __enter__(self) -> "PartitionedQueueWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def default_member_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ConsumerGroup:
+    """Membership and partition ownership of one consumer in a group."""
+
+    def __init__(
+        self,
+        directory: Path,
+        group: str,
+        member_id: Optional[str] = None,
+        session_timeout_s: float = DEFAULT_SESSION_TIMEOUT_S,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = directory
+        self.group = group
+        self.member_id = member_id or default_member_id()
+        self.session_timeout_s = session_timeout_s
+        self._clock = clock
+        self._paths = partition_paths(directory)
+        root = directory / GROUPS_DIR / group
+        self._members_dir = root / "members"
+        self._locks_dir = root / "locks"
+        self._members_dir.mkdir(parents=True, exist_ok=True)
+        self._locks_dir.mkdir(parents=True, exist_ok=True)
+        self.owned: List[int] = []
+        # Assigned partitions still locked by their previous owner.
+        self.waiting: List[int] = []
+        self._members: List[str] = []
+        self._last_heartbeat = float("-inf")
+
+    def _member_file(self, member_id: str) -> Path:
+        return self._members_dir / f"{member_id}.member"
+
+    def _lock_file(self, partition: int) -> Path:
+        return self._locks_dir / f"partition-{partition:05d}.lock"
+
+    def live_members(self) -> List[str]:
+        """Members whose heartbeat is younger than the session timeout, sorted."""
+        now = self._clock()
+        members = []
+        for path in self._members_dir.glob("*.member"):
+            try:
+                if now - path.stat().st_mtime <= self.session_timeout_s:
+                    members.append(path.stem)
+            except FileNotFoundError:
+                continue  # left the group meanwhile
+        return sorted(members)
+
+    def assignment(self, members: List[str]) -> List[int]:
+        """Round-robin share of the partitions for this member among `members`."""
+        if self.member_id not in members:
+            return []
+        rank = members.index(self.member_id)
+        return list(range(rank, len(self._paths), len(members)))
+
+    def _lock_owner(self, partition: int) -> Optional[str]:
+        try:
+            return self._lock_file(partition).read_text(encoding="utf-8") or None
+        except FileNotFoundError:
+            return None
+
+    def _try_claim(self, partition: int, members: List[str]) -> bool:
+        lock = self._lock_file(partition)
+        owner = self._lock_owner(partition)
+        if owner == self.member_id:
+            return True
+        if owner is not None:
+            if owner in members:
+                return False  # still owned by a live member, which releases it at its next heartbeat
+            if not self._remove_expired_lock(partition, owner):
+                return False
+            LOGGER.warning("Took over partition %s from expired member %s", partition, owner)
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False  # another member won the race
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.member_id)
+        return True
+
+    def _remove_expired_lock(self, partition: int, expired_owner: str) -> bool:
+        """Remove the lock of `partition` if it still names `expired_owner`.
+
+        Unlinking after reading the owner would race: another member may
+        have taken the lock over in between, and its fresh lock would be
+        deleted. The lock is renamed aside instead, which only one member
+        can do, and put back if it no longer names the expired owner.
+        """
+        lock = self._lock_file(partition)
+        aside = lock.with_name(f"{lock.name}.{self.member_id}.expired")
+        try:
+            os.rename(lock, aside)
+        except FileNotFoundError:
+            return True  # already removed by another member; the exclusive create decides
+        if aside.read_text(encoding="utf-8") != expired_owner:
+            try:
+                os.link(aside, lock)
+            except FileExistsError:
+                pass  # a third member locked it meanwhile; the previous owner sees it in `still_owns`
+            aside.unlink()
+            return False
+        aside.unlink()
+        return True
+
+    def _release(self, partition: int) -> None:
+        if self._lock_owner(partition) == self.member_id:
+            self._lock_file(partition).unlink(missing_ok=True)
+
+    def heartbeat(self, interval_s: float = 0.0) -> List[int]:
+        """Refresh membership, rebalance if needed and return the owned partitions.
+
+        Call it between batches, once the offsets of the owned partitions are
+        committed: partitions leaving this member's assignment are released
+        right away. `interval_s` skips the work if the last heartbeat is more
+        recent than that.
+        """
+        now = self._clock()
+        if now - self._last_heartbeat < interval_s:
+            return self.owned
+        self._last_heartbeat = now
+        member_file = self._member_file(self.member_id)
+        member_file.touch()
+        os.utime(member_file, (now, now))
+        members = self.live_members()
+        target = self.assignment(members)
+        for partition in self.owned:
+            if partition not in target:
+                self._release(partition)
+        owned = [partition for partition in target if self._try_claim(partition, members)]
+        waiting = [partition for partition in target if partition not in owned]
+        if owned != self.owned or members != self._members:
+            LOGGER.info(
+                "Group %s rebalanced: %s member(s), %s owns partitions %s (waiting for %s)",
+                self.group,
+                len(members),
+                self.member_id,
+                owned,
+                waiting,
+            )
+        self.owned, self.waiting, self._members = owned, waiting, members
+        return owned
+
+    def still_owns(self, partition: int) -> bool:
+        """Whether the lock of `partition` still names this member (checked before each load)."""
+        return self._lock_owner(partition) == self.member_id
+
+    def path(self, partition: int) -> Path:
+        return self._paths[partition]
+
+    def leave(self) -> None:
+        """Release every partition and leave the group, triggering a rebalance for the others."""
+        for partition in self.owned:
+            self._release(partition)
+        self.owned = []
+        self._member_file(self.member_id).unlink(missing_ok=True)
+        LOGGER.info("%s left group %s", self.member_id, self.group)
+
+    def __enter__(self) -> "ConsumerGroup":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.leave()
@@ -0,0 +1,229 @@
+"""
+Bulk loading into Postgres: `COPY` into a staging table, then a set-based merge.
+
+`copy_merge` streams a CSV batch (header line, `STAGING_COLUMNS`) into a
+temporary staging table with `COPY ... FROM STDIN`, then fills
+`raw_transactions` and `transactions_flat` with one `INSERT ... SELECT` each,
+all in the caller's transaction. Rows a batch repeats under the same
+conflict key, (transaction_id, event_ts) or (transaction_id, event_date), are
+collapsed first, keeping the first for `raw_transactions` (`DO NOTHING`) and
+the last for `transactions_flat` (upsert), as the row-by-row inserts would.
+The same id on another key is another row (see `common.pg_partitions`).
+
+`copy_raw_and_derive` and `stage_raw_and_derive` are the raw-only variants:
+the batch carries only the `raw_transactions` columns and is staged in
+`RAW_STAGING_TABLE` (by `COPY`, or by a parameterized insert). The raw rows
+are merged from there, and `transactions_flat` is derived from the same
+staged JSONB by `DERIVE_FLAT_SQL` (bucket, date, hour and weekday computed in
+SQL, UTC as in `common.transform`), in the same transaction. Deriving from
+the staged rows rather than the stored ones keeps the latest version of a
+re-sent transaction, as `MERGE_FLAT_SQL` does, while `raw_transactions`
+keeps the first.
+
+Works with psycopg2 (`copy_expert`) and psycopg 3 (`cursor.copy`).
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from common.transform import AMOUNT_BUCKET_EDGES, AMOUNT_BUCKETS
+
+LOGGER = logging.getLogger(__name__)
+
+STAGING_TABLE = "transactions_staging"
+STAGING_COLUMNS = (
+    "transaction_id",
+    "event_ts",
+    "event_date",
+    "event_hour",
+    "event_dayofweek",
+    "user_id",
+    "amount",
+    "amount_bucket",
+    "merchant",
+    "category",
+    "city",
+    "status",
+    "payment_method",
+    "currency",
+    "ingested_at",
+    "payload",
+)
+_FLAT_COLUMNS = STAGING_COLUMNS[:-1]
+# The conflict targets include the partition keys (see `common.pg_partitions`).
+_FLAT_UPDATES = ", ".join(
+    f"{column} = EXCLUDED.{column}" for column in _FLAT_COLUMNS if column not in ("transaction_id", "event_date")
+)
+
+STAGING_DDL = f"""
+CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+    seq BIGINT GENERATED ALWAYS AS IDENTITY,
+    transaction_id UUID NOT NULL,
+    event_ts TIMESTAMPTZ NOT NULL,
+    event_date DATE NOT NULL,
+    event_hour SMALLINT NOT NULL,
+    event_dayofweek TEXT NOT NULL,
+    user_id BIGINT NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    amount_bucket TEXT NOT NULL,
+    merchant TEXT,
+    category TEXT,
+    city TEXT,
+    status TEXT,
+    payment_method TEXT,
+    currency TEXT,
+    ingested_at TIMESTAMPTZ NOT NULL,
+    payload JSONB NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+MERGE_RAW_SQL = f"""
+INSERT INTO raw_transactions (transaction_id, event_ts, payload, ingested_at)
+SELECT DISTINCT ON (transaction_id, event_ts) transaction_id, event_ts, payload, ingested_at
+FROM {STAGING_TABLE}
+ORDER BY transaction_id, event_ts, seq
+ON CONFLICT (transaction_id, event_ts) DO NOTHING
+"""
+
+MERGE_FLAT_SQL = f"""
+INSERT INTO transactions_flat ({", ".join(_FLAT_COLUMNS)})
+SELECT DISTINCT ON (transaction_id, event_date) {", ".join(_FLAT_COLUMNS)}
+FROM {STAGING_TABLE}
+ORDER BY transaction_id, event_date, seq DESC
+ON CONFLICT (transaction_id, event_date) DO UPDATE
+SET {_FLAT_UPDATES}
+"""
+
+
+def copy_into(conn: Connection, table: str, columns: Tuple[str, ...], csv_data: bytes, null: str = "") -> None:
+    """`COPY table (columns) FROM STDIN` with a CSV payload that has a header line.
+
+    `null` is the unquoted field that stands for NULL (empty by default).
+    """
+    null_literal = null.replace("'", "''")
+    statement = (
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN "
+        f"WITH (FORMAT csv, HEADER true, NULL '{null_literal}')"
+    )
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(statement, io.BytesIO(csv_data))
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(csv_data)
+    finally:
+        cursor.close()
+
+
+def copy_merge(conn: Connection, csv_data: bytes, null: str = "") -> Tuple[int, int]:
+    """Load a CSV batch through the staging table; returns (raw inserted, flat upserted)."""
+    conn.execute(text(STAGING_DDL))
+    copy_into(conn, STAGING_TABLE, STAGING_COLUMNS, csv_data, null)
+    raw_count = conn.execute(text(MERGE_RAW_SQL)).rowcount
+    flat_count = conn.execute(text(MERGE_FLAT_SQL)).rowcount
+    # ON COMMIT DELETE ROWS empties the table at commit; this covers several batches in one transaction.
+    conn.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+    return raw_count, flat_count
+
+
+RAW_STAGING_TABLE = "raw_transactions_staging"
+RAW_STAGING_COLUMNS = ("transaction_id", "event_ts", "ingested_at", "payload")
+
+RAW_STAGING_DDL = f"""
+CREATE TEMPORARY TABLE IF NOT EXISTS {RAW_STAGING_TABLE} (
+    seq BIGINT GENERATED ALWAYS AS IDENTITY,
+    transaction_id UUID NOT NULL,
+    event_ts TIMESTAMPTZ NOT NULL,
+    ingested_at TIMESTAMPTZ NOT NULL,
+    payload JSONB NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+MERGE_RAW_ONLY_SQL = f"""
+INSERT INTO raw_transactions (transaction_id, event_ts, payload, ingested_at)
+SELECT DISTINCT ON (transaction_id, event_ts) transaction_id, event_ts, payload, ingested_at
+FROM {RAW_STAGING_TABLE}
+ORDER BY transaction_id, event_ts, seq
+ON CONFLICT (transaction_id, event_ts) DO NOTHING
+"""
+
+
+def _amount_bucket_sql(amount: str) -> str:
+    """CASE expression equivalent to `common.transform.amount_bucket_codes`."""
+    whens = " ".join(
+        f"WHEN {amount} < {int(edge)} THEN '{bucket}'" for edge, bucket in zip(AMOUNT_BUCKET_EDGES, AMOUNT_BUCKETS)
+    )
+    return f"CASE {whens} ELSE '{AMOUNT_BUCKETS[-1]}' END"
+
+
+DERIVE_FLAT_SQL = f"""
+INSERT INTO transactions_flat ({", ".join(_FLAT_COLUMNS)})
+SELECT DISTINCT ON (transaction_id, event_date) {", ".join(_FLAT_COLUMNS)}
+FROM (
+    SELECT
+        s.seq,
+        s.transaction_id,
+        s.event_ts,
+        (s.event_ts AT TIME ZONE 'UTC')::date AS event_date,
+        EXTRACT(HOUR FROM s.event_ts AT TIME ZONE 'UTC')::smallint AS event_hour,
+        to_char(s.event_ts AT TIME ZONE 'UTC', 'FMDay') AS event_dayofweek,
+        (s.payload->>'user_id')::bigint AS user_id,
+        (s.payload->>'amount')::numeric AS amount,
+        {_amount_bucket_sql("(s.payload->>'amount')::numeric")} AS amount_bucket,
+        s.payload->>'merchant' AS merchant,
+        s.payload->>'category' AS category,
+        s.payload->>'city' AS city,
+        s.payload->>'status' AS status,
+        s.payload->>'payment_method' AS payment_method,
+        s.payload->>'currency' AS currency,
+        s.ingested_at
+    FROM {RAW_STAGING_TABLE} s
+) staged
+ORDER BY transaction_id, event_date, seq DESC
+ON CONFLICT (transaction_id, event_date) DO UPDATE
+SET {_FLAT_UPDATES}
+"""
+
+STAGE_RAW_SQL = f"""
+INSERT INTO {RAW_STAGING_TABLE} (transaction_id, event_ts, ingested_at, payload)
+VALUES (:transaction_id, :event_ts, :ingested_at, CAST(:payload AS JSONB))
+"""
+
+
+def merge_raw_and_derive(conn: Connection) -> Tuple[int, int]:
+    """Merge the staged raw rows, derive their flat rows, then empty the staging table.
+
+    One flat row per (transaction_id, event_date), from the last staged
+    version: a conflict key never appears twice in the upsert. Returns (raw
+    inserted, flat upserted).
+    """
+    raw_count = conn.execute(text(MERGE_RAW_ONLY_SQL)).rowcount
+    flat_count = conn.execute(text(DERIVE_FLAT_SQL)).rowcount
+    conn.execute(text(f"TRUNCATE {RAW_STAGING_TABLE}"))
+    return raw_count, flat_count
+
+
+def copy_raw_and_derive(conn: Connection, csv_data: bytes, null: str = "") -> Tuple[int, int]:
+    """Load a raw-only CSV batch (`RAW_STAGING_COLUMNS`), then derive its flat rows in SQL.
+
+    Returns (raw inserted, flat upserted).
+    """
+    conn.execute(text(RAW_STAGING_DDL))
+    copy_into(conn, RAW_STAGING_TABLE, RAW_STAGING_COLUMNS, csv_data, null)
+    return merge_raw_and_derive(conn)
+
+
+def stage_raw_and_derive(conn: Connection, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Same as `copy_raw_and_derive`, staging `rows` (dicts keyed by `RAW_STAGING_COLUMNS`) with an insert."""
+    if not rows:
+        return 0, 0
+    conn.execute(text(RAW_STAGING_DDL))
+    conn.execute(text(STAGE_RAW_SQL), rows)
+    return merge_raw_and_derive(conn)
@@ -0,0 +1,208 @@
+"""
+Daily range partitions of `raw_transactions` and `transactions_flat`.
+
+`sql/schema.sql` declares both tables `PARTITION BY RANGE`, on `event_ts`
+and `event_date` respectively. Each has one partition per UTC day, named
+`<table>_pYYYYMMDD`, plus a `<table>_default` partition that catches rows
+outside every range.
+
+`maintain_partitions` is called by the ETL (`consumers/kafka_to_postgres.py`)
+and by the Airflow DAG. It:
+
+* creates the partitions of the next `ahead_days` days before any row
+  reaches them. If the default partition already holds rows of such a day,
+  they are moved into the new partition, which is then attached;
+* removes, per table, the partitions older than a retention in days. A
+  partition is dropped (`DROP TABLE`) or, with `detach`, detached and kept
+  as a standalone table for archiving. Both are catalogue operations, not a
+  `DELETE` of the rows. Rows that landed in the default partition are never
+  expired.
+
+The catalogue is read first and DDL only runs when a partition is missing
+or expired, about once a day.
+
+The primary keys include the partition keys: (transaction_id, event_ts)
+and (transaction_id, event_date). `transaction_id` alone is no longer
+unique, and a transaction re-sent with an `event_ts` on another day is
+stored as a second row in each table. The loaders' `ON CONFLICT` targets
+are these keys, so they fail on every insert against a database created
+before partitioning: `check_partitioned` raises at startup instead, with a
+pointer to `sql/migrate_to_partitions.sql`, which converts it.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+LOGGER = logging.getLogger(__name__)
+
+# Partitioned table -> partition key column.
+PARTITIONED_TABLES = {"raw_transactions": "event_ts", "transactions_flat": "event_date"}
+DEFAULT_AHEAD_DAYS = 7
+RETENTION_MODES = ("drop", "detach")
+MIGRATION_SCRIPT = "sql/migrate_to_partitions.sql"
+# How long the partition DDL waits for its lock on a parent table before giving up.
+LOCK_TIMEOUT = "5s"
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+def _bounds(table: str, day: date) -> Tuple[str, str]:
+    """SQL literals of the [day, day + 1) range of `table`'s partition key."""
+    if PARTITIONED_TABLES[table] == "event_ts":
+        return f"'{day.isoformat()} 00:00:00+00'", f"'{(day + timedelta(days=1)).isoformat()} 00:00:00+00'"
+    return f"'{day.isoformat()}'", f"'{(day + timedelta(days=1)).isoformat()}'"
+
+
+def _partition_day(table: str, name: str) -> Optional[date]:
+    match = re.match(rf"^{re.escape(table)}_p(\d{{8}})$", name)
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def partition_catalog(conn: Connection) -> Dict[str, Optional[Dict[date, str]]]:
+    """Daily partitions of each table of `PARTITIONED_TABLES`, by day, read in one catalogue query.
+
+    A table that is not partitioned maps to None; the default partition is left out.
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT p.relname, pt.partrelid IS NOT NULL, c.relname
+            FROM pg_class p
+            LEFT JOIN pg_partitioned_table pt ON pt.partrelid = p.oid
+            LEFT JOIN pg_inherits i ON i.inhparent = p.oid
+            LEFT JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE p.oid = ANY(CAST(:tables AS regclass[]))
+            """
+        ),
+        {"tables": list(PARTITIONED_TABLES)},
+    ).all()
+    catalog: Dict[str, Optional[Dict[date, str]]] = {}
+    for table, partitioned, child in rows:
+        if not partitioned:
+            catalog[table] = None
+            continue
+        partitions = catalog.setdefault(table, {})
+        day = _partition_day(table, child) if child else None
+        if partitions is not None and day is not None:
+            partitions[day] = child
+    return catalog
+
+
+def check_partitioned(catalog: Mapping[str, Optional[Mapping[date, str]]]) -> None:
+    """Raise RuntimeError if a table of a `partition_catalog` predates partitioning."""
+    legacy = [table for table in PARTITIONED_TABLES if catalog.get(table) is None]
+    if legacy:
+        raise RuntimeError(
+            f"{', '.join(legacy)} not partitioned: the loads need the primary keys of sql/schema.sql "
+            f"(transaction_id, event_ts) and (transaction_id, event_date). Run {MIGRATION_SCRIPT} first."
+        )
+
+
+def create_partition(conn: Connection, table: str, day: date) -> str:
+    """Create the partition of `day`, moving in the rows the default partition holds for it."""
+    name = partition_name(table, day)
+    key = PARTITIONED_TABLES[table]
+    low, high = _bounds(table, day)
+    default = default_partition(table)
+    stranded = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}).scalar() and conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {key} >= {low} AND {key} < {high})")
+    ).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM ({low}) TO ({high})"))
+        return name
+    # Postgres refuses a new partition while the default one holds rows of its range.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {default} WHERE {key} >= {low} AND {key} < {high} RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """
+        )
+    ).rowcount
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({low}) TO ({high})"))
+    LOGGER.info("Moved %s row(s) from %s into %s", moved, default, name)
+    return name
+
+
+def expire_partition(conn: Connection, table: str, name: str, detach: bool = False) -> None:
+    if detach:
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    else:
+        conn.execute(text(f"DROP TABLE {name}"))
+
+
+def plan_partitions(
+    catalog: Mapping[str, Optional[Mapping[date, str]]],
+    today: date,
+    ahead_days: int = DEFAULT_AHEAD_DAYS,
+    retention_days: Optional[Mapping[str, Optional[int]]] = None,
+) -> Tuple[List[Tuple[str, date]], List[Tuple[str, str]]]:
+    """(table, day) partitions to create and (table, partition) ones to expire, from a `partition_catalog`.
+
+    Raises RuntimeError on tables that are not partitioned (`check_partitioned`).
+    """
+    check_partitioned(catalog)
+    retention_days = retention_days or {}
+    to_create: List[Tuple[str, date]] = []
+    to_expire: List[Tuple[str, str]] = []
+    for table in PARTITIONED_TABLES:
+        partitions = catalog[table] or {}
+        for offset in range(ahead_days + 1):
+            day = today + timedelta(days=offset)
+            if day not in partitions:
+                to_create.append((table, day))
+        keep = retention_days.get(table)
+        if keep is not None:
+            cutoff = today - timedelta(days=keep - 1)
+            to_expire += [(table, name) for day, name in sorted(partitions.items()) if day < cutoff]
+    return to_create, to_expire
+
+
+def maintain_partitions(
+    conn: Connection,
+    ahead_days: int = DEFAULT_AHEAD_DAYS,
+    retention_days: Optional[Mapping[str, Optional[int]]] = None,
+    detach: bool = False,
+    today: Optional[date] = None,
+) -> Tuple[List[str], List[str]]:
+    """Create the partitions up to `today + ahead_days` and expire those past their table's retention.
+
+    `retention_days` maps a table to the number of days kept, today
+    included (None or missing: kept forever). Returns (created, expired).
+
+    The catalogue is read first. When every partition is in place and none
+    has expired, which is every call but about one a day, no DDL is issued
+    and no lock is taken on the tables. Otherwise the DDL runs under
+    `LOCK_TIMEOUT`, so that it gives up rather than queueing the loads
+    behind its lock on a busy table.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    to_create, to_expire = plan_partitions(partition_catalog(conn), today, ahead_days, retention_days)
+    if not to_create and not to_expire:
+        return [], []
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    created = [create_partition(conn, table, day) for table, day in to_create]
+    for table, name in to_expire:
+        expire_partition(conn, table, name, detach)
+    expired = [name for _, name in to_expire]
+    if created:
+        LOGGER.info("Created partition(s): %s", ", ".join(created))
+    if expired:
+        LOGGER.info("%s partition(s): %s", "Detached" if detach else "Dropped", ", ".join(expired))
+    return created, expired
@@ -0,0 +1,222 @@
+"""
+Sparse time and offset index for the JSONL file queue, for fast replay.
+
+Next to `transactions.jsonl`, `transactions.jsonl.timeindex` holds one entry
+every `index_interval_bytes` of data (at a block boundary)::
+
+    line        number of the first record at `offset`
+    offset      byte position of that record
+    max_ts_us   largest event_ts (epoch microseconds) of all records before it
+
+As in Kafka's `.timeindex`, the timestamp is a running maximum, so it stays
+sorted even with late arrivals: every record before the last entry whose
+`max_ts_us` is below T is older than T and can be skipped. `seek_time` and
+`seek_line` binary-search the index, then scan at most one interval, so
+positioning a replay costs O(log n) instead of reading the file from the
+start.
+
+`TimeIndexedWriter` maintains the index while appending. Entries are written
+after the data they point to, and entries past the end of the file are
+dropped on load. A queue written without an index can be indexed once with
+`build_index`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from common.file_queue import DurabilityPolicy, GroupCommitWriter, QueueBatch, QueuePosition, read_batch
+
+LOGGER = logging.getLogger(__name__)
+
+TIME_INDEX_SUFFIX = ".timeindex"
+DEFAULT_INDEX_INTERVAL_BYTES = 64 * 1024
+INDEX_ENTRY = np.dtype([("line", "<u8"), ("offset", "<u8"), ("max_ts_us", "<i8")])
+# Running maximum before the first record.
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + TIME_INDEX_SUFFIX)
+
+
+def event_ts_us(raw: Any) -> int:
+    """`event_ts` of a raw queue line (or record) in epoch microseconds, NO_TIMESTAMP if unusable."""
+    try:
+        record = json.loads(raw) if isinstance(raw, (bytes, str)) else raw
+        value = datetime.fromisoformat(record["event_ts"])
+    except (ValueError, TypeError, KeyError):
+        return NO_TIMESTAMP
+    if value.tzinfo is None:
+        return NO_TIMESTAMP  # naive timestamps cannot be ordered against UTC ones
+    return int(value.timestamp() * 1_000_000)
+
+
+def load_index(path: Path) -> np.ndarray:
+    """Index entries of the queue `path`, without those pointing past its end."""
+    index = index_path(path)
+    if not index.exists():
+        return np.empty(0, INDEX_ENTRY)
+    entries = np.fromfile(index, dtype=INDEX_ENTRY)
+    size = path.stat().st_size if path.exists() else 0
+    return entries[: int(np.searchsorted(entries["offset"], size, side="right"))]
+
+
+@dataclass
+class _ScanState:
+    line: int
+    offset: int
+    max_ts_us: int
+
+
+def _scan(path: Path, state: _ScanState, interval_bytes: int, entries: List[tuple]) -> _ScanState:
+    """Index the complete lines of `path` after `state`, appending new entries to `entries`."""
+    last_entry = entries[-1][1] if entries else None
+    with path.open("rb") as f:
+        f.seek(state.offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            if last_entry is None or state.offset - last_entry >= interval_bytes:
+                entries.append((state.line, state.offset, state.max_ts_us))
+                last_entry = state.offset
+            state.max_ts_us = max(state.max_ts_us, event_ts_us(raw))
+            state.line += 1
+            state.offset += len(raw)
+    return state
+
+
+def build_index(path: Path, interval_bytes: int = DEFAULT_INDEX_INTERVAL_BYTES) -> np.ndarray:
+    """(Re)build the index of an existing queue file with one full scan."""
+    entries: List[tuple] = []
+    _scan(path, _ScanState(0, 0, NO_TIMESTAMP), interval_bytes, entries)
+    index = np.array(entries, dtype=INDEX_ENTRY)
+    index.tofile(index_path(path))
+    LOGGER.info("Indexed %s: %s entries", path, len(index))
+    return index
+
+
+class TimeIndexedWriter(GroupCommitWriter):
+    """`GroupCommitWriter` that also maintains the sparse time/offset index."""
+
+    def __init__(
+        self,
+        path: Path,
+        policy: Optional[DurabilityPolicy] = None,
+        index_interval_bytes: int = DEFAULT_INDEX_INTERVAL_BYTES,
+        **kwargs: Any,
+    ) -> None:
+        self.index_interval_bytes = index_interval_bytes
+        super().__init__(path, policy, **kwargs)
+
+    def _open(self) -> None:
+        super()._open()
+        entries = load_index(self.path)
+        if len(entries):
+            line, offset, max_ts = (int(value) for value in entries[-1])
+            state = _ScanState(line, offset, max_ts)
+            pending: List[tuple] = [tuple(entries[-1])]
+        else:
+            state = _ScanState(0, 0, NO_TIMESTAMP)
+            pending = []
+        # Records appended after the last entry (or by an unindexed writer) are re-scanned.
+        if self.path.stat().st_size > state.offset:
+            state = _scan(self.path, state, self.index_interval_bytes, pending)
+        entries = np.concatenate([entries[:-1] if len(entries) else entries, np.array(pending, dtype=INDEX_ENTRY)])
+        entries.tofile(index_path(self.path))
+        self._index = index_path(self.path).open("ab")
+        self._state = state
+        self._last_entry = int(entries["offset"][-1]) if len(entries) else None
+        self._pending_max_ts = NO_TIMESTAMP
+
+    def write_lines(self, lines: List[str], event_ts: Optional[Sequence[int]] = None) -> None:
+        """Queue serialized records; `event_ts` (epoch microseconds) avoids re-parsing them."""
+        if len(lines):
+            if event_ts is None:
+                event_ts = [event_ts_us(line) for line in lines]
+            self._pending_max_ts = max(self._pending_max_ts, int(np.max(event_ts)))
+        super().write_lines(lines)
+
+    def _write_block(self, lines: List[str]) -> None:
+        state = self._state
+        new_entry = self._last_entry is None or state.offset - self._last_entry >= self.index_interval_bytes
+        super()._write_block(lines)
+        if new_entry:
+            # After the data is flushed: an entry never points past the end of the file.
+            self._index.write(np.array([(state.line, state.offset, state.max_ts_us)], dtype=INDEX_ENTRY).tobytes())
+            self._index.flush()
+            self._last_entry = state.offset
+        state.line += len(lines)
+        state.offset = os.fstat(self._file.fileno()).st_size
+        # In per-record mode the maximum may include records of later blocks: seeks then start earlier, never later.
+        state.max_ts_us = max(state.max_ts_us, self._pending_max_ts)
+        self._pending_max_ts = NO_TIMESTAMP
+
+    def _close_files(self) -> None:
+        super()._close_files()
+        self._index.close()
+
+
+def seek_line(path: Path, line: int) -> QueuePosition:
+    """Position of record number `line` (or the end of the file if it is not written yet)."""
+    entries = load_index(path)
+    slot = int(np.searchsorted(entries["line"], line, side="right")) - 1
+    start = QueuePosition(int(entries["offset"][slot]), int(entries["line"][slot])) if slot >= 0 else QueuePosition()
+    return _scan_forward(path, start, lambda number, _raw: number >= line)
+
+
+def seek_time(path: Path, since: datetime) -> QueuePosition:
+    """Position of the first record whose event_ts is at or after `since`."""
+    target = int(since.timestamp() * 1_000_000)
+    entries = load_index(path)
+    slot = int(np.searchsorted(entries["max_ts_us"], target, side="left")) - 1
+    start = QueuePosition(int(entries["offset"][slot]), int(entries["line"][slot])) if slot >= 0 else QueuePosition()
+    return _scan_forward(path, start, lambda _number, raw: event_ts_us(raw) >= target)
+
+
+def _scan_forward(path: Path, position: QueuePosition, found) -> QueuePosition:
+    offset, line = position.offset, position.line
+    with path.open("rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n") or found(line, raw):
+                break
+            offset += len(raw)
+            line += 1
+    return QueuePosition(offset, line)
+
+
+def replay(
+    path: Path,
+    since: Optional[datetime] = None,
+    from_line: Optional[int] = None,
+    batch_size: int = 10_000,
+) -> Iterator[QueueBatch]:
+    """Read the queue from a timestamp or a record number up to its current end.
+
+    With `since`, records before it are skipped, including late arrivals
+    written after the starting point.
+    """
+    if since is not None:
+        position = seek_time(path, since)
+    elif from_line is not None:
+        position = seek_line(path, from_line)
+    else:
+        position = QueuePosition()
+    target = None if since is None else int(since.timestamp() * 1_000_000)
+    while True:
+        batch = read_batch(path, position, batch_size)
+        if batch.end.line == position.line:
+            return
+        if target is not None:
+            batch.records = [record for record in batch.records if event_ts_us(record) >= target]
+        yield batch
+        position = batch.end
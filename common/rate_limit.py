@@ -0,0 +1,84 @@
+"""
+Token-bucket rate limiting shared by the Kafka and file producers.
+
+Tokens are refilled from a monotonic clock rather than by sleeping a fixed
+interval per event, so oversleeping and per-event work do not accumulate as
+drift: whatever time passed is credited back (up to the burst size) and the
+next call releases a whole batch of events at once.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+# Default bucket depth, expressed as seconds of traffic at the target rate.
+DEFAULT_BURST_SECONDS = 0.05
+
+
+class TokenBucket:
+    """Release events in batches at a target rate (events per second).
+
+    A `rate` of `None` or `<= 0` disables limiting. `burst` caps how many
+    events can be released at once (and how much idle time can be caught up
+    on); it defaults to `DEFAULT_BURST_SECONDS` worth of traffic.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate if rate and rate > 0 else None
+        if burst and burst > 0:
+            self.burst = int(burst)
+        else:
+            self.burst = max(1, int((self.rate or 0) * DEFAULT_BURST_SECONDS))
+        self._clock = clock
+        self._sleep = sleep
+        self._started = clock()
+        self._last_refill = self._started
+        self._tokens = 0.0
+        self.released = 0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, max_events: int) -> int:
+        """Block until at least one event may be sent; return how many (<= `max_events`)."""
+        if max_events <= 0:
+            return 0
+        if self.rate is None:
+            self.released += max_events
+            return max_events
+
+        self._refill()
+        while self._tokens < 1.0:
+            self._sleep((1.0 - self._tokens) / self.rate)
+            self._refill()
+        granted = min(max_events, int(self._tokens))
+        self._tokens -= granted
+        self.released += granted
+        return granted
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self._started
+
+    @property
+    def achieved_rate(self) -> float:
+        """Events released per second since the bucket was created."""
+        elapsed = self.elapsed
+        return self.released / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        """One-line report of the achieved rate against the target."""
+        target = f"{self.rate:.0f}/s" if self.rate else "unlimited"
+        return (
+            f"achieved {self.achieved_rate:.0f} events/s "
+            f"(target {target}, {self.released} events in {self.elapsed:.1f}s)"
+        )
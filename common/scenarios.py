@@ -0,0 +1,273 @@
+"""
+Traffic scenarios for the producers: skewed keys, daily cycles and bursts.
+
+A scenario is declared in a JSON or YAML file, for example::
+
+    {
+      "name": "black-friday",
+      "start": "2025-11-28T00:00:00+00:00",
+      "duration_seconds": 86400,
+      "base_rate": 200,
+      "time_scale": 0,
+      "users": {"distribution": "zipf", "exponent": 1.1},
+      "merchants": {"distribution": "zipf", "exponent": 1.3},
+      "diurnal": [0.2, 0.1, 0.1, 0.1, 0.2, 0.4, 0.8, 1.2, 1.4, 1.3, 1.2, 1.4,
+                  1.6, 1.4, 1.2, 1.2, 1.3, 1.6, 1.9, 2.0, 1.7, 1.2, 0.7, 0.4],
+      "spikes": [{"start_offset_seconds": 43200, "duration_seconds": 900,
+                  "multiplier": 8, "category": "electronics"}],
+      "late_arrivals": {"fraction": 0.02, "max_delay_seconds": 3600}
+    }
+
+`ScenarioEngine` walks simulated time in fixed steps: each step draws a
+Poisson number of events from `base_rate x diurnal(hour) x spikes` and stamps
+them inside the step, then pushes a fraction of them back in event time to
+model late arrivals. Consecutive steps are generated together in one
+vectorized `generate_batch` call. `time_scale` 0 runs at full speed; otherwise simulated
+time advances `time_scale` times faster than the wall clock.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from common.generator import CATEGORIES, MERCHANTS, USER_ID_MAX, USER_ID_MIN, TransactionBatch, generate_batch
+
+DISTRIBUTIONS = ("uniform", "zipf")
+# Batch sizing of `ScenarioEngine.batches` (full speed / paced).
+WINDOW_EVENTS = 10_000
+WINDOW_WALL_SECONDS = 0.05
+
+
+@dataclass
+class KeyDistribution:
+    """Popularity of keys: uniform, or bounded Zipf with the given exponent."""
+
+    distribution: str = "uniform"
+    exponent: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {self.distribution!r}, expected one of {DISTRIBUTIONS}")
+
+    def weights(self, size: int) -> Optional[np.ndarray]:
+        """Probability of each rank (most popular first), or None when uniform."""
+        if self.distribution == "uniform":
+            return None
+        ranks = np.arange(1, size + 1, dtype=np.float64)
+        weights = ranks ** -self.exponent
+        return weights / weights.sum()
+
+
+@dataclass
+class Spike:
+    """Rate multiplier applied for a while, optionally routed to one category."""
+
+    start_offset_seconds: float
+    duration_seconds: float
+    multiplier: float
+    category: Optional[str] = None
+
+    def active(self, offsets: np.ndarray) -> np.ndarray:
+        """Mask of the step offsets (seconds from scenario start) covered by the spike."""
+        return (offsets >= self.start_offset_seconds) & (offsets < self.start_offset_seconds + self.duration_seconds)
+
+
+@dataclass
+class Scenario:
+    """Declarative description of a traffic pattern."""
+
+    name: str = "scenario"
+    start: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    base_rate: float = 50.0
+    time_scale: float = 0.0
+    step_seconds: float = 1.0
+    users: KeyDistribution = field(default_factory=KeyDistribution)
+    merchants: KeyDistribution = field(default_factory=KeyDistribution)
+    diurnal: Optional[List[float]] = None
+    spikes: List[Spike] = field(default_factory=list)
+    late_fraction: float = 0.0
+    late_max_delay_seconds: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.diurnal is not None and len(self.diurnal) != 24:
+            raise ValueError("diurnal must list 24 hourly multipliers")
+        if not 0.0 <= self.late_fraction <= 1.0:
+            raise ValueError("late_arrivals.fraction must be between 0 and 1")
+        for spike in self.spikes:
+            if spike.category is not None and spike.category not in CATEGORIES:
+                raise ValueError(f"Unknown spike category {spike.category!r}")
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "Scenario":
+        late = spec.get("late_arrivals") or {}
+        start = spec.get("start")
+        return cls(
+            name=spec.get("name", "scenario"),
+            start=datetime.fromisoformat(start) if start else None,
+            duration_seconds=spec.get("duration_seconds"),
+            base_rate=float(spec.get("base_rate", 50.0)),
+            time_scale=float(spec.get("time_scale", 0.0)),
+            step_seconds=float(spec.get("step_seconds", 1.0)),
+            users=KeyDistribution(**spec.get("users", {})),
+            merchants=KeyDistribution(**spec.get("merchants", {})),
+            diurnal=spec.get("diurnal"),
+            spikes=[Spike(**spike) for spike in spec.get("spikes", [])],
+            late_fraction=float(late.get("fraction", 0.0)),
+            late_max_delay_seconds=float(late.get("max_delay_seconds", 0.0)),
+        )
+
+
+def load_scenario(path: Path) -> Scenario:
+    """Read a scenario from a `.json`, `.yaml` or `.yml` file."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ImportError("YAML scenarios require `pip install pyyaml` (or use a .json file).") from exc
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    return Scenario.from_dict(spec)
+
+
+class ScenarioEngine:
+    """Turn a `Scenario` into a stream of `TransactionBatch`es.
+
+    With `user_id_range` restricted to a slice of the key space (one
+    producer worker), only that slice's share of the traffic is generated,
+    so the union of all workers still follows the scenario.
+    """
+
+    def __init__(
+        self,
+        scenario: Scenario,
+        rng: np.random.Generator,
+        user_id_range: Tuple[int, int] = (USER_ID_MIN, USER_ID_MAX),
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ) -> None:
+        self.scenario = scenario
+        self.rng = rng
+        self.user_id_range = user_id_range
+        self._clock = clock
+        self._sleep = sleep
+        self.events = 0
+        self.late_events = 0
+        self.simulated_seconds = 0.0
+
+        population = USER_ID_MAX - USER_ID_MIN + 1
+        rank_weights = scenario.users.weights(population)
+        low, high = user_id_range
+        if rank_weights is None:
+            self.user_weights = None
+            self.rate_factor = (high - low + 1) / population
+        else:
+            # Hot users are scattered over the id space by a seeded permutation.
+            permutation = np.random.default_rng(0).permutation(population)
+            by_id = rank_weights[permutation]
+            slice_weights = by_id[low - USER_ID_MIN:high - USER_ID_MIN + 1]
+            self.rate_factor = float(slice_weights.sum())
+            self.user_weights = slice_weights / slice_weights.sum()
+        self.merchant_weights = scenario.merchants.weights(len(MERCHANTS))
+
+    def rates(self, offsets: np.ndarray, start: datetime) -> np.ndarray:
+        """Events/second at each step offset, before spikes."""
+        rates = np.full(len(offsets), self.scenario.base_rate * self.rate_factor)
+        if self.scenario.diurnal is not None:
+            seconds_of_day = start.hour * 3600 + start.minute * 60 + start.second + offsets
+            hours = (seconds_of_day % 86_400) / 3600
+            curve = self.scenario.diurnal + self.scenario.diurnal[:1]
+            rates *= np.interp(hours, np.arange(25), curve)
+        return rates
+
+    def _window_batch(self, offsets: np.ndarray, start: datetime, limit: Optional[int]) -> TransactionBatch:
+        """Generate every event of a window of consecutive steps in one vectorized call."""
+        step = self.scenario.step_seconds
+        spikes = self.scenario.spikes
+        base = self.rates(offsets, start) * step
+        # Column 0 is the base traffic, column k the extra traffic of spike k.
+        expected = np.empty((len(offsets), 1 + len(spikes)))
+        expected[:, 0] = base
+        for k, spike in enumerate(spikes, start=1):
+            expected[:, k] = np.where(spike.active(offsets), base * max(spike.multiplier - 1, 0.0), 0.0)
+        counts = self.rng.poisson(expected).ravel()
+        step_index = np.repeat(np.repeat(np.arange(len(offsets)), 1 + len(spikes)), counts)
+        source = np.repeat(np.tile(np.arange(1 + len(spikes)), len(offsets)), counts)
+        if limit is not None:
+            step_index, source = step_index[:limit], source[:limit]
+        n = len(step_index)
+
+        batch = generate_batch(
+            n,
+            rng=self.rng,
+            start=start,
+            user_id_range=self.user_id_range,
+            user_weights=self.user_weights,
+            merchant_weights=self.merchant_weights,
+        )
+        start_us = int(start.timestamp() * 1_000_000)
+        step_us = int(step * 1_000_000)
+        offsets_us = (offsets * 1_000_000).astype(np.int64)
+        batch.event_ts_us = start_us + offsets_us[step_index] + self.rng.integers(0, step_us, size=n)
+        for k, spike in enumerate(spikes, start=1):
+            if spike.category is not None:
+                batch.category[source == k] = spike.category
+
+        if self.scenario.late_fraction > 0 and n:
+            late = self.rng.random(n) < self.scenario.late_fraction
+            max_delay_us = int(self.scenario.late_max_delay_seconds * 1_000_000)
+            batch.event_ts_us[late] -= self.rng.integers(0, max_delay_us, size=int(late.sum()), endpoint=True)
+            self.late_events += int(late.sum())
+        return batch
+
+    def _window_steps(self) -> int:
+        """Steps generated together: ~10k events at full speed, ~50 ms of wall time when paced."""
+        scenario = self.scenario
+        if scenario.time_scale > 0:
+            return max(1, int(WINDOW_WALL_SECONDS * scenario.time_scale / scenario.step_seconds))
+        per_step = max(scenario.base_rate * self.rate_factor * scenario.step_seconds, 1.0)
+        return max(1, int(WINDOW_EVENTS / per_step))
+
+    def batches(self, rows: Optional[int] = None) -> Iterator[TransactionBatch]:
+        """Yield batches of simulated time until the duration or `rows` is reached."""
+        scenario = self.scenario
+        start = scenario.start or datetime.now(timezone.utc)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        window = self._window_steps()
+        wall_start = self._clock()
+        step_number = 0
+        while scenario.duration_seconds is None or step_number * scenario.step_seconds < scenario.duration_seconds:
+            if rows is not None and self.events >= rows:
+                return
+            steps = window
+            if scenario.duration_seconds is not None:
+                remaining = int(np.ceil(scenario.duration_seconds / scenario.step_seconds)) - step_number
+                steps = min(steps, remaining)
+            offsets = (step_number + np.arange(steps)) * scenario.step_seconds
+            if scenario.time_scale > 0:
+                delay = wall_start + offsets[-1] / scenario.time_scale - self._clock()
+                if delay > 0:
+                    self._sleep(delay)
+            limit = None if rows is None else rows - self.events
+            batch = self._window_batch(offsets, start, limit)
+            step_number += steps
+            self.simulated_seconds = step_number * scenario.step_seconds
+            self.events += len(batch)
+            if len(batch):
+                yield batch
+
+    def summary(self) -> str:
+        return (
+            f"scenario {self.scenario.name!r}: {self.events} events over "
+            f"{self.simulated_seconds:.0f}s of simulated time ({self.late_events} late)"
+        )
@@ -0,0 +1,249 @@
+"""
+Segmented, Kafka-like layout for the file queue.
+
+A log is a directory of segments. Each segment holds consecutive records and
+is named after the offset of its first record (zero-padded, as in Kafka)::
+
+    data/queue/transactions/
+        00000000000000000000.jsonl   records 0..n-1, one JSON document per line
+        00000000000000000000.index   n little-endian uint64 byte positions
+        00000000000000250000.jsonl
+        00000000000000250000.index
+
+The index is dense, so the position of any offset is one 8-byte read away.
+The writer rolls to a new segment once the active one reaches
+`segment_bytes`. Data is written and flushed before its index entries, so a
+reader never sees an index entry for data that is not there. On reopen, the
+active segment is repaired: a torn last line is cut off and missing index
+entries are rebuilt. `delete_consumed` implements retention by removing the
+segments every consumer has read past.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.file_queue import DurabilityPolicy, GroupCommitWriter, QueueBatch, QueuePosition, decode_record
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DATA_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".index"
+INDEX_ENTRY = np.dtype("<u8")
+
+
+def segment_name(base_offset: int) -> str:
+    return f"{base_offset:020d}"
+
+
+def list_segments(directory: Path) -> List[int]:
+    """Base offsets of the segments in `directory`, in order."""
+    if not directory.is_dir():
+        return []
+    return sorted(int(path.stem) for path in directory.glob(f"*{DATA_SUFFIX}") if path.stem.isdigit())
+
+
+def _index_entries(directory: Path, base_offset: int) -> int:
+    index = directory / f"{segment_name(base_offset)}{INDEX_SUFFIX}"
+    return index.stat().st_size // INDEX_ENTRY.itemsize if index.exists() else 0
+
+
+def end_offset(directory: Path) -> int:
+    """Offset the next appended record will get (number of records ever written)."""
+    segments = list_segments(directory)
+    if not segments:
+        return 0
+    return segments[-1] + _index_entries(directory, segments[-1])
+
+
+def _repair_segment(data_path: Path, index_path: Path) -> int:
+    """Make the index match the complete lines of a segment; return the record count."""
+    data_size = data_path.stat().st_size
+    positions = np.fromfile(index_path, dtype=INDEX_ENTRY) if index_path.exists() else np.empty(0, INDEX_ENTRY)
+    valid = int(np.searchsorted(positions, data_size))  # entries pointing inside the data
+    start = int(positions[valid - 1]) if valid else 0
+    with data_path.open("rb") as f:
+        f.seek(start)
+        tail = f.read()
+    # Re-index from the last trusted entry, dropping a torn last line.
+    rebuilt: List[int] = []
+    position = start
+    for line in tail.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        rebuilt.append(position)
+        position += len(line)
+    keep = valid - 1 if valid else 0
+    entries = np.concatenate([positions[:keep], np.asarray(rebuilt, dtype=INDEX_ENTRY)])
+    if position != data_size:
+        LOGGER.warning("Truncating torn record at the end of %s (%s bytes)", data_path, data_size - position)
+        with data_path.open("r+b") as f:
+            f.truncate(position)
+    if len(entries) != len(positions) or not np.array_equal(entries, positions[: len(entries)]):
+        entries.tofile(index_path)
+    return len(entries)
+
+
+class SegmentedLogWriter(GroupCommitWriter):
+    """`GroupCommitWriter` appending to a segmented log directory instead of one file."""
+
+    def __init__(
+        self,
+        directory: Path,
+        policy: Optional[DurabilityPolicy] = None,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        **kwargs: Any,
+    ) -> None:
+        self.segment_bytes = segment_bytes
+        super().__init__(directory, policy, **kwargs)
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        segments = list_segments(self.path)
+        if segments:
+            base = segments[-1]
+            count = _repair_segment(self._data_path(base), self._index_path(base))
+            self._open_segment(base)
+            self._next_offset = base + count
+        else:
+            self._open_segment(0)
+            self._next_offset = 0
+
+    def _data_path(self, base_offset: int) -> Path:
+        return self.path / f"{segment_name(base_offset)}{DATA_SUFFIX}"
+
+    def _index_path(self, base_offset: int) -> Path:
+        return self.path / f"{segment_name(base_offset)}{INDEX_SUFFIX}"
+
+    def _open_segment(self, base_offset: int) -> None:
+        self._base_offset = base_offset
+        self._data = self._data_path(base_offset).open("ab")
+        self._index = self._index_path(base_offset).open("ab")
+        self._segment_size = self._data.tell()
+
+    def _roll(self) -> None:
+        self._close_files()
+        LOGGER.info("Rolling %s to segment %s", self.path, segment_name(self._next_offset))
+        self._open_segment(self._next_offset)
+
+    def _write_block(self, lines: List[str]) -> None:
+        encoded = [line.encode("utf-8") + b"\n" for line in lines]
+        start = 0
+        while start < len(encoded):
+            sizes = np.fromiter((len(chunk) for chunk in encoded[start:]), dtype=np.int64, count=len(encoded) - start)
+            ends = self._segment_size + np.cumsum(sizes)
+            # Records that fit in the active segment; an empty segment takes at least one.
+            count = int(np.searchsorted(ends, self.segment_bytes, side="right"))
+            if count == 0:
+                if self._segment_size > 0:
+                    self._roll()
+                    continue
+                count = 1
+            positions = np.concatenate([[self._segment_size], ends[: count - 1]]).astype(INDEX_ENTRY)
+            self._data.write(b"".join(encoded[start:start + count]))
+            self._data.flush()
+            self._index.write(positions.tobytes())
+            self._index.flush()
+            self._segment_size = int(ends[count - 1])
+            self._next_offset += count
+            start += count
+
+    def _fsync(self) -> None:
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+
+    def _closed(self) -> bool:
+        return self._data.closed
+
+    def _close_files(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+class SegmentedLogReader:
+    """Random access by offset into a segmented log directory."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def _locate(self, offset: int) -> Optional[Tuple[int, int]]:
+        """Segment base and byte position of `offset`, or None if not written yet."""
+        segments = list_segments(self.directory)
+        index = bisect.bisect_right(segments, offset) - 1
+        if index < 0:
+            return None
+        base = segments[index]
+        if offset - base >= _index_entries(self.directory, base):
+            return None
+        with (self.directory / f"{segment_name(base)}{INDEX_SUFFIX}").open("rb") as f:
+            f.seek((offset - base) * INDEX_ENTRY.itemsize)
+            (position,) = np.frombuffer(f.read(INDEX_ENTRY.itemsize), dtype=INDEX_ENTRY)
+        return base, int(position)
+
+    def read_lines(self, offset: int, max_records: int) -> Tuple[List[Tuple[int, bytes]], QueuePosition]:
+        """Read up to `max_records` indexed records from `offset`, across segments.
+
+        Returns `(offset, raw_line)` pairs and the position of the next record
+        (`line` is the log offset, `offset` the byte position in its segment).
+        """
+        segments = list_segments(self.directory)
+        if segments and offset < segments[0]:
+            LOGGER.warning("Offset %s was deleted by retention, resuming at %s", offset, segments[0])
+            offset = segments[0]
+        lines: List[Tuple[int, bytes]] = []
+        byte_position = 0
+        while len(lines) < max_records:
+            located = self._locate(offset)
+            if located is None:
+                break
+            base, byte_position = located
+            available = min(_index_entries(self.directory, base) - (offset - base), max_records - len(lines))
+            with (self.directory / f"{segment_name(base)}{DATA_SUFFIX}").open("rb") as f:
+                f.seek(byte_position)
+                for _ in range(available):
+                    raw = f.readline()
+                    lines.append((offset, raw))
+                    offset += 1
+                    byte_position += len(raw)
+        return lines, QueuePosition(offset=byte_position, line=offset)
+
+    def read_batch(self, position: QueuePosition, max_records: int, decode: bool = True) -> QueueBatch:
+        """Decode the records from log offset `position.line`; invalid ones are set aside in `invalid`.
+
+        With `decode=False` the records are returned as read, in `QueueBatch.raw`.
+        """
+        lines, end = self.read_lines(position.line, max_records)
+        if not decode:
+            return QueueBatch(records=[], start=position, end=end, raw=lines)
+        records: List[Dict[str, Any]] = []
+        invalid: List[Tuple[int, bytes, str]] = []
+        for offset, raw in lines:
+            try:
+                records.append(decode_record(raw))
+            except ValueError as exc:
+                LOGGER.error("Invalid JSON at %s offset %s: %s", self.directory, offset, exc)
+                invalid.append((offset, raw, str(exc)))
+        return QueueBatch(records=records, start=position, end=end, invalid=invalid)
+
+
+def delete_consumed(directory: Path, committed_offset: int) -> List[Path]:
+    """Delete segments whose records are all below `committed_offset`; never the active one."""
+    segments = list_segments(directory)
+    deleted: List[Path] = []
+    for base, next_base in zip(segments, segments[1:]):
+        if next_base > committed_offset:
+            break
+        for suffix in (INDEX_SUFFIX, DATA_SUFFIX):
+            path = directory / f"{segment_name(base)}{suffix}"
+            path.unlink(missing_ok=True)
+            deleted.append(path)
+    if deleted:
+        LOGGER.info("Retention deleted %s consumed segment(s) below offset %s", len(deleted) // 2, committed_offset)
+    return deleted
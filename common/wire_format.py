@@ -0,0 +1,200 @@
+"""
+Schema-driven compact binary encoding for transaction payloads.
+
+The layout is described by `schemas/transaction_wire.json`: every message
+starts with a magic byte and the schema version, followed by fixed-width
+fields (16-byte UUID, epoch microseconds, integer cents, one-byte dictionary
+codes for low-cardinality strings). Strings missing from a dictionary are
+escaped and appended inline, so unexpected values survive a round trip.
+
+A JSON message (first byte `{`) is still decoded, which lets consumers read a
+topic while producers migrate from the `json` codec.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from common.codecs import Codec
+
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parents[1] / "schemas" / "transaction_wire.json"
+MAGIC = 0xB7
+NULL_CODE = 0
+INLINE_CODE = 0xFF
+
+_INLINE = object()  # decoded placeholder for an inline (out-of-dictionary) string
+_HEADER = struct.Struct("<BB")
+_INLINE_LENGTH = struct.Struct("<H")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_FIELD_FORMATS = {
+    "uuid": "16s",
+    "timestamp_us": "q",
+    "uint32": "I",
+    "cents": "q",
+    "dictionary": "B",
+}
+
+
+def _required(name: str, value: Any) -> Any:
+    if value is None:
+        raise ValueError(f"Field {name!r} is required by the binary wire format")
+    return value
+
+
+def _encode_uuid(value: str) -> bytes:
+    raw = bytes.fromhex(value.replace("-", ""))  # ValueError on non-hex digits
+    if len(raw) != 16:
+        # struct's "16s" would silently pad or truncate it into another UUID.
+        raise ValueError(f"Not a UUID (expected 32 hex digits): {value!r}")
+    return raw
+
+
+def _decode_uuid(value: bytes) -> str:
+    h = value.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _encode_timestamp(value: str) -> int:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - _EPOCH) // _ONE_MICROSECOND
+
+
+class _TimestampFormatter:
+    """Format epoch microseconds as ISO-8601 UTC, reusing the last second's prefix.
+
+    Consecutive messages mostly share the same second, so the `datetime`
+    arithmetic only runs once per second of event time.
+    """
+
+    def __init__(self) -> None:
+        self._second: Optional[int] = None
+        self._prefix = ""
+
+    def __call__(self, value: int) -> str:
+        second, micros = divmod(value, 1_000_000)
+        if second != self._second:
+            self._second = second
+            self._prefix = (_NAIVE_EPOCH + timedelta(seconds=second)).isoformat()
+        return f"{self._prefix}.{micros:06d}+00:00"
+
+
+@dataclass
+class WireSchema:
+    """One version of the binary layout, compiled into a `struct.Struct`."""
+
+    version: int
+    fields: List[Dict[str, Any]]
+    _struct: struct.Struct = field(init=False, repr=False)
+    _names: Tuple[str, ...] = field(init=False, repr=False)
+    _dictionary_positions: Tuple[int, ...] = field(init=False, repr=False)
+    _encoders: List[Tuple[str, Callable[[Any], Any]]] = field(init=False, repr=False)
+    _decoders: List[Callable[[Any], Any]] = field(init=False, repr=False)
+    _dictionaries: Dict[str, Dict[str, int]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 0 < self.version < 256:
+            raise ValueError(f"Schema version must fit in one byte, got {self.version}")
+        formats = []
+        self._encoders = []
+        self._decoders = []
+        self._dictionaries = {}
+        for spec in self.fields:
+            name, kind = spec["name"], spec["type"]
+            formats.append(_FIELD_FORMATS[kind])
+            if kind == "dictionary":
+                if len(spec["values"]) >= INLINE_CODE:
+                    raise ValueError(f"Dictionary {name!r} has too many values")
+                self._dictionaries[name] = {value: code for code, value in enumerate(spec["values"], start=1)}
+                lookup = (None, *spec["values"]) + (_INLINE,) * (INLINE_CODE - len(spec["values"]))
+                self._encoders.append((name, self._dictionaries[name].get))
+                self._decoders.append(lookup.__getitem__)
+            elif kind == "uuid":
+                self._encoders.append((name, _encode_uuid))
+                self._decoders.append(_decode_uuid)
+            elif kind == "timestamp_us":
+                self._encoders.append((name, _encode_timestamp))
+                self._decoders.append(_TimestampFormatter())
+            elif kind == "cents":
+                self._encoders.append((name, lambda value: round(float(value) * 100)))
+                self._decoders.append(lambda value: value / 100)
+            else:
+                self._encoders.append((name, int))
+                self._decoders.append(int)
+        self._names = tuple(spec["name"] for spec in self.fields)
+        self._dictionary_positions = tuple(
+            index for index, spec in enumerate(self.fields) if spec["type"] == "dictionary"
+        )
+        self._struct = struct.Struct("<" + "".join(formats))
+
+    def encode(self, record: Mapping[str, Any]) -> bytes:
+        values: List[Any] = []
+        inline: List[bytes] = []
+        for name, encode in self._encoders:
+            value = record.get(name)
+            if name in self._dictionaries:
+                if value is None:
+                    values.append(NULL_CODE)
+                    continue
+                code = encode(value)
+                if code is None:
+                    raw = str(value).encode("utf-8")
+                    inline.append(_INLINE_LENGTH.pack(len(raw)) + raw)
+                    code = INLINE_CODE
+                values.append(code)
+            else:
+                values.append(encode(_required(name, value)))
+        return _HEADER.pack(MAGIC, self.version) + self._struct.pack(*values) + b"".join(inline)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        unpacked = self._struct.unpack_from(data, _HEADER.size)
+        values = [decode(value) for decode, value in zip(self._decoders, unpacked)]
+        offset = _HEADER.size + self._struct.size
+        for index in self._dictionary_positions:
+            if values[index] is _INLINE:
+                (length,) = _INLINE_LENGTH.unpack_from(data, offset)
+                offset += _INLINE_LENGTH.size
+                values[index] = data[offset:offset + length].decode("utf-8")
+                offset += length
+        return dict(zip(self._names, values))
+
+
+def load_schemas(path: Optional[Path] = None) -> Tuple[Dict[int, WireSchema], int]:
+    """Read every version from the schema file; return them with the current version."""
+    document = json.loads((path or DEFAULT_SCHEMA_PATH).read_text(encoding="utf-8"))
+    schemas = {
+        int(version): WireSchema(version=int(version), fields=spec["fields"])
+        for version, spec in document["versions"].items()
+    }
+    current = int(document["current_version"])
+    if current not in schemas:
+        raise ValueError(f"current_version {current} is not defined in the schema file")
+    return schemas, current
+
+
+class BinaryCodec(Codec):
+    """Kafka codec writing the current schema version and reading any known one."""
+
+    name = "binary"
+
+    def __init__(self, schema_path: Optional[Path] = None) -> None:
+        self._schemas, current = load_schemas(schema_path)
+        self.encode: Callable[[Mapping[str, Any]], bytes] = self._schemas[current].encode  # type: ignore[assignment]
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if data[:1] == b"{":
+            return json.loads(data)
+        if not data or data[0] != MAGIC:
+            raise ValueError("Not a binary transaction message (bad magic byte)")
+        schema = self._schemas.get(data[1])
+        if schema is None:
+            raise ValueError(f"Unknown binary schema version {data[1]}")
+        return schema.decode(data)
@@ -2,8 +2,20 @@
 Version simplifiée du consumer qui lit depuis un fichier JSON (simule Kafka)
 et écrit dans SQLite (simule Postgres).
 
+`--input` peut aussi être un journal segmenté (répertoire écrit par
+`producer_to_file.py --segment-mb`); `--delete-consumed` supprime alors les
+segments déjà lus par tous les consumers.
+
+Une file partitionnée (`producer_to_file.py --partitions N`) est consommée en
+groupe: plusieurs process lancés avec le même `--group` se répartissent les
+partitions et chacune a sa propre position enregistrée.
+
 Usage:
     python consumers/file_queue_to_sqlite.py --input data/queue/transactions.jsonl --batch-size 100
+    python consumers/file_queue_to_sqlite.py --input data/queue/transactions --delete-consumed
+    python consumers/file_queue_to_sqlite.py --input data/queue/partitioned --group loaders --follow
+    python consumers/file_queue_to_sqlite.py --reset-to-time 2026-10-16T14:00 --catch-up
+    python consumers/file_queue_to_sqlite.py --input data/queue/transactions.jsonl --arrow --batch-size 50000
 """
 
 from __future__ import annotations
@@ -12,14 +24,50 @@ import json
 import logging
 import os
 import sqlite3
-from dataclasses import dataclass
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 
 import click
 import pandas as pd
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from common.arrow_batch import ArrowBatch, decode_lines, derive, sqlite_rows, validate  # noqa: E402
+from common.dead_letter import (  # noqa: E402
+    DEAD_LETTERS_DDL,
+    DeadLetter,
+    DeadLetterSink,
+    FileDeadLetterSink,
+    TableDeadLetterSink,
+    from_raw,
+    from_rejected,
+    log_summary,
+)
+from common.dedup import DEFAULT_CACHE_SIZE, Deduplicator, deduplicate  # noqa: E402
+from common.file_queue import QueueBatch, QueuePosition, read_batch  # noqa: E402
+from common.partitioned_queue import DEFAULT_SESSION_TIMEOUT_S, ConsumerGroup, is_partitioned  # noqa: E402
+from common.parallel_parse import (  # noqa: E402
+    DEFAULT_CHUNK_BYTES,
+    advance,
+    chunk_lines,
+    iter_parsed,
+    plan_chunks,
+    plan_log_chunks,
+)
+from common.payloads import iso_strings, json_payloads  # noqa: E402
+from common.queue_index import build_index, index_path, seek_line, seek_time  # noqa: E402
+from common.segmented_log import SegmentedLogReader, delete_consumed  # noqa: E402
+from common.transform import derive_columns  # noqa: E402
+from common.validation import split_valid  # noqa: E402
 
 LOGGER = logging.getLogger("file-queue-to-sqlite")
 logging.basicConfig(
@@ -28,6 +76,11 @@ logging.basicConfig(
 )
 
 
+# Mode suivi (--follow): latence max d'un micro-batch et période de relecture à vide.
+DEFAULT_MAX_LATENCY_MS = 200
+DEFAULT_POLL_INTERVAL_MS = 100
+
+
 @dataclass
 class SimpleETLConfig:
     """Configuration simplifiée pour l'ETL sans Docker."""
@@ -36,63 +89,174 @@ class SimpleETLConfig:
     db_path: Path
     batch_size: int = 500
     processed_file: Optional[Path] = None
-
-
-def load_transactions_from_file(input_file: Path, batch_size: int) -> List[dict]:
-    """Lit un fichier JSONL (une transaction par ligne) et retourne un batch."""
-    records: List[dict] = []
+    # Nom sous lequel la position de lecture est enregistrée dans queue_offsets.
+    consumer_name: str = "file-queue-to-sqlite"
+    # Journal segmenté: supprimer les segments lus par tous les consumers.
+    delete_consumed: bool = False
+    # Enregistrements rejetés: fichier JSONL, sinon table `dead_letters` (même transaction que le chargement).
+    dead_letter_file: Optional[Path] = None
+    # Chemin Arrow: lignes brutes -> table Arrow -> insertions colonne par colonne (même payload enrichi que pandas).
+    arrow: bool = False
+    # Clés (id, empreinte du contenu) déjà chargées, gardées pour écarter les rejeux d'un batch à l'autre (0 = dans le batch seulement).
+    dedup_cache: int = DEFAULT_CACHE_SIZE
+
+
+def load_transactions_from_file(
+    input_file: Path,
+    batch_size: int,
+    position: Optional[QueuePosition] = None,
+) -> List[dict]:
+    """Lit au plus `batch_size` lignes d'un fichier JSONL à partir de `position` (défaut: début)."""
     if not input_file.exists():
         LOGGER.warning("Fichier d'entrée non trouvé: %s", input_file)
-        return records
+        return []
+    batch = read_batch(input_file, position or QueuePosition(), batch_size)
+    LOGGER.info("Lu %s transactions depuis %s", len(batch.records), input_file)
+    return batch.records
+
+
+@contextmanager
+def _transaction(connectable) -> Iterator[Connection]:
+    """Ouvre une transaction sur un Engine, ou réutilise la connexion déjà en transaction."""
+    if isinstance(connectable, Engine):
+        with connectable.begin() as conn:
+            yield conn
+    else:
+        yield connectable
+
+
+def read_queue_batch(input_path: Path, position: QueuePosition, batch_size: int, decode: bool = True) -> QueueBatch:
+    """Lit le prochain batch d'un fichier JSONL ou d'un journal segmenté (répertoire).
+
+    Avec `decode=False`, les lignes restent brutes (`QueueBatch.raw`), pour le chemin Arrow.
+    """
+    if input_path.is_dir():
+        return SegmentedLogReader(input_path).read_batch(position, batch_size, decode)
+    return read_batch(input_path, position, batch_size, decode)
+
+
+def min_committed_line(connectable, source: str) -> Optional[int]:
+    """Plus petite position (ligne / offset) enregistrée par les consumers de `source`."""
+    with _transaction(connectable) as conn:
+        return conn.execute(
+            text("SELECT MIN(line_number) FROM queue_offsets WHERE source = :source"),
+            {"source": source},
+        ).scalar()
+
+
+def get_queue_position(connectable, consumer: str, source: str) -> QueuePosition:
+    """Position de lecture enregistrée pour (`consumer`, `source`), début du fichier sinon."""
+    with _transaction(connectable) as conn:
+        row = conn.execute(
+            text("SELECT byte_offset, line_number FROM queue_offsets WHERE consumer = :consumer AND source = :source"),
+            {"consumer": consumer, "source": source},
+        ).fetchone()
+    return QueuePosition(offset=row[0], line=row[1]) if row else QueuePosition()
+
+
+def commit_queue_position(connectable, consumer: str, source: str, position: QueuePosition) -> None:
+    """Enregistre la position de lecture (dans la transaction du chargement si `connectable` en est une)."""
+    with _transaction(connectable) as conn:
+        conn.execute(
+            text(
+                """
+                INSERT OR REPLACE INTO queue_offsets (consumer, source, byte_offset, line_number, updated_at)
+                VALUES (:consumer, :source, :byte_offset, :line_number, :updated_at)
+                """
+            ),
+            {
+                "consumer": consumer,
+                "source": source,
+                "byte_offset": position.offset,
+                "line_number": position.line,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            },
+        )
 
-    with input_file.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            if i >= batch_size:
-                break
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                records.append(json.loads(line))
-            except json.JSONDecodeError as e:
-                LOGGER.error("Erreur de parsing JSON ligne %s: %s", i, e)
-    LOGGER.info("Lu %s transactions depuis %s", len(records), input_file)
-    return records
-
-
-def derive_amount_bucket(amount: float) -> str:
-    """Simple bucketing logic used for aggregate reporting."""
-    if amount < 20:
-        return "<20"
-    if amount < 100:
-        return "20-100"
-    if amount < 250:
-        return "100-250"
-    if amount < 500:
-        return "250-500"
-    return ">=500"
-
-
-def transform(records: Sequence[dict]) -> pd.DataFrame:
-    """Apply data quality and transformation rules on the batch."""
+
+def reset_queue_position(
+    config: SimpleETLConfig,
+    since: Optional[datetime] = None,
+    line: Optional[int] = None,
+) -> QueuePosition:
+    """Repositionne le consumer sur un horodatage ou un numéro d'enregistrement (replay / backfill).
+
+    Pour un fichier, la position est trouvée via l'index temps/offset (construit
+    une fois s'il manque). Un journal segmenté est déjà indexé par offset mais
+    pas par temps.
+    """
+    init_sqlite_db(config.db_path)
+    engine = create_engine(f"sqlite:///{config.db_path}")
+    source = str(config.input_file.resolve())
+    try:
+        if config.input_file.is_dir():
+            if since is not None:
+                raise ValueError("Le replay par horodatage n'est pas disponible pour un journal segmenté, utiliser un offset.")
+            position = QueuePosition(line=line or 0)
+        else:
+            if not index_path(config.input_file).exists():
+                build_index(config.input_file)
+            position = seek_time(config.input_file, since) if since is not None else seek_line(config.input_file, line or 0)
+        commit_queue_position(engine, config.consumer_name, source, position)
+    finally:
+        engine.dispose()
+    LOGGER.info("Position de %s réinitialisée: octet %s / ligne %s", config.consumer_name, position.offset, position.line)
+    return position
+
+
+def transform(
+    records: Sequence[dict],
+    dead_letters: Optional[List[DeadLetter]] = None,
+    source: str = "",
+) -> pd.DataFrame:
+    """Apply data quality and transformation rules on the batch.
+
+    Rows failing validation are appended to `dead_letters` (or logged and
+    dropped without it); the valid rows are returned.
+    """
     if not records:
         return pd.DataFrame()
+    return transform_frame(pd.DataFrame(records), dead_letters, source, records)
+
 
-    df = pd.DataFrame(records)
-    df["event_ts"] = pd.to_datetime(df.get("event_ts"), utc=True, errors="coerce")
-    df["amount"] = pd.to_numeric(df.get("amount"), errors="coerce")
-    df["ingested_at"] = datetime.now(timezone.utc)
-    df["amount_bucket"] = df["amount"].map(lambda x: derive_amount_bucket(x or 0.0))
-    df["event_date"] = df["event_ts"].dt.date
-    df["event_hour"] = df["event_ts"].dt.hour
-    df["event_dayofweek"] = df["event_ts"].dt.day_name()
+def transform_frame(
+    df: pd.DataFrame,
+    dead_letters: Optional[List[DeadLetter]] = None,
+    source: str = "",
+    records: Optional[Sequence[dict]] = None,
+) -> pd.DataFrame:
+    """Same rules as `transform`, on a batch that is already columnar (modified in place)."""
+    if df.empty:
+        return pd.DataFrame()
+
+    df, rejected = split_valid(df)
+    if not rejected.empty:
+        letters = from_rejected(rejected, source, records)
+        if dead_letters is None:
+            log_summary(letters, LOGGER)
+        else:
+            dead_letters.extend(letters)
+    if df.empty:
+        return pd.DataFrame()
 
-    mandatory_columns = ["transaction_id", "user_id", "amount", "event_ts"]
-    nulls = df[mandatory_columns].isnull().any()
-    if nulls.any():
-        bad_columns = ", ".join(nulls[nulls].index.tolist())
-        raise ValueError(f"Null values detected in mandatory columns: {bad_columns}")
-    return df
+    return derive_columns(df)
+
+
+def transform_arrow(
+    lines: Sequence[Tuple[int, bytes]],
+    dead_letters: List[DeadLetter],
+    source: str = "",
+) -> ArrowBatch:
+    """Mêmes règles que `transform`, sur les lignes brutes d'un batch décodées en table Arrow.
+
+    Les lignes illisibles et les lignes rejetées partent dans `dead_letters`
+    avec leur contenu d'origine.
+    """
+    batch = decode_lines([raw for _, raw in lines])
+    dead_letters.extend(invalid_lines(source, [(lines[index][0], raw, error) for index, raw, error in batch.invalid]))
+    batch, rejected = validate(batch)
+    dead_letters.extend(from_raw(raw, reason, source) for raw, reason in rejected)
+    return derive(batch)
 
 
 def init_sqlite_db(db_path: Path) -> None:
@@ -101,6 +265,7 @@ def init_sqlite_db(db_path: Path) -> None:
     engine = create_engine(f"sqlite:///{db_path}")
 
     with engine.connect() as conn:
+        conn.execute(text(DEAD_LETTERS_DDL))
         conn.execute(
             text(
                 """
@@ -152,36 +317,41 @@ def init_sqlite_db(db_path: Path) -> None:
                 """
             )
         )
+        conn.execute(
+            text(
+                """
+                CREATE TABLE IF NOT EXISTS queue_offsets (
+                    consumer TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    byte_offset INTEGER NOT NULL,
+                    line_number INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (consumer, source)
+                )
+                """
+            )
+        )
         conn.commit()
     LOGGER.info("Base SQLite initialisée: %s", db_path)
 
 
 def insert_raw_records(engine, df: pd.DataFrame) -> int:
-    """Insère les enregistrements bruts dans SQLite."""
+    """Insère les enregistrements bruts dans SQLite (`engine` ou connexion en transaction)."""
     if df.empty:
         return 0
 
-    payloads = []
-    for idx, row in df.iterrows():
-        payloads.append(
-            {
-                "transaction_id": str(row["transaction_id"]),
-                "event_ts": row["event_ts"].isoformat() if pd.notna(row["event_ts"]) else None,
-                "payload": json.dumps(
-                    {
-                        key: (
-                            value.isoformat()
-                            if isinstance(value, (datetime, pd.Timestamp))
-                            else value
-                        )
-                        for key, value in row.drop(labels=["ingested_at"]).to_dict().items()
-                    }
-                ),
-                "ingested_at": row["ingested_at"].isoformat() if pd.notna(row["ingested_at"]) else None,
-            }
+    # Colonne par colonne (payload compris), sans iterrows.
+    payloads = [
+        {"transaction_id": transaction_id, "event_ts": event_ts, "payload": payload, "ingested_at": ingested_at}
+        for transaction_id, event_ts, payload, ingested_at in zip(
+            df["transaction_id"].astype(str).tolist(),
+            iso_strings(df["event_ts"]),
+            json_payloads(df, exclude=("ingested_at",)),
+            iso_strings(df["ingested_at"]),
         )
+    ]
 
-    with engine.begin() as conn:
+    with _transaction(engine) as conn:
         conn.execute(
             text(
                 """
@@ -196,7 +366,7 @@ def insert_raw_records(engine, df: pd.DataFrame) -> int:
 
 
 def insert_curated_records(engine, df: pd.DataFrame) -> int:
-    """Insère les enregistrements transformés dans SQLite."""
+    """Insère les enregistrements transformés dans SQLite (`engine` ou connexion en transaction)."""
     if df.empty:
         return 0
 
@@ -222,7 +392,7 @@ def insert_curated_records(engine, df: pd.DataFrame) -> int:
             }
         )
 
-    with engine.begin() as conn:
+    with _transaction(engine) as conn:
         conn.execute(
             text(
                 """
@@ -243,35 +413,362 @@ def insert_curated_records(engine, df: pd.DataFrame) -> int:
     return len(curated)
 
 
+def insert_arrow_records(conn: Connection, batch: ArrowBatch) -> int:
+    """Insère un batch Arrow dans raw_transactions et transactions_flat (connexion en transaction).
+
+    Les paramètres sont construits colonne par colonne; le payload de
+    raw_transactions est l'enregistrement enrichi, le même texte que sur le
+    chemin pandas (`common.arrow_batch.payload_strings`).
+    """
+    if not len(batch):
+        return 0
+    raw_rows, flat_rows = sqlite_rows(batch)
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO raw_transactions (transaction_id, event_ts, payload, ingested_at) VALUES (?, ?, ?, ?)",
+        list(raw_rows),
+    )
+    conn.exec_driver_sql(
+        """
+        INSERT OR REPLACE INTO transactions_flat (
+            transaction_id, event_ts, event_date, event_hour, event_dayofweek,
+            user_id, amount, amount_bucket, merchant, category, city, status,
+            payment_method, currency, ingested_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        list(flat_rows),
+    )
+    return len(batch)
+
+
+def dead_letter_sink(config: SimpleETLConfig, conn: Connection) -> DeadLetterSink:
+    """Fichier si configuré, sinon table `dead_letters` dans la transaction `conn`."""
+    if config.dead_letter_file is not None:
+        return FileDeadLetterSink(config.dead_letter_file)
+    return TableDeadLetterSink(conn)
+
+
+def invalid_lines(source: str, invalid: Sequence[Tuple[int, bytes, str]]) -> List[DeadLetter]:
+    """Lettres mortes pour les lignes JSON invalides d'un batch (`QueueBatch.invalid`)."""
+    return [from_raw(raw, f"invalid JSON: {error}", f"{source}:{line}") for line, raw, error in invalid]
+
+
+def log_dedup_stats(dedup: Deduplicator) -> None:
+    stats = dedup.stats
+    LOGGER.info(
+        "Déduplication: %s lignes, %s doublons dans les batches, %s déjà chargées (taux %.1f%%)",
+        stats.rows,
+        stats.in_batch,
+        stats.cross_batch,
+        stats.hit_rate * 100,
+    )
+
+
+def load_batch(
+    engine,
+    config: SimpleETLConfig,
+    source: str,
+    records: List[dict],
+    end: QueuePosition,
+    invalid: Sequence[Tuple[int, bytes, str]] = (),
+    lines: Sequence[Tuple[int, bytes]] = (),
+    dedup: Optional[Deduplicator] = None,
+) -> int:
+    """Transforme et charge un batch, et enregistre `end` dans la même transaction.
+
+    Les lignes illisibles (`invalid`) et les enregistrements rejetés par la
+    validation partent en lettres mortes; le reste du batch est chargé.
+    Avec `config.arrow`, le batch est lu dans `lines` (lignes brutes) au lieu de `records`.
+    Les rejeux exacts (même id, même contenu) sont écartés avant l'insertion
+    (`dedup`, partagé entre les batches d'un process; à défaut, dans le batch
+    seulement); une nouvelle version d'une transaction est chargée.
+    """
+    dedup = dedup or Deduplicator(0)
+    dead_letters = invalid_lines(source, invalid)
+    if config.arrow:
+        transformed = transform_arrow(lines, dead_letters, source)
+    else:
+        transformed = transform(records, dead_letters, source)
+    valid_count = len(transformed)
+    transformed, keys = deduplicate(dedup, transformed)
+    with engine.begin() as conn:
+        if config.arrow:
+            raw_count = curated_count = insert_arrow_records(conn, transformed)
+        else:
+            raw_count = insert_raw_records(conn, transformed)
+            curated_count = insert_curated_records(conn, transformed)
+        dead_letter_sink(config, conn).write(dead_letters)
+        commit_queue_position(conn, config.consumer_name, source, end)
+    dedup.remember(keys)
+    log_summary(dead_letters, LOGGER)
+
+    LOGGER.info(
+        "Batch traité - raw insérés: %s, curated upsertés: %s, doublons écartés: %s, position: octet %s / ligne %s",
+        raw_count,
+        curated_count,
+        valid_count - len(transformed),
+        end.offset,
+        end.line,
+    )
+    if config.delete_consumed and config.input_file.is_dir():
+        delete_consumed(config.input_file, min_committed_line(engine, source) or 0)
+
+    # Optionnel: déplacer les lignes traitées vers un fichier "processed"
+    if config.processed_file:
+        config.processed_file.parent.mkdir(parents=True, exist_ok=True)
+        with config.processed_file.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        if lines:
+            with config.processed_file.open("ab") as f:
+                f.writelines(raw for _, raw in lines if raw.strip())
+
+    return curated_count
+
+
 def run_etl(config: SimpleETLConfig) -> int:
-    """Entry point pour traiter un batch depuis un fichier vers SQLite."""
+    """Entry point pour traiter le prochain batch non lu d'un fichier vers SQLite.
+
+    La position de lecture est enregistrée dans `queue_offsets` dans la même
+    transaction que les insertions: un batch est chargé exactement une fois,
+    même si le process s'arrête entre deux appels.
+    """
     init_sqlite_db(config.db_path)
     engine = create_engine(f"sqlite:///{config.db_path}")
+    source = str(config.input_file.resolve())
 
     try:
-        records = load_transactions_from_file(config.input_file, config.batch_size)
-        if not records:
+        if not config.input_file.exists():
+            LOGGER.warning("Fichier d'entrée non trouvé: %s", config.input_file)
+            return 0
+        position = get_queue_position(engine, config.consumer_name, source)
+        batch = read_queue_batch(config.input_file, position, config.batch_size, decode=not config.arrow)
+        records = batch.records
+        LOGGER.info(
+            "Lu %s transactions depuis %s (lignes %s-%s)",
+            len(batch.raw) if config.arrow else len(records),
+            config.input_file,
+            batch.start.line,
+            batch.end.line,
+        )
+        if batch.end.line == position.line:
             LOGGER.info("Aucun enregistrement à traiter.")
             return 0
 
-        transformed = transform(records)
-        raw_count = insert_raw_records(engine, transformed)
-        curated_count = insert_curated_records(engine, transformed)
+        return load_batch(engine, config, source, records, batch.end, batch.invalid, batch.raw)
+    finally:
+        engine.dispose()
 
-        LOGGER.info(
-            "Batch traité - raw insérés: %s, curated upsertés: %s",
-            raw_count,
-            curated_count,
-        )
 
-        # Optionnel: déplacer les lignes traitées vers un fichier "processed"
-        if config.processed_file:
-            config.processed_file.parent.mkdir(parents=True, exist_ok=True)
-            with config.processed_file.open("a", encoding="utf-8") as f:
-                for record in records:
-                    f.write(json.dumps(record) + "\n")
+def run_follow(
+    config: SimpleETLConfig,
+    max_latency_ms: int = DEFAULT_MAX_LATENCY_MS,
+    poll_interval_ms: int = DEFAULT_POLL_INTERVAL_MS,
+    idle_timeout_s: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Suit la file en continu et charge des micro-batches (process long, connexions gardées).
+
+    Un micro-batch est chargé dès qu'il atteint `config.batch_size` lignes ou
+    que sa plus ancienne ligne attend depuis `max_latency_ms`. Sans données
+    nouvelles, la file est relue toutes les `poll_interval_ms` (un simple
+    `stat` pour un fichier). `idle_timeout_s` arrête le suivi après autant de
+    secondes sans rien lire (None = jamais); Ctrl+C charge le batch en cours
+    puis s'arrête.
+    """
+    init_sqlite_db(config.db_path)
+    engine = create_engine(f"sqlite:///{config.db_path}")
+    source = str(config.input_file.resolve())
+    position = get_queue_position(engine, config.consumer_name, source)
+    dedup = Deduplicator(config.dedup_cache)
+    pending: List[dict] = []
+    pending_invalid: List[Tuple[int, bytes, str]] = []
+    pending_lines: List[Tuple[int, bytes]] = []
+    pending_end = position
+    oldest = None  # instant où la plus ancienne ligne non chargée a été lue
+    last_data = clock()
+    total = 0
+    LOGGER.info(
+        "Suivi de %s depuis la ligne %s (batch %s, latence max %s ms)",
+        config.input_file,
+        position.line,
+        config.batch_size,
+        max_latency_ms,
+    )
+
+    def flush() -> None:
+        nonlocal pending, pending_invalid, pending_lines, position, oldest, total
+        if pending_end.line != position.line:
+            total += load_batch(engine, config, source, pending, pending_end, pending_invalid, pending_lines, dedup)
+            position = pending_end
+        pending, pending_invalid, pending_lines, oldest = [], [], [], None
+
+    try:
+        while True:
+            batch = None
+            has_new = config.input_file.exists() and (
+                config.input_file.is_dir() or config.input_file.stat().st_size > pending_end.offset
+            )
+            if has_new:
+                batch = read_queue_batch(
+                    config.input_file,
+                    pending_end,
+                    config.batch_size - (pending_end.line - position.line),
+                    decode=not config.arrow,
+                )
+            now = clock()
+            if batch is not None and batch.end.line != pending_end.line:
+                pending.extend(batch.records)
+                pending_invalid.extend(batch.invalid)
+                pending_lines.extend(batch.raw)
+                pending_end = batch.end
+                oldest = oldest if oldest is not None else now
+                last_data = now
+            full = pending_end.line - position.line >= config.batch_size
+            overdue = oldest is not None and (now - oldest) * 1000 >= max_latency_ms
+            if full or overdue:
+                flush()
+                continue
+            if batch is not None and batch.end.line != batch.start.line:
+                continue  # la lecture n'a pas épuisé la file: relire tout de suite
+            if idle_timeout_s is not None and oldest is None and now - last_data >= idle_timeout_s:
+                LOGGER.info("Aucune donnée depuis %.1f s, arrêt du suivi.", now - last_data)
+                break
+            wait = poll_interval_ms / 1000
+            if oldest is not None:
+                wait = min(wait, max(oldest + max_latency_ms / 1000 - now, 0.0))
+            sleep(wait)
+    except KeyboardInterrupt:
+        LOGGER.warning("Interruption utilisateur, chargement du batch en cours.")
+    finally:
+        try:
+            flush()
+        finally:
+            engine.dispose()
+            log_dedup_stats(dedup)
+    return total
+
+
+def run_group(
+    config: SimpleETLConfig,
+    group: Optional[str] = None,
+    member_id: Optional[str] = None,
+    follow: bool = False,
+    poll_interval_ms: int = DEFAULT_POLL_INTERVAL_MS,
+    idle_timeout_s: Optional[float] = None,
+    session_timeout_s: float = DEFAULT_SESSION_TIMEOUT_S,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Consomme les partitions attribuées à ce membre du groupe `group` d'une file partitionnée.
+
+    Chaque tour charge au plus un batch par partition possédée, avec sa
+    position propre (source = fichier de la partition, consumer = groupe).
+    Le rééquilibrage se fait entre deux tours, une fois les positions
+    enregistrées. Sans `follow`, le process s'arrête au premier tour vide.
+    """
+    group = group or config.consumer_name
+    init_sqlite_db(config.db_path)
+    # Plusieurs membres écrivent dans la même base: WAL et attente des verrous au lieu d'échouer.
+    engine = create_engine(f"sqlite:///{config.db_path}", connect_args={"timeout": 30})
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+    heartbeat_interval_s = min(1.0, session_timeout_s / 3)
+    dedup = Deduplicator(config.dedup_cache)
+    total = 0
+    last_data = clock()
+    try:
+        with ConsumerGroup(config.input_file, group, member_id, session_timeout_s) as membership:
+            LOGGER.info("Membre %s du groupe %s sur %s", membership.member_id, group, config.input_file)
+            while True:
+                loaded = 0
+                for partition in membership.heartbeat(heartbeat_interval_s):
+                    path = membership.path(partition)
+                    if not path.exists() or not membership.still_owns(partition):
+                        continue
+                    partition_config = replace(config, input_file=path, consumer_name=group)
+                    source = str(path.resolve())
+                    position = get_queue_position(engine, group, source)
+                    batch = read_queue_batch(path, position, config.batch_size, decode=not config.arrow)
+                    if batch.end.line == position.line:
+                        continue
+                    loaded += batch.end.line - position.line
+                    total += load_batch(engine, partition_config, source, batch.records, batch.end, batch.invalid, batch.raw, dedup)
+                    # Heartbeat entre deux batches: les partitions cédées ne passent plus `still_owns`.
+                    membership.heartbeat(heartbeat_interval_s)
+                if loaded:
+                    last_data = clock()
+                    continue
+                if membership.waiting:
+                    # Attendre une partition encore verrouillée par son ancien propriétaire n'est pas de l'inactivité.
+                    last_data = clock()
+                elif not follow:
+                    break
+                if idle_timeout_s is not None and clock() - last_data >= idle_timeout_s:
+                    LOGGER.info("Aucune donnée depuis %.1f s, arrêt du membre.", clock() - last_data)
+                    break
+                sleep(poll_interval_ms / 1000)
+    except KeyboardInterrupt:
+        LOGGER.warning("Interruption utilisateur, départ du groupe.")
+    finally:
+        engine.dispose()
+        log_dedup_stats(dedup)
+    return total
+
 
-        return curated_count
+def run_catch_up(config: SimpleETLConfig, workers: Optional[int] = None, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> int:
+    """Draine tout l'arriéré non lu: fichier découpé en blocs parsés en parallèle.
+
+    Les blocs sont parsés par `workers` processus (mmap + lecteur JSON pyarrow)
+    en tables Arrow, puis chargés dans l'ordre; chaque bloc est inséré avec
+    sa position dans une seule transaction, comme un batch de `run_etl`.
+    """
+    init_sqlite_db(config.db_path)
+    engine = create_engine(f"sqlite:///{config.db_path}")
+    source = str(config.input_file.resolve())
+    if config.processed_file:
+        LOGGER.warning("--processed est ignoré en mode rattrapage.")
+
+    dedup = Deduplicator(config.dedup_cache)
+    total = 0
+    try:
+        if not config.input_file.exists():
+            LOGGER.warning("Fichier d'entrée non trouvé: %s", config.input_file)
+            return 0
+        position = get_queue_position(engine, config.consumer_name, source)
+        if config.input_file.is_dir():
+            chunks, first_offset = plan_log_chunks(config.input_file, position, chunk_bytes)
+            position = QueuePosition(offset=position.offset, line=first_offset)
+        else:
+            chunks = plan_chunks(config.input_file, position.offset, chunk_bytes)
+        LOGGER.info("Rattrapage de %s (%s blocs, %s workers)", config.input_file, len(chunks), workers or os.cpu_count())
+
+        for chunk in iter_parsed(chunks, workers):
+            dead_letters = invalid_lines(source, [(position.line + line, raw, error) for line, raw, error in chunk.invalid])
+            if config.arrow:
+                arrow_batch, rejected = validate(ArrowBatch(chunk.table, chunk_lines(chunk)))
+                dead_letters.extend(from_raw(raw, reason, source) for raw, reason in rejected)
+                transformed = derive(arrow_batch)
+            else:
+                transformed = transform_frame(chunk.table.to_pandas(), dead_letters, source)
+            transformed, keys = deduplicate(dedup, transformed)
+            position = advance(position, chunk)
+            with engine.begin() as conn:
+                if config.arrow:
+                    total += insert_arrow_records(conn, transformed)
+                else:
+                    insert_raw_records(conn, transformed)
+                    total += insert_curated_records(conn, transformed)
+                dead_letter_sink(config, conn).write(dead_letters)
+                commit_queue_position(conn, config.consumer_name, source, position)
+            dedup.remember(keys)
+            log_summary(dead_letters, LOGGER)
+            LOGGER.info("Bloc chargé: %s transactions, position: octet %s / ligne %s", len(transformed), position.offset, position.line)
+            if config.delete_consumed and config.input_file.is_dir():
+                delete_consumed(config.input_file, min_committed_line(engine, source) or 0)
+        log_dedup_stats(dedup)
+        return total
     finally:
         engine.dispose()
 
@@ -281,15 +778,95 @@ def run_etl(config: SimpleETLConfig) -> int:
 @click.option("--db", type=click.Path(path_type=Path), default=Path("data/transactions.db"), help="Chemin de la base SQLite")
 @click.option("--batch-size", type=int, default=500, help="Taille du batch")
 @click.option("--processed", type=click.Path(path_type=Path), default=None, help="Fichier pour déplacer les lignes traitées")
-def cli(input: Path, db: Path, batch_size: int, processed: Optional[Path]) -> None:
+@click.option("--reset-to-time", default=None, help="Rejouer depuis cet horodatage ISO 8601 (UTC si sans fuseau)")
+@click.option("--reset-to-offset", type=click.IntRange(min=0), default=None, help="Rejouer depuis ce numéro d'enregistrement")
+@click.option("--dead-letter-file", type=click.Path(path_type=Path), default=None, help="Fichier JSONL des enregistrements rejetés (défaut: table dead_letters)")
+@click.option("--delete-consumed", is_flag=True, default=False, help="Journal segmenté: supprimer les segments déjà consommés")
+@click.option("--arrow", is_flag=True, default=False, help="Chemin Arrow de bout en bout (décodage, transformation et insertion colonnaires, pyarrow)")
+@click.option("--dedup-cache", type=click.IntRange(min=0), default=DEFAULT_CACHE_SIZE, show_default=True, help="Lignes récemment chargées (id + empreinte du contenu) gardées pour écarter les rejeux entre batches (0 = dans le batch seulement)")
+@click.option("--catch-up", is_flag=True, default=False, help="Drainer tout l'arriéré avec un parsing parallèle (pyarrow)")
+@click.option("--workers", type=click.IntRange(min=1), default=None, help="Processus de parsing en mode rattrapage (défaut: nombre de coeurs)")
+@click.option("--follow", is_flag=True, default=False, help="Suivre la file en continu (micro-batches, process long)")
+@click.option("--max-latency-ms", type=click.IntRange(min=0), default=DEFAULT_MAX_LATENCY_MS, show_default=True, help="Mode suivi: délai max avant chargement d'un micro-batch")
+@click.option("--poll-ms", type=click.IntRange(min=1), default=DEFAULT_POLL_INTERVAL_MS, show_default=True, help="Mode suivi: période de relecture quand la file est vide")
+@click.option("--idle-timeout", type=float, default=None, help="Mode suivi: arrêt après N secondes sans nouvelles données")
+@click.option("--group", default=None, help="File partitionnée: groupe de consumers (défaut: file-queue-to-sqlite)")
+@click.option("--member-id", default=None, help="File partitionnée: identifiant du membre (défaut: hôte-pid)")
+@click.option("--session-timeout", type=float, default=DEFAULT_SESSION_TIMEOUT_S, show_default=True, help="File partitionnée: secondes sans heartbeat avant de reprendre les partitions d'un membre")
+@click.option("--chunk-mb", type=click.IntRange(min=1), default=DEFAULT_CHUNK_BYTES // (1024 * 1024), show_default=True, help="Taille des blocs en mode rattrapage")
+def cli(
+    input: Path,
+    db: Path,
+    batch_size: int,
+    processed: Optional[Path],
+    reset_to_time: Optional[str],
+    reset_to_offset: Optional[int],
+    dead_letter_file: Optional[Path],
+    delete_consumed: bool,
+    arrow: bool,
+    dedup_cache: int,
+    catch_up: bool,
+    follow: bool,
+    max_latency_ms: int,
+    poll_ms: int,
+    idle_timeout: Optional[float],
+    group: Optional[str],
+    member_id: Optional[str],
+    session_timeout: float,
+    workers: Optional[int],
+    chunk_mb: int,
+) -> None:
     """CLI pour traiter un batch depuis un fichier vers SQLite."""
     config = SimpleETLConfig(
         input_file=input,
         db_path=db,
         batch_size=batch_size,
         processed_file=processed,
+        delete_consumed=delete_consumed,
+        dead_letter_file=dead_letter_file,
+        arrow=arrow,
+        dedup_cache=dedup_cache,
     )
-    processed_count = run_etl(config)
+    if reset_to_time is not None or reset_to_offset is not None:
+        if is_partitioned(input):
+            raise click.UsageError("--reset-to-* ne gère pas les files partitionnées.")
+        since = None
+        if reset_to_time is not None:
+            try:
+                since = datetime.fromisoformat(reset_to_time)
+            except ValueError as exc:
+                raise click.BadParameter(str(exc), param_hint="--reset-to-time") from exc
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+        try:
+            reset_queue_position(config, since=since, line=reset_to_offset)
+        except ValueError as exc:
+            raise click.UsageError(str(exc)) from exc
+    if is_partitioned(input):
+        if catch_up:
+            raise click.UsageError("--catch-up ne gère pas les files partitionnées, lancer plusieurs membres avec --group.")
+        processed_count = run_group(
+            config,
+            group=group,
+            member_id=member_id,
+            follow=follow,
+            poll_interval_ms=poll_ms,
+            idle_timeout_s=idle_timeout,
+            session_timeout_s=session_timeout,
+        )
+        LOGGER.info("Traitement terminé (%s événements).", processed_count)
+        return
+    if catch_up:
+        processed_count = run_catch_up(config, workers=workers, chunk_bytes=chunk_mb * 1024 * 1024)
+    if follow:
+        processed_count = (processed_count if catch_up else 0) + run_follow(
+            config,
+            max_latency_ms=max_latency_ms,
+            poll_interval_ms=poll_ms,
+            idle_timeout_s=idle_timeout,
+        )
+    elif not catch_up:
+        processed_count = run_etl(config)
     LOGGER.info("Traitement terminé (%s événements).", processed_count)
 
 
@@ -6,62 +6,36 @@ import sys
 import sqlite3
 import json
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional, Tuple
 
+import numpy as np
 
-def generate_transaction():
-    """Generate a synthetic transaction payload."""
-    import random
-    import uuid
-    
-    CATEGORIES = [
-        "grocery",
-        "electronics",
-        "travel",
-        "fashion",
-        "restaurants",
-        "entertainment",
-        "health",
-    ]
-    STATUSES = ["APPROVED", "DECLINED", "PENDING", "REFUNDED"]
-    CITIES = [
-        "Paris",
-        "Lyon",
-        "Marseille",
-        "Toulouse",
-        "Bordeaux",
-        "Nice",
-        "Nantes",
-    ]
-    MERCHANTS = [
-        "Amazon",
-        "Uber",
-        "Carrefour",
-        "Fnac",
-        "Airbnb",
-        "Zara",
-        "Decathlon",
-    ]
-    
-    amount = round(random.uniform(5.0, 750.0), 2)
-    created_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "transaction_id": str(uuid.uuid4()),
-        "event_ts": created_at,
-        "user_id": random.randint(1, 5_000),
-        "amount": amount,
-        "merchant": random.choice(MERCHANTS),
-        "category": random.choice(CATEGORIES),
-        "city": random.choice(CITIES),
-        "status": random.choices(STATUSES, weights=[0.75, 0.1, 0.1, 0.05])[0],
-        "payment_method": random.choice(["card", "wallet", "bank_transfer"]),
-        "currency": "EUR",
-    }
+from common.generator import TransactionBatch, generate_batch
+from common.transform import AMOUNT_BUCKETS, DAY_NAMES, amount_bucket_codes
+
+# Nombre de transactions générées et insérées par lot en mode bulk.
+BULK_CHUNK = 100_000
+# Les event_ts sont répartis uniformément sur les N derniers jours (dates, heures et jours variés).
+DEFAULT_HISTORY_DAYS = 30
+# PRAGMA de chargement massif: pas de journal ni de fsync, cache de 256 Mo.
+# Une coupure pendant le chargement laisse une base inutilisable, à recréer.
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA locking_mode = EXCLUSIVE",
+)
+RESTORE_PRAGMAS = (
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = FULL",
+    "PRAGMA locking_mode = NORMAL",
+)
 
 
-def create_tables(conn: sqlite3.Connection) -> None:
-    """Crée les tables dans la base de données."""
+def create_tables(conn: sqlite3.Connection, with_indexes: bool = True) -> None:
+    """Crée les tables dans la base de données (et leurs index si `with_indexes`)."""
     cursor = conn.cursor()
     
     # Créer les tables
@@ -94,7 +68,14 @@ def create_tables(conn: sqlite3.Connection) -> None:
         )
     """)
     
-    # Créer les index
+    conn.commit()
+    if with_indexes:
+        create_indexes(conn)
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    """Crée les index secondaires de transactions_flat."""
+    cursor = conn.cursor()
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_transactions_flat_user_id 
         ON transactions_flat (user_id)
@@ -170,7 +151,102 @@ def insert_transaction(cursor: sqlite3.Cursor, record: dict, ingested_at: str) -
         return False
 
 
-def main(rows: Optional[int] = 500, db_path: Optional[Path] = None, append: bool = False) -> bool:
+def _raw_rows(batch: TransactionBatch, ingested_at: str) -> Iterator[Tuple]:
+    """Lignes de raw_transactions pour un lot, sans passer par des dicts."""
+    return zip(
+        batch.transaction_id.tolist(),
+        batch.event_ts.tolist(),
+        batch.to_json(),
+        [ingested_at] * len(batch),
+    )
+
+
+def _flat_rows(batch: TransactionBatch, ingested_at: str) -> Iterator[Tuple]:
+    """Lignes de transactions_flat: colonnes dérivées calculées par NumPy, comme `insert_transaction`."""
+    event_ts = batch.event_ts
+    days, micros = np.divmod(batch.event_ts_us, 86_400_000_000)
+    columns = (
+        batch.transaction_id,
+        event_ts,
+        event_ts.astype("U10"),
+        micros // 3_600_000_000,
+        DAY_NAMES[(days + 3) % 7],
+        batch.user_id,
+        batch.amount,
+        AMOUNT_BUCKETS[amount_bucket_codes(batch.amount)],
+        batch.merchant,
+        batch.category,
+        batch.city,
+        batch.status,
+        batch.payment_method,
+        batch.currency,
+    )
+    return zip(*(column.tolist() for column in columns), [ingested_at] * len(batch))
+
+
+def event_window(history_days: int = DEFAULT_HISTORY_DAYS) -> Tuple[datetime, float]:
+    """Début et durée (secondes) de la fenêtre des event_ts: les `history_days` jours jusqu'à maintenant."""
+    span = timedelta(days=history_days)
+    return datetime.now(timezone.utc) - span, span.total_seconds()
+
+
+def bulk_load(
+    conn: sqlite3.Connection,
+    rows: int,
+    chunk_size: int = BULK_CHUNK,
+    seed: Optional[int] = None,
+    history_days: int = DEFAULT_HISTORY_DAYS,
+) -> int:
+    """Génère et insère `rows` transactions par lots vectorisés, une transaction SQL par lot.
+
+    Les event_ts sont répartis sur la même fenêtre que le chargement normal
+    (`event_window`). Les index secondaires sont créés après le chargement,
+    une fois les données en place.
+    """
+    for pragma in BULK_PRAGMAS:
+        conn.execute(pragma)
+    rng = np.random.default_rng(seed)
+    ingested_at = datetime.now(timezone.utc).isoformat()
+    start, span_seconds = event_window(history_days)
+    cursor = conn.cursor()
+    inserted = 0
+    try:
+        while inserted < rows:
+            batch = generate_batch(min(chunk_size, rows - inserted), rng=rng, start=start, span_seconds=span_seconds)
+            # Insérer dans l'ordre des clés primaires garde les B-trees en cache.
+            batch = batch.take(np.argsort(batch.transaction_id))
+            with conn:
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO raw_transactions 
+                    (transaction_id, event_ts, payload, ingested_at)
+                    VALUES (?, ?, ?, ?)
+                """, _raw_rows(batch, ingested_at))
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO transactions_flat (
+                        transaction_id, event_ts, event_date, event_hour, event_dayofweek,
+                        user_id, amount, amount_bucket, merchant, category, city, status,
+                        payment_method, currency, ingested_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, _flat_rows(batch, ingested_at))
+            inserted += len(batch)
+            print(f"  {inserted}/{rows} transactions insérées", end="\r", flush=True)
+        print()
+        create_indexes(conn)
+    finally:
+        for pragma in RESTORE_PRAGMAS:
+            conn.execute(pragma)
+    return inserted
+
+
+def main(
+    rows: Optional[int] = 500,
+    db_path: Optional[Path] = None,
+    append: bool = False,
+    bulk: bool = False,
+    seed: Optional[int] = None,
+    history_days: int = DEFAULT_HISTORY_DAYS,
+) -> bool:
     """
     Crée la base de données SQLite avec des données de test.
     
@@ -178,6 +254,9 @@ def main(rows: Optional[int] = 500, db_path: Optional[Path] = None, append: bool
         rows: Nombre de transactions à générer (défaut: 500)
         db_path: Chemin de la base de données (défaut: data/transactions.db)
         append: Si True, ajoute des transactions à la base existante au lieu de la recréer
+        bulk: Si True, chargement massif par lots (`bulk_load`), index créés à la fin
+        seed: Graine aléatoire pour la reproductibilité
+        history_days: Nombre de jours (jusqu'à maintenant) sur lesquels les event_ts sont répartis
     
     Returns:
         True si la création a réussi, False sinon
@@ -204,9 +283,9 @@ def main(rows: Optional[int] = 500, db_path: Optional[Path] = None, append: bool
         # Connexion à la base de données
         conn = sqlite3.connect(str(db_path))
         
-        # Créer les tables si elles n'existent pas
+        # Créer les tables si elles n'existent pas (en bulk, les index après les données)
         if not db_exists:
-            create_tables(conn)
+            create_tables(conn, with_indexes=not bulk)
         
         # Vérifier que les tables existent
         cursor = conn.cursor()
@@ -219,17 +298,21 @@ def main(rows: Optional[int] = 500, db_path: Optional[Path] = None, append: bool
         ingested_at = datetime.now(timezone.utc).isoformat()
         inserted_count = 0
         
-        for i in range(rows):
-            try:
-                # Générer une transaction
-                record = generate_transaction()
-                
-                # Insérer la transaction
-                if insert_transaction(cursor, record, ingested_at):
-                    inserted_count += 1
-            except Exception as e:
-                print(f"Erreur transaction {i}: {e}")
-                continue
+        if bulk:
+            inserted_count = bulk_load(conn, rows, seed=seed, history_days=history_days)
+        else:
+            # Générer toutes les transactions en une passe vectorisée
+            start, span_seconds = event_window(history_days)
+            records = generate_batch(rows, seed, start=start, span_seconds=span_seconds).to_records()
+            
+            for i, record in enumerate(records):
+                try:
+                    # Insérer la transaction
+                    if insert_transaction(cursor, record, ingested_at):
+                        inserted_count += 1
+                except Exception as e:
+                    print(f"Erreur transaction {i}: {e}")
+                    continue
         
         conn.commit()
         conn.close()
@@ -270,13 +353,16 @@ if __name__ == "__main__":
     parser.add_argument("--rows", type=int, default=500, help="Nombre de transactions à générer")
     parser.add_argument("--db", type=str, default=None, help="Chemin de la base de données")
     parser.add_argument("--append", action="store_true", help="Ajouter des transactions à la base existante")
+    parser.add_argument("--bulk", action="store_true", help="Chargement massif par lots (bases de benchmark de plusieurs millions de lignes)")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire pour la reproductibilité")
+    parser.add_argument("--days", type=int, default=DEFAULT_HISTORY_DAYS, help="Jours d'historique couverts par les event_ts")
     
     args = parser.parse_args()
     
     if args.db:
         db_path = Path(args.db)
     
-    success = main(rows=args.rows, db_path=db_path, append=args.append)
+    success = main(rows=args.rows, db_path=db_path, append=args.append, bulk=args.bulk, seed=args.seed, history_days=args.days)
     
     if success:
         print(f"Base: {db_path}")
@@ -1,57 +1,49 @@
-import json
 import logging
-import random
+import multiprocessing
+import sys
 import time
-import uuid
-from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Optional
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
 
 import click
+import numpy as np
 from kafka import KafkaProducer
 from tqdm import tqdm
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from common.codecs import CODECS, DEFAULT_CODEC, get_codec  # noqa: E402
+from common.delivery import DEFAULT_MAX_IN_FLIGHT, DeliveryTracker  # noqa: E402
+from common.generator import USER_ID_MAX, USER_ID_MIN, generate_transaction, iter_batches  # noqa: E402,F401
+from common.partitioning import PARTITION_KEYS, crc32_partitioner, serialize_key  # noqa: E402
+from common.rate_limit import TokenBucket  # noqa: E402
+from common.scenarios import Scenario, ScenarioEngine, load_scenario  # noqa: E402
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(name)s - %(message)s",
 )
 LOGGER = logging.getLogger("transaction-producer")
 
+# Events generated per vectorized call to `generate_batch`.
+GENERATION_CHUNK = 10_000
+# How often the multi-process coordinator refreshes aggregated progress.
+PROGRESS_INTERVAL_S = 0.5
+# How often acknowledgement metrics are logged while producing.
+DELIVERY_REPORT_INTERVAL_S = 10.0
+
+SeedLike = Union[None, int, np.random.SeedSequence]
+
 
-CATEGORIES = [
-    "grocery",
-    "electronics",
-    "travel",
-    "fashion",
-    "restaurants",
-    "entertainment",
-    "health",
-]
-STATUSES = ["APPROVED", "DECLINED", "PENDING", "REFUNDED"]
-CITIES = [
-    "Paris",
-    "Lyon",
-    "Marseille",
-    "Toulouse",
-    "Bordeaux",
-    "Nice",
-    "Nantes",
-]
-MERCHANTS = [
-    "Amazon",
-    "Uber",
-    "Carrefour",
-    "Fnac",
-    "Airbnb",
-    "Zara",
-    "Decathlon",
-]
-
-
-def _build_producer(bootstrap_server: str) -> KafkaProducer:
+def _build_producer(bootstrap_server: str, codec: str = DEFAULT_CODEC) -> KafkaProducer:
     """Instantiate a Kafka producer with sane defaults."""
     return KafkaProducer(
         bootstrap_servers=bootstrap_server,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        value_serializer=get_codec(codec).encode,
+        key_serializer=serialize_key,
+        partitioner=crc32_partitioner,
         linger_ms=100,
         batch_size=32_768,
         retries=5,
@@ -59,64 +51,57 @@ def _build_producer(bootstrap_server: str) -> KafkaProducer:
     )
 
 
-def generate_transaction() -> Dict[str, Any]:
-    """Generate a synthetic transaction payload."""
-    amount = round(random.uniform(5.0, 750.0), 2)
-    created_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "transaction_id": str(uuid.uuid4()),
-        "event_ts": created_at,
-        "user_id": random.randint(1, 5_000),
-        "amount": amount,
-        "merchant": random.choice(MERCHANTS),
-        "category": random.choice(CATEGORIES),
-        "city": random.choice(CITIES),
-        "status": random.choices(STATUSES, weights=[0.75, 0.1, 0.1, 0.05])[0],
-        "payment_method": random.choice(["card", "wallet", "bank_transfer"]),
-        "currency": "EUR",
-    }
-
-
-def _rate_limiter(rate: Optional[int]) -> Iterable[None]:
-    """Yield control to respect the target rate (events per second)."""
-    if not rate or rate <= 0:
-        while True:
-            yield
-    interval = 1.0 / rate
-    last_emit = time.perf_counter()
-    while True:
-        now = time.perf_counter()
-        elapsed = now - last_emit
-        if elapsed < interval:
-            time.sleep(interval - elapsed)
-        last_emit = time.perf_counter()
-        yield
-
-
 def _send_transactions(
     producer: KafkaProducer,
     topic: str,
     rows: Optional[int],
     rate: Optional[int],
-) -> None:
-    limiter = _rate_limiter(rate)
+    seed: SeedLike = None,
+    user_id_range: Tuple[int, int] = (USER_ID_MIN, USER_ID_MAX),
+    sent_counter: Optional[Any] = None,
+    burst: Optional[int] = None,
+    partition_key: str = "none",
+    scenario: Optional[Scenario] = None,
+    max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
+) -> int:
+    rng = np.random.default_rng(seed)
+    tracker = DeliveryTracker(max_in_flight)
+    if scenario is not None:
+        # The scenario sets the pace itself (base rate, curves, time scale).
+        source: Any = ScenarioEngine(scenario, rng, user_id_range=user_id_range)
+        batches = source.batches(rows)
+    else:
+        source = TokenBucket(rate, burst=burst)
+        # The limiter releases a batch of tokens, generated and sent in one go.
+        batches = iter_batches(rows, source, rng, GENERATION_CHUNK, user_id_range=user_id_range)
     sent = 0
+    next_report = time.monotonic() + DELIVERY_REPORT_INTERVAL_S
     with tqdm(
         total=rows if rows and rows > 0 else None,
         unit="event",
         desc="Producing transactions",
+        disable=sent_counter is not None,
     ) as progress:
-        while True:
-            limiter.__next__()
-            payload = generate_transaction()
-            producer.send(topic, value=payload)
-            sent += 1
+        for batch in batches:
+            size = len(batch)
+            # Blocks (and so stalls generation) while too many sends are unacknowledged.
+            tracker.wait_for_room(size)
+            keys = None if partition_key == "none" else getattr(batch, partition_key).tolist()
+            tracker.send_batch(producer, topic, batch.to_records(), keys)
+            sent += size
+            if time.monotonic() >= next_report:
+                LOGGER.info("Delivery: %s", tracker.summary())
+                next_report = time.monotonic() + DELIVERY_REPORT_INTERVAL_S
+            if sent_counter is not None:
+                sent_counter.value = sent
             if progress.total:
-                progress.update(1)
-            if rows and rows > 0 and sent >= rows:
-                break
+                progress.update(size)
     producer.flush()
-    LOGGER.info("Sent %s events to topic %s", sent, topic)
+    LOGGER.info("Sent %s events to topic %s - %s", sent, topic, source.summary())
+    LOGGER.info("Delivery: %s", tracker.summary())
+    if tracker.failed:
+        LOGGER.error("%s events were not delivered (first error: %r)", tracker.failed, tracker.first_error)
+    return sent
 
 
 def produce_transactions(
@@ -124,15 +109,175 @@ def produce_transactions(
     rate: Optional[int],
     topic: str,
     bootstrap_server: str,
+    seed: Optional[int] = None,
+    burst: Optional[int] = None,
+    codec: str = DEFAULT_CODEC,
+    partition_key: str = "none",
+    scenario: Optional[Scenario] = None,
+    max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
+) -> int:
+    producer = _build_producer(bootstrap_server, codec)
+    try:
+        return _send_transactions(
+            producer,
+            topic,
+            rows=rows or None,
+            rate=rate or None,
+            seed=seed,
+            burst=burst,
+            partition_key=partition_key,
+            scenario=scenario,
+            max_in_flight=max_in_flight,
+        )
+    finally:
+        producer.flush()
+        producer.close()
+
+
+def _split_evenly(total: int, parts: int) -> List[int]:
+    """Split `total` into `parts` integers that differ by at most one."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if index < extra else 0) for index in range(parts)]
+
+
+def _user_id_slice(worker_id: int, workers: int) -> Tuple[int, int]:
+    """Inclusive slice of the user id key space owned by `worker_id`."""
+    span = USER_ID_MAX - USER_ID_MIN + 1
+    low = USER_ID_MIN + span * worker_id // workers
+    high = USER_ID_MIN + span * (worker_id + 1) // workers - 1
+    return low, high
+
+
+def _worker_main(
+    worker_id: int,
+    rows: Optional[int],
+    rate: Optional[int],
+    topic: str,
+    bootstrap_server: str,
+    seed: np.random.SeedSequence,
+    user_id_range: Tuple[int, int],
+    sent_counter: Any,
+    burst: Optional[int],
+    codec: str,
+    partition_key: str,
+    scenario: Optional[Scenario],
+    max_in_flight: Optional[int],
 ) -> None:
-    producer = _build_producer(bootstrap_server)
+    """Body of one producer process: own KafkaProducer, own key slice, own rate share."""
+    LOGGER.info(
+        "Worker %s starting rows=%s rate=%s user_ids=%s-%s",
+        worker_id,
+        rows,
+        rate,
+        *user_id_range,
+    )
+    producer = _build_producer(bootstrap_server, codec)
     try:
-        _send_transactions(producer, topic, rows=rows or None, rate=rate or None)
+        _send_transactions(
+            producer,
+            topic,
+            rows=rows,
+            rate=rate,
+            seed=seed,
+            user_id_range=user_id_range,
+            sent_counter=sent_counter,
+            burst=burst,
+            partition_key=partition_key,
+            scenario=scenario,
+            max_in_flight=max_in_flight,
+        )
+    except KeyboardInterrupt:
+        LOGGER.warning("Worker %s interrompu.", worker_id)
     finally:
         producer.flush()
         producer.close()
 
 
+def produce_transactions_parallel(
+    rows: Optional[int],
+    rate: Optional[int],
+    topic: str,
+    bootstrap_server: str,
+    workers: int,
+    seed: Optional[int] = None,
+    burst: Optional[int] = None,
+    codec: str = DEFAULT_CODEC,
+    partition_key: str = "none",
+    scenario: Optional[Scenario] = None,
+    max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
+) -> int:
+    """Fan production out to `workers` processes and aggregate their progress.
+
+    `rows` and `rate` are totals: the coordinator splits them across workers
+    and each worker only draws user ids from its own slice of the key space.
+    With a `scenario`, each worker generates its slice's share of the traffic.
+    `max_in_flight` bounds the unacknowledged sends of each worker.
+    """
+    for limit in (rows, rate):
+        if limit and limit < workers:
+            LOGGER.warning("Only %s events to split, reducing workers from %s", limit, workers)
+            workers = limit
+    rows_split = _split_evenly(rows, workers) if rows else [None] * workers
+    rate_split = _split_evenly(rate, workers) if rate else [None] * workers
+    burst_split = _split_evenly(burst, workers) if burst and burst >= workers else [None] * workers
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    context = multiprocessing.get_context()
+    counters = [context.Value("q", 0, lock=False) for _ in range(workers)]
+    processes = [
+        context.Process(
+            target=_worker_main,
+            name=f"producer-worker-{worker_id}",
+            args=(
+                worker_id,
+                rows_split[worker_id],
+                rate_split[worker_id],
+                topic,
+                bootstrap_server,
+                seeds[worker_id],
+                _user_id_slice(worker_id, workers),
+                counters[worker_id],
+                burst_split[worker_id],
+                codec,
+                partition_key,
+                scenario,
+                max_in_flight,
+            ),
+        )
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    started = time.monotonic()
+    sent = 0
+    try:
+        with tqdm(total=rows or None, unit="event", desc=f"Producing transactions ({workers} workers)") as progress:
+            while any(process.is_alive() for process in processes):
+                time.sleep(PROGRESS_INTERVAL_S)
+                sent = sum(counter.value for counter in counters)
+                progress.update(sent - progress.n)
+            sent = sum(counter.value for counter in counters)
+            progress.update(sent - progress.n)
+    finally:
+        for process in processes:
+            process.join()
+
+    failed = [process.name for process in processes if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Producer workers failed: {', '.join(failed)}")
+    elapsed = time.monotonic() - started
+    LOGGER.info(
+        "Sent %s events to topic %s with %s workers - achieved %.0f events/s (target %s)",
+        sent,
+        topic,
+        workers,
+        sent / elapsed if elapsed > 0 else 0.0,
+        f"{rate}/s" if rate else "unlimited",
+    )
+    return sent
+
+
 @click.command()
 @click.option("--rows", type=int, default=0, help="Nombre d'événements à produire (0 = infini)")
 @click.option("--rate", type=int, default=50, help="Débit cible en événements/seconde (0 = sans limite)")
@@ -145,17 +290,102 @@ def produce_transactions(
     show_default=True,
     help="Adresse du cluster Kafka",
 )
-def main(rows: int, rate: int, topic: str, bootstrap_server: str) -> None:
+@click.option("--seed", type=int, default=None, help="Graine aléatoire pour la reproductibilité")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Nombre de processus producteurs (débit et volume répartis entre eux)",
+)
+@click.option(
+    "--burst",
+    type=int,
+    default=None,
+    help="Nombre max d'événements libérés d'un coup par le limiteur (défaut: 50 ms de trafic)",
+)
+@click.option(
+    "--codec",
+    type=click.Choice(sorted(CODECS)),
+    default=DEFAULT_CODEC,
+    show_default=True,
+    help="Sérialiseur des messages Kafka (doit correspondre à KAFKA_CODEC côté consumer)",
+)
+@click.option(
+    "--partition-key",
+    type=click.Choice(PARTITION_KEYS),
+    default="none",
+    show_default=True,
+    help="Clé de partitionnement Kafka (none = répartition aléatoire)",
+)
+@click.option(
+    "--scenario",
+    "scenario_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Scénario de trafic JSON/YAML (remplace --rate et --burst)",
+)
+@click.option(
+    "--max-in-flight",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_IN_FLIGHT,
+    show_default=True,
+    help="Messages non acquittés max par processus avant de bloquer la génération (0 = sans limite)",
+)
+def main(
+    rows: int,
+    rate: int,
+    topic: str,
+    bootstrap_server: str,
+    seed: Optional[int],
+    workers: int,
+    burst: Optional[int],
+    codec: str,
+    partition_key: str,
+    scenario_path: Optional[Path],
+    max_in_flight: int,
+) -> None:
     """Entrée CLI principale pour générer et envoyer des transactions vers Kafka."""
     LOGGER.info(
-        "Starting producer rows=%s rate=%s topic=%s bootstrap=%s",
+        "Starting producer rows=%s rate=%s topic=%s bootstrap=%s workers=%s codec=%s partition_key=%s scenario=%s",
         rows,
         rate,
         topic,
         bootstrap_server,
+        workers,
+        codec,
+        partition_key,
+        scenario_path,
     )
+    scenario = load_scenario(scenario_path) if scenario_path else None
     try:
-        produce_transactions(rows=rows or None, rate=rate or None, topic=topic, bootstrap_server=bootstrap_server)
+        if workers > 1:
+            produce_transactions_parallel(
+                rows=rows or None,
+                rate=rate or None,
+                topic=topic,
+                bootstrap_server=bootstrap_server,
+                workers=workers,
+                seed=seed,
+                burst=burst,
+                codec=codec,
+                partition_key=partition_key,
+                scenario=scenario,
+                max_in_flight=max_in_flight or None,
+            )
+        else:
+            produce_transactions(
+                rows=rows or None,
+                rate=rate or None,
+                topic=topic,
+                bootstrap_server=bootstrap_server,
+                seed=seed,
+                burst=burst,
+                codec=codec,
+                partition_key=partition_key,
+                scenario=scenario,
+                max_in_flight=max_in_flight or None,
+            )
     except KeyboardInterrupt:
         LOGGER.warning("Interruption utilisateur, arrêt du producteur.")
     finally:
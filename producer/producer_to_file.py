@@ -1,69 +1,39 @@
 """
 Version simplifiée du producer qui écrit dans un fichier JSONL au lieu de Kafka.
 
+Avec `--segment-mb`, la sortie est un journal segmenté (répertoire de segments
+de taille fixe indexés par offset, voir `common.segmented_log`). Avec
+`--partitions N`, la sortie est un répertoire de N partitions réparties par
+hash de `--partition-key`, consommables en parallèle par un groupe de consumers
+(voir `common.partitioned_queue`).
+
 Usage:
     python producer/producer_to_file.py --rows 10000 --rate 100 --output data/queue/transactions.jsonl
+    python producer/producer_to_file.py --rows 10000 --segment-mb 64 --output data/queue/transactions
+    python producer/producer_to_file.py --rows 10000 --partitions 4 --output data/queue/partitioned
 """
 
-import json
 import logging
-import random
-import time
-import uuid
-from datetime import datetime, timezone
+import sys
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Optional
 
 import click
+import numpy as np
 from tqdm import tqdm
 
-# Constantes pour la génération de transactions
-CATEGORIES = [
-    "grocery",
-    "electronics",
-    "travel",
-    "fashion",
-    "restaurants",
-    "entertainment",
-    "health",
-]
-STATUSES = ["APPROVED", "DECLINED", "PENDING", "REFUNDED"]
-CITIES = [
-    "Paris",
-    "Lyon",
-    "Marseille",
-    "Toulouse",
-    "Bordeaux",
-    "Nice",
-    "Nantes",
-]
-MERCHANTS = [
-    "Amazon",
-    "Uber",
-    "Carrefour",
-    "Fnac",
-    "Airbnb",
-    "Zara",
-    "Decathlon",
-]
-
-
-def generate_transaction() -> Dict[str, Any]:
-    """Generate a synthetic transaction payload."""
-    amount = round(random.uniform(5.0, 750.0), 2)
-    created_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "transaction_id": str(uuid.uuid4()),
-        "event_ts": created_at,
-        "user_id": random.randint(1, 5_000),
-        "amount": amount,
-        "merchant": random.choice(MERCHANTS),
-        "category": random.choice(CATEGORIES),
-        "city": random.choice(CITIES),
-        "status": random.choices(STATUSES, weights=[0.75, 0.1, 0.1, 0.05])[0],
-        "payment_method": random.choice(["card", "wallet", "bank_transfer"]),
-        "currency": "EUR",
-    }
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from common.file_queue import DURABILITY_MODES, DurabilityPolicy, GroupCommitWriter  # noqa: E402
+from common.generator import generate_transaction, iter_batches  # noqa: E402,F401
+from common.partitioned_queue import PartitionedQueueWriter  # noqa: E402
+from common.queue_index import DEFAULT_INDEX_INTERVAL_BYTES, TimeIndexedWriter  # noqa: E402
+from common.partitioning import PARTITION_KEYS  # noqa: E402
+from common.rate_limit import TokenBucket  # noqa: E402
+from common.segmented_log import SegmentedLogWriter  # noqa: E402
+from common.scenarios import Scenario, ScenarioEngine, load_scenario  # noqa: E402
 
 logging.basicConfig(
     level=logging.INFO,
@@ -71,40 +41,74 @@ logging.basicConfig(
 )
 LOGGER = logging.getLogger("transaction-producer-file")
 
-
-def _rate_limiter(rate: Optional[int]) -> None:
-    """Attend pour respecter le débit cible (événements par seconde)."""
-    if not rate or rate <= 0:
-        return
-    interval = 1.0 / rate
-    time.sleep(interval)
+# Nombre d'événements générés par appel vectorisé à `generate_batch`.
+GENERATION_CHUNK = 10_000
 
 
 def produce_to_file(
     rows: Optional[int],
     rate: Optional[int],
     output_file: Path,
+    seed: Optional[int] = None,
+    burst: Optional[int] = None,
+    durability: Optional[DurabilityPolicy] = None,
+    scenario: Optional[Scenario] = None,
+    segment_bytes: int = 0,
+    partitions: int = 0,
+    partition_key: str = "user_id",
+    index_interval_bytes: int = DEFAULT_INDEX_INTERVAL_BYTES,
 ) -> None:
-    """Génère des transactions et les écrit dans un fichier JSONL."""
+    """Génère des transactions et les écrit dans un fichier JSONL.
+
+    Avec `segment_bytes`, la sortie est un journal segmenté; avec `partitions`,
+    un répertoire de partitions (chacune fichier ou journal segmenté). Un
+    fichier unique est accompagné d'un index temps/offset (`<output>.timeindex`,
+    une entrée tous les `index_interval_bytes`, 0 = pas d'index) pour le replay.
+    """
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
+    rng = np.random.default_rng(seed)
+    if scenario is not None:
+        # Le scénario impose son propre rythme (débit de base, courbes, échelle de temps).
+        source: Any = ScenarioEngine(scenario, rng)
+        batches = source.batches(rows)
+    else:
+        source = TokenBucket(rate, burst=burst)
+        # Le limiteur libère un lot de jetons, générés et écrits d'un coup.
+        batches = iter_batches(rows, source, rng, GENERATION_CHUNK)
     sent = 0
-    with output_file.open("a", encoding="utf-8") as f, tqdm(
+    if partitions > 0:
+        writer: Any = PartitionedQueueWriter(output_file, partitions, partition_key, durability, segment_bytes=segment_bytes)
+    elif segment_bytes > 0:
+        writer = SegmentedLogWriter(output_file, durability, segment_bytes=segment_bytes)
+    elif index_interval_bytes > 0:
+        writer = TimeIndexedWriter(output_file, durability, index_interval_bytes=index_interval_bytes)
+    else:
+        writer = GroupCommitWriter(output_file, durability)
+    with writer, tqdm(
         total=rows if rows and rows > 0 else None,
         unit="event",
         desc="Producing transactions",
     ) as progress:
-        while True:
-            _rate_limiter(rate)
-            payload = generate_transaction()
-            f.write(json.dumps(payload) + "\n")
-            f.flush()  # Écriture immédiate
-            sent += 1
+        for batch in batches:
+            size = len(batch)
+            if partitions > 0:
+                writer.write_batch(batch)
+            elif isinstance(writer, TimeIndexedWriter):
+                writer.write_lines(batch.to_json(), batch.event_ts_us)
+            else:
+                writer.write_lines(batch.to_json())
+            sent += size
             if progress.total:
-                progress.update(1)
-            if rows and rows > 0 and sent >= rows:
-                break
-    LOGGER.info("Écrit %s événements dans %s", sent, output_file)
+                progress.update(size)
+    LOGGER.info(
+        "Écrit %s événements dans %s (%s écritures groupées, %s fsync) - %s",
+        sent,
+        output_file,
+        writer.flushes,
+        writer.fsyncs,
+        source.summary(),
+    )
 
 
 @click.command()
@@ -117,11 +121,103 @@ def produce_to_file(
     show_default=True,
     help="Fichier de sortie JSONL",
 )
-def main(rows: int, rate: int, output: Path) -> None:
+@click.option("--seed", type=int, default=None, help="Graine aléatoire pour la reproductibilité")
+@click.option(
+    "--burst",
+    type=int,
+    default=None,
+    help="Nombre max d'événements libérés d'un coup par le limiteur (défaut: 50 ms de trafic)",
+)
+@click.option(
+    "--durability",
+    type=click.Choice(DURABILITY_MODES),
+    default="group",
+    show_default=True,
+    help="per-record: flush à chaque événement, group: écriture groupée",
+)
+@click.option("--flush-records", type=int, default=1_000, show_default=True, help="Flush après N événements (mode group)")
+@click.option("--flush-ms", type=int, default=200, show_default=True, help="Flush après T millisecondes (mode group)")
+@click.option("--fsync-ms", type=int, default=0, show_default=True, help="fsync toutes les T millisecondes (0 = jamais)")
+@click.option(
+    "--segment-mb",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Taille des segments en Mo: --output devient un répertoire de segments (0 = fichier unique)",
+)
+@click.option(
+    "--index-kb",
+    type=click.IntRange(min=0),
+    default=DEFAULT_INDEX_INTERVAL_BYTES // 1024,
+    show_default=True,
+    help="Fichier unique: une entrée d'index temps/offset tous les N Ko (0 = pas d'index)",
+)
+@click.option(
+    "--partitions",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Nombre de partitions: --output devient un répertoire de partitions (0 = file unique)",
+)
+@click.option(
+    "--partition-key",
+    type=click.Choice(PARTITION_KEYS),
+    default="user_id",
+    show_default=True,
+    help="Champ haché pour choisir la partition (none = round-robin)",
+)
+@click.option(
+    "--scenario",
+    "scenario_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Scénario de trafic JSON/YAML (remplace --rate et --burst)",
+)
+def main(
+    rows: int,
+    rate: int,
+    output: Path,
+    seed: Optional[int],
+    burst: Optional[int],
+    durability: str,
+    flush_records: int,
+    flush_ms: int,
+    fsync_ms: int,
+    segment_mb: int,
+    index_kb: int,
+    partitions: int,
+    partition_key: str,
+    scenario_path: Optional[Path],
+) -> None:
     """Entrée CLI principale pour générer et écrire des transactions dans un fichier."""
-    LOGGER.info("Starting producer rows=%s rate=%s output=%s", rows, rate, output)
+    LOGGER.info(
+        "Starting producer rows=%s rate=%s output=%s durability=%s scenario=%s",
+        rows,
+        rate,
+        output,
+        durability,
+        scenario_path,
+    )
+    policy = DurabilityPolicy(
+        mode=durability,
+        flush_records=flush_records,
+        flush_interval_ms=flush_ms,
+        fsync_interval_ms=fsync_ms,
+    )
     try:
-        produce_to_file(rows=rows or None, rate=rate or None, output_file=output)
+        produce_to_file(
+            rows=rows or None,
+            rate=rate or None,
+            output_file=output,
+            seed=seed,
+            burst=burst,
+            durability=policy,
+            scenario=load_scenario(scenario_path) if scenario_path else None,
+            segment_bytes=segment_mb * 1024 * 1024,
+            partitions=partitions,
+            partition_key=partition_key,
+            index_interval_bytes=index_kb * 1024,
+        )
     except KeyboardInterrupt:
         LOGGER.warning("Interruption utilisateur, arrêt du producteur.")
     finally:
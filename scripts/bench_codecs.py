@@ -0,0 +1,49 @@
+"""
+Micro-benchmark des codecs Kafka: coût d'encodage/décodage par message.
+
+Usage:
+    python -m scripts.bench_codecs --messages 100000
+"""
+
+import time
+from typing import Callable, List
+
+import click
+
+from common.codecs import CODECS, get_codec
+from common.generator import generate_batch
+
+
+def _per_message_ns(func: Callable, items: List, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(items)
+
+
+@click.command()
+@click.option("--messages", type=int, default=100_000, show_default=True, help="Nombre de transactions encodées")
+@click.option("--repeat", type=int, default=3, show_default=True, help="Nombre de passes (meilleur temps retenu)")
+@click.option("--seed", type=int, default=42, show_default=True, help="Graine aléatoire pour la reproductibilité")
+def cli(messages: int, repeat: int, seed: int) -> None:
+    """Compare les codecs enregistrés (json, orjson, msgspec, binary) sur des transactions synthétiques."""
+    records = generate_batch(messages, seed).to_records()
+    click.echo(f"{'codec':<10} {'encode ns/msg':>14} {'decode ns/msg':>14} {'bytes/msg':>10}")
+    for name in sorted(CODECS):
+        try:
+            codec = get_codec(name)
+        except ImportError as exc:
+            click.echo(f"{name:<10} ignoré ({exc})")
+            continue
+        encoded = [codec.encode(record) for record in records]
+        encode_ns = _per_message_ns(codec.encode, records, repeat)
+        decode_ns = _per_message_ns(codec.decode, encoded, repeat)
+        size = sum(len(payload) for payload in encoded) / len(encoded)
+        click.echo(f"{name:<10} {encode_ns:>14.0f} {decode_ns:>14.0f} {size:>10.1f}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,84 @@
+"""
+Benchmark de la transformation des consumers: dérivation ligne à ligne
+historique contre `common.transform.derive_columns` (colonnaire).
+
+Les deux chemins partent du même batch validé; le script vérifie que les
+valeurs produites sont identiques avant d'afficher les temps.
+
+Usage:
+    python -m scripts.bench_transform --sizes 1000,100000,1000000
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import click
+import pandas as pd
+
+from common.generator import generate_batch
+from common.transform import derive_columns
+from common.validation import split_valid
+
+DERIVED = ["ingested_at", "amount_bucket", "event_date", "event_hour", "event_dayofweek"]
+
+
+def _derive_amount_bucket(amount: float) -> str:
+    if amount < 20:
+        return "<20"
+    if amount < 100:
+        return "20-100"
+    if amount < 250:
+        return "100-250"
+    if amount < 500:
+        return "250-500"
+    return ">=500"
+
+
+def reference_derive(df: pd.DataFrame, ingested_at: datetime) -> pd.DataFrame:
+    """Implémentation d'origine de `transform()` (map Python, `dt.date`, `dt.day_name()`)."""
+    df["ingested_at"] = ingested_at
+    df["amount_bucket"] = df["amount"].map(lambda x: _derive_amount_bucket(x or 0.0))
+    df["event_date"] = df["event_ts"].dt.date
+    df["event_hour"] = df["event_ts"].dt.hour
+    df["event_dayofweek"] = df["event_ts"].dt.day_name()
+    return df
+
+
+def _best_seconds(func: Callable[[pd.DataFrame], pd.DataFrame], frame: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        copy = frame.copy()
+        start = time.perf_counter()
+        func(copy)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option("--sizes", default="1000,100000,1000000", show_default=True, help="Tailles de batch, séparées par des virgules")
+@click.option("--repeat", type=int, default=3, show_default=True, help="Nombre de passes (meilleur temps retenu)")
+@click.option("--seed", type=int, default=42, show_default=True, help="Graine aléatoire pour la reproductibilité")
+def cli(sizes: str, repeat: int, seed: int) -> None:
+    """Compare les deux chemins et vérifie l'égalité de leurs sorties."""
+    ingested_at = datetime.now(timezone.utc)
+    click.echo(f"{'lignes':>10} {'ligne à ligne':>14} {'colonnaire':>12} {'gain':>7}")
+    for size in (int(value) for value in sizes.split(",")):
+        batch = generate_batch(size, seed, span_seconds=14 * 86_400)
+        frame, _ = split_valid(batch.to_frame())
+
+        expected = reference_derive(frame.copy(), ingested_at)
+        actual = derive_columns(frame.copy(), ingested_at)
+        pd.testing.assert_frame_equal(
+            actual[DERIVED].astype(object),
+            expected[DERIVED].astype(object),
+            check_dtype=False,
+        )
+
+        reference_s = _best_seconds(lambda df: reference_derive(df, ingested_at), frame, repeat)
+        columnar_s = _best_seconds(lambda df: derive_columns(df, ingested_at), frame, repeat)
+        click.echo(f"{size:>10} {reference_s * 1000:>12.1f}ms {columnar_s * 1000:>10.1f}ms {reference_s / columnar_s:>6.1f}x")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,48 +1,199 @@
+"""
+Génération de datasets synthétiques historiques (CSV, JSONL ou Parquet).
+
+Les transactions sont générées et écrites par lots successifs, chacun couvrant
+la tranche suivante de la fenêtre historique: la mémoire reste constante quel
+que soit `--rows`, et le fichier produit est trié chronologiquement. En Parquet,
+la sortie est un répertoire partitionné par `event_date` (un fichier par jour).
+
+Usage:
+    python -m scripts.generate_synthetic --rows 50000000 --format parquet --output data/synthetic
+"""
+
 import csv
-import random
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterator, Optional
 
 import click
+import numpy as np
+
+from common.generator import FIELDS, TransactionBatch, generate_batch
+from producer.producer import produce_transactions  # type: ignore
+
+HISTORY_DAYS = 7
+# Nombre de transactions générées et écrites par lot.
+CHUNK_ROWS = 200_000
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def iter_transactions(
+    rows: int,
+    seed: int,
+    chunk_size: int = CHUNK_ROWS,
+    history_days: int = HISTORY_DAYS,
+) -> Iterator[TransactionBatch]:
+    """Génère `rows` transactions sur `history_days` jours, par lots chronologiques."""
+    rng = np.random.default_rng(seed)
+    base_time = datetime.now(timezone.utc) - timedelta(days=history_days)
+    seconds_per_row = history_days * 24 * 3600 / max(rows, 1)
+    produced = 0
+    while produced < rows:
+        size = min(chunk_size, rows - produced)
+        batch = generate_batch(
+            size,
+            rng=rng,
+            start=base_time + timedelta(seconds=produced * seconds_per_row),
+            span_seconds=size * seconds_per_row,
+        )
+        produced += size
+        yield batch.take(np.argsort(batch.event_ts_us, kind="stable"))
+
+
+class CsvSink:
+    def __init__(self, output: Path) -> None:
+        self._file = output.open("w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(FIELDS)
+
+    def write(self, batch: TransactionBatch) -> None:
+        self._writer.writerows(zip(*(column.tolist() for column in batch.columns().values())))
+
+    def close(self) -> None:
+        self._file.close()
+
 
-from producer.producer import generate_transaction, produce_transactions  # type: ignore
+class JsonlSink:
+    def __init__(self, output: Path) -> None:
+        self._file = output.open("w", encoding="utf-8")
 
+    def write(self, batch: TransactionBatch) -> None:
+        lines = batch.to_json()
+        self._file.write("\n".join(lines))
+        self._file.write("\n")
 
-def generate_transactions(rows: int, seed: int) -> List[dict]:
-    random.seed(seed)
-    base_time = datetime.now(timezone.utc) - timedelta(days=7)
-    transactions = []
-    for _ in range(rows):
-        tx = generate_transaction()
-        tx["event_ts"] = (base_time + timedelta(seconds=random.randint(0, 7 * 24 * 3600))).isoformat()
-        transactions.append(tx)
-    return transactions
+    def close(self) -> None:
+        self._file.close()
 
 
-def write_csv(transactions: List[dict], output: Path) -> None:
+class ParquetSink:
+    """Répertoire Parquet partitionné à la Hive (`event_date=YYYY-MM-DD/part-0.parquet`).
+
+    Les lots arrivent dans l'ordre chronologique, donc un seul écrivain par
+    jour reste ouvert et il est fermé dès que le lot courant a dépassé ce jour.
+    """
+
+    def __init__(self, output: Path) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Le format parquet nécessite `pip install pyarrow`.") from exc
+        self._pa = pa
+        self._pq = pq
+        self._root = output
+        self._writers: Dict[str, Any] = {}
+        self._schema = pa.schema(
+            [
+                ("transaction_id", pa.string()),
+                ("event_ts", pa.timestamp("us", tz="UTC")),
+                ("user_id", pa.int64()),
+                ("amount", pa.float64()),
+                ("merchant", pa.string()),
+                ("category", pa.string()),
+                ("city", pa.string()),
+                ("status", pa.string()),
+                ("payment_method", pa.string()),
+                ("currency", pa.string()),
+            ]
+        )
+
+    def write(self, batch: TransactionBatch) -> None:
+        pa = self._pa
+        columns = batch.columns()
+        columns["event_ts"] = batch.event_ts_us
+        table = pa.Table.from_arrays(
+            [pa.array(columns[name], type=self._schema.field(name).type) for name in FIELDS],
+            schema=self._schema,
+        )
+        dates = batch.event_ts_us.astype("datetime64[us]").astype("datetime64[D]")
+        unique_dates, starts = np.unique(dates, return_index=True)
+        bounds = list(starts) + [len(batch)]
+        for day in list(self._writers):
+            if day < str(unique_dates[0]):
+                self._writers.pop(day).close()
+        for index, day in enumerate(str(value) for value in unique_dates):
+            writer = self._writers.get(day)
+            if writer is None:
+                partition = self._root / f"event_date={day}"
+                partition.mkdir(parents=True, exist_ok=True)
+                writer = self._pq.ParquetWriter(partition / "part-0.parquet", self._schema, compression="zstd")
+                self._writers[day] = writer
+            writer.write_table(table.slice(bounds[index], bounds[index + 1] - bounds[index]))
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def write_dataset(rows: int, seed: int, output: Path, output_format: str, chunk_size: int = CHUNK_ROWS) -> int:
+    """Écrit le dataset lot par lot et retourne le nombre de lignes écrites."""
     output.parent.mkdir(parents=True, exist_ok=True)
-    with output.open("w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = transactions[0].keys() if transactions else ["transaction_id"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        if transactions:
-            writer.writerows(transactions)
+    sink = SINKS[output_format](output)
+    written = 0
+    try:
+        for batch in iter_transactions(rows, seed, chunk_size):
+            sink.write(batch)
+            written += len(batch)
+    finally:
+        sink.close()
+    return written
+
+
+def _infer_format(output: Path) -> str:
+    suffix = output.suffix.lower().lstrip(".")
+    if suffix in ("json", "jsonl", "ndjson"):
+        return "jsonl"
+    if suffix in FORMATS:
+        return suffix
+    return "parquet" if not suffix else "csv"
 
 
 @click.command()
 @click.option("--rows", type=int, default=1000, show_default=True, help="Nombre de transactions à générer")
 @click.option("--seed", type=int, default=42, show_default=True, help="Graine aléatoire pour la reproductibilité")
 @click.option("--output", type=click.Path(path_type=Path), default=Path("data/synthetic_transactions.csv"), show_default=True)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="Format de sortie (défaut: déduit de l'extension; parquet = répertoire partitionné par event_date)",
+)
+@click.option("--chunk-size", type=click.IntRange(min=1), default=CHUNK_ROWS, show_default=True, help="Transactions par lot")
 @click.option("--publish", is_flag=True, default=False, help="Publier également vers Kafka via producer.py")
 @click.option("--rate", type=int, default=None, help="Débit d'envoi Kafka (events/sec)")
 @click.option("--bootstrap-server", default="localhost:29092", show_default=True, help="Serveur Kafka pour la publication optionnelle")
 @click.option("--topic", default="transactions", show_default=True, help="Topic Kafka pour la publication optionnelle")
-def cli(rows: int, seed: int, output: Path, publish: bool, rate: int, bootstrap_server: str, topic: str) -> None:
+def cli(
+    rows: int,
+    seed: int,
+    output: Path,
+    output_format: Optional[str],
+    chunk_size: int,
+    publish: bool,
+    rate: int,
+    bootstrap_server: str,
+    topic: str,
+) -> None:
     """Génère un dataset synthétique pour la pipeline et optionally le publie vers Kafka."""
-    transactions = generate_transactions(rows, seed)
-    write_csv(transactions, output)
-    click.echo(f"Fichier généré: {output} ({len(transactions)} lignes)")
+    output_format = output_format or _infer_format(output)
+    written = write_dataset(rows, seed, output, output_format, chunk_size)
+    click.echo(f"Fichier généré: {output} ({written} lignes, {output_format})")
 
     if publish:
         click.echo("Publication vers Kafka...")
@@ -51,9 +202,9 @@ def cli(rows: int, seed: int, output: Path, publish: bool, rate: int, bootstrap_
             rate=rate,
             topic=topic,
             bootstrap_server=bootstrap_server,
+            seed=seed,
         )
 
 
 if __name__ == "__main__":
     cli()
-
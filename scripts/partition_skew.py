@@ -0,0 +1,47 @@
+"""
+Rapport de déséquilibre des partitions pour un flux synthétique.
+
+Génère un flux avec `generate_batch`, lui applique le même partitionnement que
+le producteur (`--partition-key`) et affiche la charge de chaque partition.
+
+Usage:
+    python -m scripts.partition_skew --rows 1000000 --partitions 12 --partition-key user_id
+"""
+
+import click
+import numpy as np
+
+from common.generator import generate_batch
+from common.partitioning import PARTITION_KEYS, assign_partitions
+
+
+@click.command()
+@click.option("--rows", type=int, default=1_000_000, show_default=True, help="Nombre de transactions générées")
+@click.option("--partitions", type=click.IntRange(min=1), default=12, show_default=True, help="Nombre de partitions")
+@click.option("--partition-key", type=click.Choice(PARTITION_KEYS), default="user_id", show_default=True)
+@click.option("--seed", type=int, default=42, show_default=True, help="Graine aléatoire pour la reproductibilité")
+def cli(rows: int, partitions: int, partition_key: str, seed: int) -> None:
+    """Affiche le nombre d'événements et de clés distinctes par partition."""
+    batch = generate_batch(rows, seed)
+    if partition_key == "none":
+        rng = np.random.default_rng(seed)
+        assigned = rng.integers(0, partitions, size=rows)
+        keys = None
+    else:
+        keys = getattr(batch, partition_key)
+        assigned = assign_partitions(keys, partitions)
+
+    counts = np.bincount(assigned, minlength=partitions)
+    mean = counts.mean()
+    click.echo(f"{'partition':>9} {'events':>10} {'share':>7} {'keys':>7}")
+    for partition, count in enumerate(counts):
+        distinct = len(np.unique(keys[assigned == partition])) if keys is not None else "-"
+        click.echo(f"{partition:>9} {count:>10} {count / rows:>7.2%} {distinct:>7}")
+    click.echo(
+        f"min={counts.min()} max={counts.max()} mean={mean:.1f} "
+        f"stddev={counts.std():.1f} skew(max/mean)={counts.max() / mean:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,81 @@
+"""
+Tests du chemin Arrow (`common.arrow_batch`) face au chemin pandas: mêmes
+event_ts acceptés, même texte pour les horodatages et les payloads bruts.
+"""
+
+import csv
+import io
+import json
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("pyarrow")
+
+from common.arrow_batch import copy_csv, decode_lines, derive, payload_strings, validate  # noqa: E402
+from common.payloads import json_payloads  # noqa: E402
+from common.transform import derive_columns  # noqa: E402
+from common.validation import split_valid  # noqa: E402
+
+INGESTED_AT = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def record(event_ts, amount=42.5):
+    return {
+        "transaction_id": str(uuid.UUID(int=abs(hash(event_ts)))),
+        "event_ts": event_ts,
+        "user_id": 7,
+        "amount": amount,
+        "merchant": "Fnac",
+        "category": "electronics",
+        "city": "Lyon",
+        "status": "APPROVED",
+        "payment_method": "card",
+        "currency": "EUR",
+    }
+
+
+def both_paths(records):
+    """(lot Arrow validé et dérivé, DataFrame pandas validé et dérivé) pour les mêmes lignes."""
+    lines = [json.dumps(r).encode("utf-8") for r in records]
+    batch, _ = validate(decode_lines(lines))
+    df, _ = split_valid(pd.DataFrame(records))
+    return derive(batch, INGESTED_AT), derive_columns(df, INGESTED_AT)
+
+
+def test_same_event_ts_accepted_on_both_paths():
+    """Horodatages naïfs (UTC), date seule ou décalage compact: acceptés ou rejetés comme par pandas."""
+    shapes = [
+        "2024-01-01T10:00:00",
+        "2024-01-01 10:00",
+        "2024-01-01",
+        "2024-01-01T10:00:00+0200",
+        "2024-01-01T10:00:00.25Z",
+        "2024-13-01T10:00:00",
+        "pas une date",
+    ]
+    batch, df = both_paths([record(ts) for ts in shapes])
+    assert batch.table.column("transaction_id").to_pylist() == df["transaction_id"].tolist()
+    arrow_ts = batch.table.column("event_ts").to_pylist()
+    assert arrow_ts == [ts.to_pydatetime() for ts in df["event_ts"]]
+    assert arrow_ts[0] == datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def test_whole_seconds_written_like_pandas():
+    """Secondes entières sans fraction, comme `isoformat()`: payloads et CSV identiques aux deux chemins."""
+    batch, df = both_paths([record("2024-01-01T10:00:00Z"), record("2024-01-01T10:00:00.500Z", 700.0)])
+    payloads = payload_strings(batch)
+    assert payloads == json_payloads(df, exclude=("ingested_at",))
+    assert json.loads(payloads[0])["event_ts"] == "2024-01-01T10:00:00+00:00"
+    assert json.loads(payloads[1])["event_ts"] == "2024-01-01T10:00:00.500000+00:00"
+
+    rows = list(csv.DictReader(io.StringIO(copy_csv(batch).decode("utf-8"))))
+    assert rows[0]["event_ts"] == "2024-01-01T10:00:00+00:00"
+    assert rows[0]["ingested_at"] == "2026-10-17T12:00:00+00:00"
+    assert rows[0]["payload"] == payloads[0]
@@ -0,0 +1,74 @@
+"""
+Tests des groupes de consommateurs sur file partitionnée
+(`common.partitioned_queue.ConsumerGroup`): rééquilibrage à deux membres et
+reprise des partitions d'un membre dont le heartbeat a expiré.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.partitioned_queue import ConsumerGroup, PartitionedQueueWriter
+
+SESSION_TIMEOUT_S = 10.0
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_queue(tmp_path, partitions=4):
+    directory = tmp_path / "queue"
+    PartitionedQueueWriter(directory, partitions).close()
+    return directory
+
+
+def member(directory, member_id, clock):
+    return ConsumerGroup(directory, "etl", member_id=member_id, session_timeout_s=SESSION_TIMEOUT_S, clock=clock)
+
+
+def test_rebalance_and_expired_heartbeat(tmp_path):
+    """Un second membre reçoit sa part; si le premier expire, il reprend toutes les partitions."""
+    directory = make_queue(tmp_path)
+    clock = Clock()
+    a = member(directory, "a", clock)
+    b = member(directory, "b", clock)
+
+    assert a.heartbeat() == [0, 1, 2, 3]
+    # b joins: its partitions are still locked by a until a's next heartbeat.
+    assert b.heartbeat() == []
+    assert b.waiting == [1, 3]
+    assert a.heartbeat() == [0, 2]
+    assert b.heartbeat() == [1, 3]
+
+    # a stops heartbeating; once its session expires, b takes over its locks.
+    clock.now += SESSION_TIMEOUT_S + 1
+    assert b.heartbeat() == [0, 1, 2, 3]
+    assert not a.still_owns(0)
+    assert all(b.still_owns(partition) for partition in range(4))
+
+
+def test_concurrent_takeover_keeps_one_owner(tmp_path):
+    """Deux membres voient le même propriétaire expiré: un seul obtient le verrou."""
+    directory = make_queue(tmp_path, partitions=1)
+    clock = Clock()
+    stale = member(directory, "stale", clock)
+    assert stale.heartbeat() == [0]
+    clock.now += SESSION_TIMEOUT_S + 1
+
+    b = member(directory, "b", clock)
+    c = member(directory, "c", clock)
+    assert b.heartbeat() == [0]
+
+    # c read the lock before b took it over, and still sees the expired owner.
+    c._lock_owner = lambda partition: "stale"
+    assert not c._try_claim(0, ["b", "c"])
+
+    assert b.still_owns(0)
+    assert not stale.still_owns(0)
+    assert sorted(path.name for path in (directory / "_groups" / "etl" / "locks").iterdir()) == ["partition-00000.lock"]
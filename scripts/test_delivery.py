@@ -0,0 +1,69 @@
+"""
+Tests du suivi des livraisons Kafka (`common.delivery.DeliveryTracker`) avec
+un producteur factice: envoi qui échoue en cours de lot, échantillon de
+latences borné.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common import delivery  # noqa: E402
+from common.delivery import DeliveryTracker  # noqa: E402
+
+
+class FakeFuture:
+    def add_callback(self, callback):
+        self.callback = callback
+        return self
+
+    def add_errback(self, errback):
+        return self
+
+
+class FakeProducer:
+    """`send` lève l'exception `fail_with` à partir du message numéro `fail_at`."""
+
+    def __init__(self, fail_at=None, fail_with=TimeoutError("buffer full")):
+        self.fail_at = fail_at
+        self.fail_with = fail_with
+        self.futures = []
+
+    def send(self, topic, value, key=None):
+        if len(self.futures) == self.fail_at:
+            raise self.fail_with
+        self.futures.append(FakeFuture())
+        return self.futures[-1]
+
+    def ack_all(self):
+        for future in self.futures:
+            future.callback(None)
+
+
+def test_failed_send_releases_the_window():
+    """Les messages non envoyés sont comptés en échec: la fenêtre se libère une fois les autres acquittés."""
+    tracker = DeliveryTracker(max_in_flight=10)
+    producer = FakeProducer(fail_at=3)
+    with pytest.raises(TimeoutError):
+        tracker.send_batch(producer, "transactions", list(range(8)))
+    assert (tracker.in_flight, tracker.failed) == (3, 5)
+
+    producer.ack_all()
+    assert (tracker.in_flight, tracker.acked, tracker.failed) == (0, 3, 5)
+    tracker.wait_for_room(10)  # returns at once instead of waiting forever
+    assert tracker.latency_percentiles() is not None
+
+
+def test_latency_sample_is_bounded(monkeypatch):
+    """Au-delà de LATENCY_SAMPLES lots, les latences gardées restent en nombre fixe."""
+    monkeypatch.setattr(delivery, "LATENCY_SAMPLES", 100)
+    tracker = DeliveryTracker(max_in_flight=None)
+    for _ in range(1_000):
+        producer = FakeProducer()
+        tracker.send_batch(producer, "transactions", [b"{}"])
+        producer.ack_all()
+    assert len(tracker._latencies) == 100
+    assert tracker.acked == 1_000
@@ -0,0 +1,22 @@
+"""
+Tests de la lecture de la file JSONL (`common.file_queue.read_batch`): les
+lignes illisibles sont mises de côté avec leur numéro, les autres décodées.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.file_queue import QueuePosition, read_batch
+
+
+def test_undecodable_lines_are_set_aside(tmp_path):
+    """JSON invalide, octets non UTF-8 ou valeur qui n'est pas un objet: dans `invalid`, pas d'exception."""
+    queue = tmp_path / "transactions.jsonl"
+    queue.write_bytes(b'{"n": 0}\n{"n": \n\xff\xfe{"n": 2}\n[3]\n{"n": 4}\n')
+
+    batch = read_batch(queue, QueuePosition(), 10)
+    assert [record["n"] for record in batch.records] == [0, 4]
+    assert [line_number for line_number, _, _ in batch.invalid] == [1, 2, 3]
+    assert batch.end.offset == queue.stat().st_size
@@ -0,0 +1,29 @@
+"""
+Tests du partitionnement des messages Kafka (`common.partitioning`).
+
+kafka-python appelle `key_serializer` puis `partitioner(key_bytes, ...)`,
+y compris pour les messages sans clé: ces tests reproduisent cet enchaînement.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.partitioning import crc32_partitioner, partition_for, serialize_key
+
+
+def test_unkeyed_messages_spread_over_partitions():
+    """Sans clé, les envois sont répartis sur plusieurs partitions."""
+    partitions = list(range(6))
+    chosen = {crc32_partitioner(serialize_key(None), partitions, partitions) for _ in range(200)}
+    assert serialize_key(None) is None
+    assert len(chosen) > 1
+
+
+def test_keyed_messages_are_stable():
+    """Une même clé va toujours sur la même partition."""
+    partitions = list(range(6))
+    key = serialize_key(42)
+    chosen = {crc32_partitioner(key, partitions, partitions) for _ in range(50)}
+    assert chosen == {partition_for(b"42", 6)}
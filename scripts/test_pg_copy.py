@@ -0,0 +1,84 @@
+"""
+Tests du chargement « brut seulement » de `common.pg_copy`: les lignes de
+`transactions_flat` sont dérivées des lignes brutes mises en staging pour le
+lot, une par (transaction_id, event_date), depuis la dernière version reçue.
+
+Sans serveur, une connexion factice vérifie l'enchaînement des requêtes. Avec
+POSTGRES_TEST_URI (base jetable créée depuis sql/schema.sql), un identifiant
+répété est chargé sur un vrai Postgres.
+"""
+
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.pg_copy import DERIVE_FLAT_SQL, RAW_STAGING_TABLE, stage_raw_and_derive
+
+
+class FakeResult:
+    rowcount = 1
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(" ".join(str(statement).split()))
+        return FakeResult()
+
+
+def raw_row(transaction_id, event_ts, status):
+    payload = {"transaction_id": transaction_id, "event_ts": event_ts, "user_id": 7, "amount": 42.5, "status": status}
+    return {"transaction_id": transaction_id, "event_ts": event_ts, "ingested_at": event_ts, "payload": json.dumps(payload)}
+
+
+def test_flat_rows_come_from_the_staged_batch():
+    """La dérivation lit la table de staging du lot, pas raw_transactions, puis la vide."""
+    conn = FakeConnection()
+    assert stage_raw_and_derive(conn, []) == (0, 0)
+    assert conn.statements == []
+
+    stage_raw_and_derive(conn, [raw_row(str(uuid.uuid4()), "2026-10-17T10:00:00+00:00", "PENDING")])
+    kinds = [sql.split()[0] for sql in conn.statements]
+    assert kinds == ["CREATE", "INSERT", "INSERT", "INSERT", "TRUNCATE"]
+    derive = conn.statements[3]
+    assert derive.startswith("INSERT INTO transactions_flat")
+    assert "DISTINCT ON (transaction_id, event_date)" in derive
+    assert f"FROM {RAW_STAGING_TABLE} s" in derive
+    assert "FROM raw_transactions " not in " ".join(DERIVE_FLAT_SQL.split())
+
+
+@pytest.mark.skipif(not os.getenv("POSTGRES_TEST_URI"), reason="POSTGRES_TEST_URI non défini")
+def test_repeated_id_keeps_the_latest_version_on_postgres():
+    """Même id deux fois le même jour dans un lot, puis renvoyé: une ligne flat, dernière version."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(os.environ["POSTGRES_TEST_URI"], future=True)
+    transaction_id = str(uuid.uuid4())
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        stage_raw_and_derive(
+            conn,
+            [
+                raw_row(transaction_id, "2036-01-01T10:00:00+00:00", "PENDING"),
+                raw_row(transaction_id, "2036-01-01T11:00:00+00:00", "APPROVED"),
+            ],
+        )
+        stage_raw_and_derive(conn, [raw_row(transaction_id, "2036-01-01T10:00:00+00:00", "REFUNDED")])
+        flat = conn.execute(
+            text("SELECT status, event_ts FROM transactions_flat WHERE transaction_id = :id"), {"id": transaction_id}
+        ).all()
+        assert len(flat) == 1
+        assert flat[0][0] == "REFUNDED"
+    finally:
+        transaction.rollback()
+        conn.close()
+        engine.dispose()
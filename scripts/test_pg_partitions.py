@@ -0,0 +1,158 @@
+"""
+Tests de la gestion des partitions Postgres (`common.pg_partitions`).
+
+Sans serveur, une connexion factice enregistre les requêtes et répond au
+catalogue: on vérifie quelles instructions DDL sont émises. Avec
+POSTGRES_TEST_URI (base jetable créée depuis sql/schema.sql), le déplacement
+des lignes de la partition par défaut est vérifié sur un vrai Postgres.
+"""
+
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.pg_partitions import (
+    PARTITIONED_TABLES,
+    create_partition,
+    maintain_partitions,
+    partition_name,
+)
+
+TODAY = date(2026, 10, 17)
+
+
+class FakeResult:
+    def __init__(self, rows=(), scalar=None, rowcount=0):
+        self._rows = list(rows)
+        self._scalar = scalar
+        self.rowcount = rowcount
+
+    def all(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+
+class FakeConnection:
+    """Répond au catalogue avec `partitions` (jours existants par table); `stranded`: lignes dans la partition par défaut."""
+
+    def __init__(self, partitions, stranded=False):
+        self.partitions = partitions
+        self.stranded = stranded
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        if "pg_partitioned_table" in sql:
+            rows = []
+            for table in PARTITIONED_TABLES:
+                rows.append((table, True, f"{table}_default"))
+                rows += [(table, True, partition_name(table, day)) for day in self.partitions.get(table, ())]
+            return FakeResult(rows)
+        if "to_regclass" in sql:
+            return FakeResult(scalar=True)
+        if sql.startswith("SELECT EXISTS"):
+            return FakeResult(scalar=self.stranded)
+        if "DELETE FROM" in sql:
+            return FakeResult(rowcount=3)
+        return FakeResult()
+
+    def ddl(self):
+        return [sql for sql in self.statements if sql.split()[0] in ("CREATE", "ALTER", "DROP", "SET")]
+
+
+def days(first, last):
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def test_no_ddl_when_partitions_are_current():
+    """Partitions déjà créées et rien d'expiré: une lecture du catalogue, aucun DDL."""
+    existing = {table: days(TODAY - timedelta(days=2), TODAY + timedelta(days=7)) for table in PARTITIONED_TABLES}
+    conn = FakeConnection(existing)
+    created, expired = maintain_partitions(conn, ahead_days=7, retention_days={"raw_transactions": 3}, today=TODAY)
+    assert (created, expired) == ([], [])
+    assert conn.ddl() == []
+    assert len(conn.statements) == 1
+
+
+def test_creates_missing_days_and_expires_old_ones():
+    """Seul le jour manquant est créé; les partitions hors rétention sont supprimées."""
+    existing = {table: days(TODAY - timedelta(days=5), TODAY + timedelta(days=6)) for table in PARTITIONED_TABLES}
+    conn = FakeConnection(existing)
+    created, expired = maintain_partitions(
+        conn, ahead_days=7, retention_days={"transactions_flat": 4}, detach=True, today=TODAY
+    )
+    last = TODAY + timedelta(days=7)
+    assert created == [partition_name(table, last) for table in PARTITIONED_TABLES]
+    assert expired == [partition_name("transactions_flat", TODAY - timedelta(days=offset)) for offset in (5, 4)]
+    assert conn.ddl()[0].startswith("SET LOCAL lock_timeout")
+    assert "ALTER TABLE transactions_flat DETACH PARTITION transactions_flat_p20261012" in conn.ddl()
+
+
+def test_create_partition_moves_rows_out_of_default():
+    """Lignes du jour dans la partition par défaut: table créée à part, lignes déplacées, puis attachée."""
+    conn = FakeConnection({}, stranded=True)
+    name = create_partition(conn, "raw_transactions", TODAY)
+    ddl = [sql for sql in conn.statements if not sql.startswith("SELECT")]
+    assert name == "raw_transactions_p20261017"
+    assert ddl[0] == "CREATE TABLE raw_transactions_p20261017 (LIKE raw_transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    assert "DELETE FROM raw_transactions_default WHERE event_ts >= '2026-10-17 00:00:00+00' AND event_ts < '2026-10-18 00:00:00+00'" in ddl[1]
+    assert "INSERT INTO raw_transactions_p20261017 SELECT * FROM moved" in ddl[1]
+    assert ddl[2] == (
+        "ALTER TABLE raw_transactions ATTACH PARTITION raw_transactions_p20261017 "
+        "FOR VALUES FROM ('2026-10-17 00:00:00+00') TO ('2026-10-18 00:00:00+00')"
+    )
+
+
+@pytest.mark.skipif(not os.getenv("POSTGRES_TEST_URI"), reason="POSTGRES_TEST_URI non défini")
+def test_default_rows_move_on_postgres():
+    """Sur Postgres: une ligne tombée dans la partition par défaut rejoint sa partition à sa création."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(os.environ["POSTGRES_TEST_URI"], future=True)
+    day = TODAY + timedelta(days=3650)
+    transaction_id = str(uuid.uuid4())
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        conn.execute(
+            text(
+                "INSERT INTO raw_transactions (transaction_id, event_ts, payload) "
+                "VALUES (:id, CAST(:ts AS timestamptz), CAST('{}' AS jsonb))"
+            ),
+            {"id": transaction_id, "ts": f"{day.isoformat()} 12:00:00+00"},
+        )
+        name = create_partition(conn, "raw_transactions", day)
+        located = conn.execute(
+            text("SELECT tableoid::regclass::text FROM raw_transactions WHERE transaction_id = :id"),
+            {"id": transaction_id},
+        ).scalar()
+        assert located == name
+    finally:
+        transaction.rollback()
+        conn.close()
+        engine.dispose()
+
+
+def test_unpartitioned_database_fails_fast():
+    """Base d'avant le partitionnement: erreur explicite qui renvoie au script de migration, aucun DDL."""
+
+    class LegacyConnection(FakeConnection):
+        def execute(self, statement, params=None):
+            if "pg_partitioned_table" in str(statement):
+                self.statements.append(str(statement))
+                return FakeResult([(table, False, None) for table in PARTITIONED_TABLES])
+            return super().execute(statement, params)
+
+    conn = LegacyConnection({})
+    with pytest.raises(RuntimeError, match="migrate_to_partitions.sql"):
+        maintain_partitions(conn, today=TODAY)
+    assert conn.ddl() == []
@@ -0,0 +1,109 @@
+"""
+Tests du journal segmenté (`common.segmented_log`): reprise après une écriture
+interrompue, passage d'un segment à l'autre et rétention.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.file_queue import QueuePosition
+from common.segmented_log import (
+    INDEX_ENTRY,
+    SegmentedLogReader,
+    SegmentedLogWriter,
+    delete_consumed,
+    end_offset,
+    list_segments,
+    segment_name,
+)
+
+
+def write_records(directory, start, count, segment_bytes=1 << 20):
+    with SegmentedLogWriter(directory, segment_bytes=segment_bytes) as writer:
+        writer.write_lines([json.dumps({"n": n}) for n in range(start, start + count)])
+
+
+def read_all(directory):
+    lines, _ = SegmentedLogReader(directory).read_lines(0, 10_000)
+    return [(offset, json.loads(raw)["n"]) for offset, raw in lines]
+
+
+def test_repair_after_torn_write(tmp_path):
+    """Une ligne coupée en fin de segment est tronquée; les offsets reprennent à la suite."""
+    log = tmp_path / "log"
+    write_records(log, 0, 5)
+    data = log / f"{segment_name(0)}.jsonl"
+    complete_size = data.stat().st_size
+    with data.open("ab") as f:
+        f.write(b'{"n": 5, "tor')
+
+    write_records(log, 5, 2)
+
+    assert read_all(log) == [(n, n) for n in range(7)]
+    assert end_offset(log) == 7
+    assert data.read_bytes()[complete_size:].startswith(b'{"n": 5}\n')
+
+
+def test_repair_index_ahead_of_data(tmp_path):
+    """Des entrées d'index au-delà des données (données perdues) sont écartées à la réouverture."""
+    log = tmp_path / "log"
+    write_records(log, 0, 4)
+    data = log / f"{segment_name(0)}.jsonl"
+    index = log / f"{segment_name(0)}.index"
+    positions = np.fromfile(index, dtype=INDEX_ENTRY)
+    with data.open("r+b") as f:
+        f.truncate(int(positions[3]))  # the last record never reached the disk
+
+    write_records(log, 3, 1)
+
+    assert read_all(log) == [(n, n) for n in range(4)]
+    assert len(np.fromfile(index, dtype=INDEX_ENTRY)) == 4
+
+
+def test_rollover_across_segments(tmp_path):
+    """Petits segments: plusieurs fichiers, lus d'un seul tenant et dans l'ordre."""
+    log = tmp_path / "log"
+    write_records(log, 0, 50, segment_bytes=100)
+    write_records(log, 50, 25, segment_bytes=100)
+
+    segments = list_segments(log)
+    assert len(segments) > 2
+    assert segments[0] == 0
+    assert read_all(log) == [(n, n) for n in range(75)]
+    lines, end = SegmentedLogReader(log).read_lines(segments[1] - 1, 3)
+    assert [offset for offset, _ in lines] == [segments[1] - 1, segments[1], segments[1] + 1]
+    assert end.line == segments[1] + 2
+
+
+def test_delete_consumed_keeps_active_segment(tmp_path):
+    """La rétention supprime les segments lus, jamais le segment actif."""
+    log = tmp_path / "log"
+    write_records(log, 0, 40, segment_bytes=100)
+    segments = list_segments(log)
+
+    delete_consumed(log, segments[2])
+    assert list_segments(log) == segments[2:]
+
+    delete_consumed(log, end_offset(log) + 100)
+    assert list_segments(log) == segments[-1:]
+    lines, _ = SegmentedLogReader(log).read_lines(0, 10_000)
+    assert lines[0][0] == segments[-1]
+    assert lines[-1][0] == 39
+
+
+def test_corrupt_bytes_are_set_aside(tmp_path):
+    """Une ligne qui n'est pas de l'UTF-8 valide est mise de côté, pas une erreur pour tout le batch."""
+    log = tmp_path / "log"
+    write_records(log, 0, 2)
+    with (log / f"{segment_name(0)}.jsonl").open("ab") as f:
+        f.write(b'\xff\xfe{"n": 2}\n')
+    write_records(log, 3, 1)
+
+    batch = SegmentedLogReader(log).read_batch(QueuePosition(), 10)
+    assert [record["n"] for record in batch.records] == [0, 1, 3]
+    assert [(offset, raw) for offset, raw, _ in batch.invalid] == [(2, b'\xff\xfe{"n": 2}\n')]
@@ -0,0 +1,42 @@
+"""
+Tests du format binaire (`common.wire_format.BinaryCodec`): aller-retour d'un
+enregistrement et refus des identifiants qui ne sont pas des UUID.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.wire_format import BinaryCodec  # noqa: E402
+
+RECORD = {
+    "transaction_id": "8b4ae5f1-a941-46a0-956a-26afbccdafe5",
+    "event_ts": "2026-10-17T10:00:00.250000+00:00",
+    "user_id": 4016,
+    "amount": 79.15,
+    "merchant": "Carrefour",
+    "category": "health",
+    "city": "Bordeaux",
+    "status": "REFUNDED",
+    "payment_method": "wallet",
+    "currency": "EUR",
+}
+
+
+def test_round_trip():
+    """Un enregistrement encodé puis décodé revient à l'identique."""
+    codec = BinaryCodec()
+    assert codec.decode(codec.encode(RECORD)) == RECORD
+
+
+@pytest.mark.parametrize(
+    "transaction_id",
+    ["8b4ae5f1-a941-46a0-956a-26afbccdaf", "8b4ae5f1-a941-46a0-956a-26afbccdafe5ff", "not-a-uuid", ""],
+)
+def test_rejects_ids_that_are_not_uuids(transaction_id):
+    """Trop court, trop long ou pas hexadécimal: ValueError, jamais un autre UUID."""
+    with pytest.raises(ValueError):
+        BinaryCodec().encode(dict(RECORD, transaction_id=transaction_id))
@@ -0,0 +1,34 @@
+-- One-off migration of a database created before raw_transactions and
+-- transactions_flat were partitioned. Run from the sql/ directory:
+--   psql "$POSTGRES_URI" -f migrate_to_partitions.sql
+-- The old tables are kept as *_unpartitioned; drop them once checked.
+BEGIN;
+
+ALTER TABLE raw_transactions RENAME TO raw_transactions_unpartitioned;
+ALTER TABLE raw_transactions_unpartitioned RENAME CONSTRAINT raw_transactions_pkey TO raw_transactions_unpartitioned_pkey;
+ALTER TABLE transactions_flat RENAME TO transactions_flat_unpartitioned;
+ALTER TABLE transactions_flat_unpartitioned RENAME CONSTRAINT transactions_flat_pkey TO transactions_flat_unpartitioned_pkey;
+ALTER INDEX idx_transactions_flat_user_id RENAME TO idx_transactions_flat_unpartitioned_user_id;
+ALTER INDEX idx_transactions_flat_event_ts RENAME TO idx_transactions_flat_unpartitioned_event_ts;
+ALTER INDEX idx_transactions_flat_category RENAME TO idx_transactions_flat_unpartitioned_category;
+
+\ir schema.sql
+
+-- One partition per day of history, so that no old row ends up in the default partitions.
+SELECT create_daily_partitions(
+    LEAST(
+        (SELECT MIN(event_ts AT TIME ZONE 'UTC')::date FROM raw_transactions_unpartitioned),
+        (SELECT MIN(event_date) FROM transactions_flat_unpartitioned)
+    ),
+    (NOW() AT TIME ZONE 'UTC')::date
+);
+
+INSERT INTO raw_transactions (transaction_id, event_ts, payload, ingested_at)
+SELECT transaction_id, event_ts, payload, ingested_at FROM raw_transactions_unpartitioned;
+
+INSERT INTO transactions_flat
+SELECT * FROM transactions_flat_unpartitioned;
+
+REFRESH MATERIALIZED VIEW daily_summary;
+
+COMMIT;
@@ -1,14 +1,25 @@
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- raw_transactions and transactions_flat are partitioned by UTC day
+-- (event_ts / event_date). Postgres requires the partition key in the
+-- primary key, hence (transaction_id, event_ts) and (transaction_id,
+-- event_date). transaction_id alone is therefore not unique: the same id
+-- re-sent with another event_ts is a second raw row, and with an event_ts
+-- on another day a second flat row too. Future partitions are created and
+-- expired ones dropped or detached by common/pg_partitions.py (ETL and
+-- Airflow DAG); rows outside every partition land in the *_default
+-- partitions. A database created before partitioning is converted by
+-- migrate_to_partitions.sql; the ETL refuses to load into it until then.
 CREATE TABLE IF NOT EXISTS raw_transactions (
-    transaction_id UUID PRIMARY KEY,
+    transaction_id UUID NOT NULL,
     event_ts TIMESTAMPTZ NOT NULL,
     payload JSONB NOT NULL,
-    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (transaction_id, event_ts)
+) PARTITION BY RANGE (event_ts);
 
 CREATE TABLE IF NOT EXISTS transactions_flat (
-    transaction_id UUID PRIMARY KEY,
+    transaction_id UUID NOT NULL,
     event_ts TIMESTAMPTZ NOT NULL,
     event_date DATE NOT NULL,
     event_hour SMALLINT NOT NULL,
@@ -22,7 +33,47 @@ CREATE TABLE IF NOT EXISTS transactions_flat (
     status TEXT,
     payment_method TEXT,
     currency TEXT,
-    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (transaction_id, event_date)
+) PARTITION BY RANGE (event_date);
+
+CREATE TABLE IF NOT EXISTS raw_transactions_default PARTITION OF raw_transactions DEFAULT;
+CREATE TABLE IF NOT EXISTS transactions_flat_default PARTITION OF transactions_flat DEFAULT;
+
+-- Creates the daily partitions of both tables from first_day to last_day
+-- (same names and bounds as common/pg_partitions.py).
+CREATE OR REPLACE FUNCTION create_daily_partitions(first_day DATE, last_day DATE)
+RETURNS VOID AS $$
+DECLARE
+    day DATE := first_day;
+BEGIN
+    WHILE day <= last_day LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF raw_transactions FOR VALUES FROM (%L) TO (%L)',
+            'raw_transactions_p' || to_char(day, 'YYYYMMDD'),
+            to_char(day, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(day + 1, 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF transactions_flat FOR VALUES FROM (%L) TO (%L)',
+            'transactions_flat_p' || to_char(day, 'YYYYMMDD'),
+            day,
+            day + 1
+        );
+        day := day + 1;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Yesterday to a week ahead; the ETL keeps creating them ahead of time.
+SELECT create_daily_partitions((NOW() AT TIME ZONE 'UTC')::date - 1, (NOW() AT TIME ZONE 'UTC')::date + 7);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id BIGSERIAL PRIMARY KEY,
+    source TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    failed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_transactions_flat_user_id ON transactions_flat (user_id);